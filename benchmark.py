@@ -0,0 +1,467 @@
+import argparse
+import asyncio
+import contextlib
+import importlib
+import io
+import itertools
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+from fastmcp import Client
+
+from generate_data import generate
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(ROOT, "chinook-crud-api")
+MCP_DIR = os.path.join(ROOT, "chinook-crud-api-mcp")
+
+SUITES = ("api", "mcp", "workflows", "agent")
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of already sorted ``values``."""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+class Skipped(Exception):
+    """Raised by an op with nothing to do; the iteration is left out of the latency and throughput figures."""
+
+
+class Server:
+    """A server process started for the benchmark, with its memory read from /proc."""
+
+    def __init__(self, name, command, cwd, env, url, log_dir):
+        self.name = name
+        self.command = command
+        self.cwd = cwd
+        self.env = {**os.environ, **env}
+        self.url = url
+        self.log_path = os.path.join(log_dir, f"{name}.log")
+        self.process = None
+
+    async def start(self, timeout=60.0):
+        log = open(self.log_path, "w")
+        self.process = subprocess.Popen(self.command, cwd=self.cwd, env=self.env, stdout=log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient() as client:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"{self.name} server exited, see {self.log_path}")
+                try:
+                    # Any HTTP response means the server is listening
+                    await client.get(self.url, timeout=1.0)
+                    return
+                except httpx.TransportError:
+                    await asyncio.sleep(0.2)
+        raise RuntimeError(f"{self.name} server did not start within {timeout}s, see {self.log_path}")
+
+    def memory(self):
+        """Current and peak resident memory in MB, or None where /proc is not available."""
+        try:
+            with open(f"/proc/{self.process.pid}/status") as f:
+                fields = dict(line.split(":", 1) for line in f if ":" in line)
+        except OSError:
+            return None
+        return {
+            "rss_mb": round(int(fields["VmRSS"].split()[0]) / 1024, 1),
+            "peak_rss_mb": round(int(fields["VmHWM"].split()[0]) / 1024, 1),
+        }
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+async def run_load(op, requests, concurrency, setup=None, teardown=None):
+    """
+    Run ``op(i, worker)`` ``requests`` times from ``concurrency`` workers.
+
+    ``setup(worker)`` gives each worker its own context, such as an MCP
+    session, and runs before the clock starts.
+    """
+    counter = itertools.count()
+    latencies, errors = [], []
+    skipped = 0
+    contexts = [await setup(worker) if setup else None for worker in range(concurrency)]
+
+    async def worker(context):
+        nonlocal skipped
+        while True:
+            i = next(counter)
+            if i >= requests:
+                return
+            started = time.perf_counter()
+            try:
+                await op(i, context)
+            except Skipped:
+                skipped += 1
+                continue
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(context) for context in contexts))
+    elapsed = time.perf_counter() - started
+    if teardown:
+        for context in contexts:
+            await teardown(context)
+
+    latencies.sort()
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        "requests": requests,
+        "skipped": skipped,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "max_ms": ms(latencies[-1]) if latencies else None,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+
+
+def counts(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in ("Artist", "Album", "Track", "Invoice", "InvoiceLine")}
+    finally:
+        conn.close()
+
+
+def api_scenarios(client, sizes):
+    """(name, op) pairs covering every route of the CRUD API; write scenarios use the rows created before them."""
+    created, bulk_created = [], []
+    tracks, artists = sizes["Track"], sizes["Artist"]
+
+    async def get(url, **params):
+        response = await client.get(url, params=params)
+        response.raise_for_status()
+        return response
+
+    async def create(i, _):
+        response = await client.post("/Artist", json={"Name": f"Benchmark Artist {i}"})
+        response.raise_for_status()
+        created.append(response.json()["id"])
+
+    async def update(i, _):
+        response = await client.put(f"/Artist/{created[i % len(created)]}", json={"Name": f"Benchmark Artist {i} (updated)"})
+        response.raise_for_status()
+
+    async def delete(i, _):
+        if i >= len(created):
+            raise Skipped()
+        response = await client.delete(f"/Artist/{created[i]}")
+        response.raise_for_status()
+
+    async def bulk_create(i, _):
+        records = [{"Name": f"Benchmark Bulk {i}-{n}"} for n in range(100)]
+        response = await client.post("/bulk/Artist", json={"records": records})
+        response.raise_for_status()
+        bulk_created.append([result["id"] for result in response.json()["results"]])
+
+    async def bulk_update(i, _):
+        ids = bulk_created[i % len(bulk_created)]
+        response = await client.put("/bulk/Artist", json={"records": [{"ArtistId": id, "Name": f"Benchmark Bulk {id} (updated)"} for id in ids]})
+        response.raise_for_status()
+
+    async def bulk_delete(i, _):
+        if i >= len(bulk_created):
+            raise Skipped()
+        response = await client.request("DELETE", "/bulk/Artist", json={"ids": bulk_created[i]})
+        response.raise_for_status()
+
+    async def export(i, _):
+        async with client.stream("GET", "/export/Track", params={"limit": 1000, "offset": 0}) as response:
+            response.raise_for_status()
+            async for _ in response.aiter_bytes():
+                pass
+
+    return [
+        ("GET /", lambda i, _: get("/")),
+        ("GET /health", lambda i, _: get("/health")),
+        ("GET /schema/{table}", lambda i, _: get("/schema/Track")),
+        ("GET /{table} page", lambda i, _: get("/Track", limit=100, offset=(i * 100) % max(tracks - 100, 1))),
+        ("GET /{table} filtered", lambda i, _: get("/Track", GenreId=1 + i % 25, fields="TrackId,Name,Milliseconds", order_by="-Milliseconds", limit=50)),
+        ("GET /{table} cursor", lambda i, _: get("/Track", limit=100, cursor="")),
+        ("GET /{table} ids", lambda i, _: get("/Track", ids=",".join(str(1 + (i * 25 + n) % tracks) for n in range(25)))),
+        ("GET /{table}/{id}", lambda i, _: get(f"/Track/{1 + (i * 7919) % tracks}")),
+        ("GET /{table}/{id} expand", lambda i, _: get(f"/Track/{1 + (i * 7919) % tracks}", expand="Album,Genre")),
+        ("GET /related/{table}", lambda i, _: get("/related/Artist", ArtistId=1 + i % artists, path="Albums.Tracks", fields="TrackId,Name")),
+        ("GET /aggregate/{table}", lambda i, _: get("/aggregate/Track", group_by="Genre.Name", metrics="count,sum:Milliseconds", order_by="-count", limit=10)),
+        ("GET /export/{table}", export),
+        ("POST /{table}", create),
+        ("PUT /{table}/{id}", update),
+        ("DELETE /{table}/{id}", delete),
+        ("POST /bulk/{table}", bulk_create),
+        ("PUT /bulk/{table}", bulk_update),
+        ("DELETE /bulk/{table}", bulk_delete),
+    ]
+
+
+async def call(client, tool, args):
+    result = await client.call_tool(tool, args)
+    # Empty lists come back without any content
+    value = json.loads(result.content[0].text) if result.content else []
+    if isinstance(value, dict) and "error" in value:
+        raise RuntimeError(f"{value['error']}: {value.get('details')}")
+    return value
+
+
+def mcp_scenarios(sizes):
+    """(name, op) pairs covering every MCP tool; ops take the worker's own MCP session."""
+    created, bulk_created = [], []
+    tracks, artists = sizes["Track"], sizes["Artist"]
+
+    async def create(i, client):
+        created.append((await call(client, "create_record", {"table_name": "Artist", "data": {"Name": f"Benchmark Artist {i}"}}))["id"])
+
+    async def delete(i, client):
+        if i >= len(created):
+            raise Skipped()
+        await call(client, "delete_record", {"table_name": "Artist", "record_id": created[i]})
+
+    async def bulk_create(i, client):
+        records = [{"Name": f"Benchmark Bulk {i}-{n}"} for n in range(100)]
+        result = await call(client, "bulk_create_records", {"table_name": "Artist", "records": records})
+        bulk_created.append([row["id"] for row in result["results"]])
+
+    async def bulk_delete(i, client):
+        if i >= len(bulk_created):
+            raise Skipped()
+        await call(client, "bulk_delete_records", {"table_name": "Artist", "ids": bulk_created[i]})
+
+    return [
+        ("list_tables", lambda i, c: call(c, "list_tables", {})),
+        ("get_all_records", lambda i, c: call(c, "get_all_records", {"table_name": "Track", "limit": 100, "offset": (i * 100) % max(tracks - 100, 1)})),
+        ("get_all_records filtered", lambda i, c: call(c, "get_all_records", {
+            "table_name": "Track", "filters": {"GenreId": 1 + i % 25}, "fields": ["TrackId", "Name"], "order_by": "-Milliseconds", "limit": 50})),
+        ("get_record", lambda i, c: call(c, "get_record", {"table_name": "Track", "record_id": 1 + (i * 7919) % tracks})),
+        ("get_records_by_ids", lambda i, c: call(c, "get_records_by_ids", {"table_name": "Track", "ids": [1 + (i * 25 + n) % tracks for n in range(25)]})),
+        ("describe_table", lambda i, c: call(c, "describe_table", {"table_name": "Track"})),
+        ("get_related_records", lambda i, c: call(c, "get_related_records", {
+            "table_name": "Artist", "path": "Albums.Tracks", "filters": {"ArtistId": 1 + i % artists}, "fields": ["TrackId", "Name"]})),
+        ("aggregate_records", lambda i, c: call(c, "aggregate_records", {
+            "table_name": "Track", "group_by": ["Genre.Name"], "metrics": ["count"], "order_by": "-count", "limit": 10})),
+        ("create_record", create),
+        ("update_record", lambda i, c: call(c, "update_record", {
+            "table_name": "Artist", "record_id": created[i % len(created)], "data": {"Name": f"Benchmark Artist {i} (updated)"}})),
+        ("delete_record", delete),
+        ("bulk_create_records", bulk_create),
+        ("bulk_update_records", lambda i, c: call(c, "bulk_update_records", {
+            "table_name": "Artist", "records": [{"ArtistId": id, "Name": f"Benchmark Bulk {id} (updated)"} for id in bulk_created[i % len(bulk_created)]]})),
+        ("bulk_delete_records", bulk_delete),
+    ]
+
+
+def workflow_scenarios(mcp_url):
+    """The demo scripts, run as they are with their output discarded and their client pointed at ``mcp_url``."""
+    sys.path.insert(0, ROOT)
+    scenarios = []
+    for module_name, function_name in (("mcp_customer_analysis", "mcp_customer_analysis"), ("mcp_complex_queries", "mcp_complex_queries")):
+        module = importlib.import_module(module_name)
+        module.Client = lambda url, *args, **kwargs: Client(mcp_url, *args, **kwargs)
+
+        async def run(i, _, workflow=getattr(module, function_name)):
+            with contextlib.redirect_stdout(io.StringIO()):
+                await workflow()
+
+        scenarios.append((module_name, run))
+    return scenarios
+
+
+def agent_scenarios(mcp_url, latency):
+    """Agent turns end to end, with the LLM replaced by a stub that answers after ``latency`` seconds."""
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, MCP_DIR)
+    from langchain_core.messages import HumanMessage
+    from langchain_core.runnables import RunnableLambda
+
+    import mcp_agent
+    from benchmark_agent_fast_path import REQUESTS, CountingLLM
+    from mcp_session import MCPSession
+
+    mcp_agent.session = MCPSession(mcp_url)
+    mcp_agent.llm_cache = None
+    stub = CountingLLM(None, latency)
+    mcp_agent.llm = RunnableLambda(stub.invoke, afunc=stub.ainvoke)
+    agent = mcp_agent.create_agent_graph()
+
+    async def turn(i, _, fast_path):
+        mcp_agent.FAST_PATH = fast_path
+        tools = await mcp_agent.get_mcp_tools()
+        state = {"messages": [HumanMessage(content=REQUESTS[i % len(REQUESTS)])], "tool_calls": None, "tool_results": None, "mcp_tools": tools}
+        await agent.ainvoke(state)
+
+    return [
+        ("agent turn (fast path)", lambda i, c: turn(i, c, True)),
+        ("agent turn (LLM planner)", lambda i, c: turn(i, c, False)),
+    ]
+
+
+def compare(results, baseline_path, threshold):
+    """Print changes against an earlier run; returns the scenarios whose p95 or throughput got worse than ``threshold``."""
+    with open(baseline_path) as f:
+        baseline = {(r["suite"], r["name"], r["concurrency"]): r for r in json.load(f)["results"]}
+    regressions = []
+    print(f"\nCompared with {baseline_path}:")
+    print(f"{'scenario':<48} {'c':>4} {'p95 ms':>18} {'rps':>18}")
+    for result in results:
+        old = baseline.get((result["suite"], result["name"], result["concurrency"]))
+        if not old or not old["p95_ms"] or not result["p95_ms"]:
+            continue
+        p95_change = result["p95_ms"] / old["p95_ms"] - 1
+        rps_change = result["rps"] / old["rps"] - 1 if old["rps"] else 0
+        regressed = p95_change > threshold or rps_change < -threshold
+        if regressed:
+            regressions.append(result)
+        print(f"{result['suite'] + ' ' + result['name']:<48} {result['concurrency']:>4} "
+              f"{old['p95_ms']:>8} → {result['p95_ms']:<8} {old['rps']:>8} → {result['rps']:<8}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure latency, throughput and memory of the API, MCP server, demo workflows and agent")
+    parser.add_argument("--suite", default="api,mcp,workflows,agent", help=f"Comma-separated suites to run: {', '.join(SUITES)}")
+    parser.add_argument("--concurrency", default="1,8", help="Comma-separated concurrency levels (default: 1,8)")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per API/MCP scenario and concurrency level (default: 200)")
+    parser.add_argument("--workflow-runs", type=int, default=10, help="Runs per workflow/agent scenario and concurrency level (default: 10)")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply the Chinook data this many times (default: 1)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the scaled data (default: 0)")
+    parser.add_argument("--db", default=os.path.join(API_DIR, "chinook.db"), help="Source database; it is copied, never written")
+    parser.add_argument("--mcp-backend", default="http", choices=("http", "local"), help="Backend of the MCP server under test")
+    parser.add_argument("--stub-llm-latency", type=float, default=0.05, help="Seconds the stub LLM takes per call (default: 0.05)")
+    parser.add_argument("--output", help="Where to write the JSON results (default: benchmark-results/<timestamp>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Earlier results JSON to compare with")
+    parser.add_argument("--regression-threshold", type=float, default=0.1, help="Relative p95/rps change reported as a regression (default: 0.1)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 if any scenario regressed")
+    args = parser.parse_args()
+
+    suites = [suite for suite in args.suite.split(",") if suite]
+    unknown = [suite for suite in suites if suite not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    workdir = tempfile.mkdtemp(prefix="chinook-benchmark-")
+    db_path = os.path.join(workdir, "chinook.db")
+    print(f"Preparing data (scale {args.scale}x) in {workdir} ...")
+    generate(args.db, db_path, scale=args.scale, seed=args.seed)
+    sizes = counts(db_path)
+    print("Rows: " + ", ".join(f"{table} {count}" for table, count in sizes.items()))
+
+    api_port, mcp_port = free_port(), free_port()
+    api_url, mcp_url = f"http://127.0.0.1:{api_port}", f"http://127.0.0.1:{mcp_port}/mcp"
+    servers = {
+        "api": Server("api", [sys.executable, "-m", "uvicorn", "server:app", "--port", str(api_port), "--log-level", "warning"],
+                      API_DIR, {"CHINOOK_DB_PATH": db_path}, f"{api_url}/health", workdir),
+        "mcp": Server("mcp", [sys.executable, "mcp_server.py"], MCP_DIR, {
+            "CHINOOK_API_URL": api_url, "CHINOOK_MCP_PORT": str(mcp_port),
+            "CHINOOK_MCP_BACKEND": args.mcp_backend, "CHINOOK_DB_PATH": db_path,
+        }, mcp_url, workdir),
+    }
+
+    results = []
+    try:
+        for server in servers.values():
+            await server.start()
+
+        async def record(suite, name, op, count, concurrency, setup=None, teardown=None):
+            result = await run_load(op, count, concurrency, setup, teardown)
+            result = {"suite": suite, "name": name, "concurrency": concurrency, **result,
+                      "memory": {server.name: server.memory() for server in servers.values()}}
+            results.append(result)
+            print(f"{suite + ' ' + name:<48} c={concurrency:<4} p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  "
+                  f"p99 {result['p99_ms']} ms  {result['rps']} req/s  errors {result['errors']}"
+                  + (f"  skipped {result['skipped']}" if result["skipped"] else ""))
+            if result["first_error"]:
+                print(f"    first error: {result['first_error']}")
+
+        async def open_session(worker):
+            client = Client(mcp_url)
+            await client.__aenter__()
+            return client
+
+        async def close_session(client):
+            await client.__aexit__(None, None, None)
+
+        for concurrency in levels:
+            if "api" in suites:
+                limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+                async with httpx.AsyncClient(base_url=api_url, limits=limits, timeout=60.0) as client:
+                    for name, op in api_scenarios(client, sizes):
+                        await record("api", name, op, args.requests, concurrency)
+            if "mcp" in suites:
+                for name, op in mcp_scenarios(sizes):
+                    await record("mcp", name, op, args.requests, concurrency, open_session, close_session)
+            if "workflows" in suites:
+                for name, op in workflow_scenarios(mcp_url):
+                    await record("workflows", name, op, args.workflow_runs, concurrency)
+            if "agent" in suites:
+                for name, op in agent_scenarios(mcp_url, args.stub_llm_latency):
+                    await record("agent", name, op, args.workflow_runs, concurrency)
+    finally:
+        for server in servers.values():
+            server.stop()
+
+    report = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "commit": subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": args.scale,
+            "seed": args.seed,
+            "rows": sizes,
+            "mcp_backend": args.mcp_backend,
+            "concurrency": levels,
+            "requests": args.requests,
+            "workflow_runs": args.workflow_runs,
+            "stub_llm_latency": args.stub_llm_latency,
+            # ru_maxrss is in KB on Linux and bytes on macOS
+            "harness_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(ROOT, "benchmark-results", datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.regression_threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "chinook-crud-api-mcp"))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+import mcp_agent
+from intent_parser import IntentParser
+
+# Read-only requests, so the benchmark can be repeated without changing the database
+REQUESTS = [
+    "List all tables in the database",
+    "Show me the first 5 artists",
+    "Get details for artist with ID 1",
+    "get albums 1, 2 and 3",
+    "describe the Track table",
+    "show invoice 3",
+    # Left to the LLM by the fast path
+    "Find the genres with the most tracks",
+    "Show me the albums by AC/DC",
+]
+
+
+class CountingLLM:
+    """Wraps the agent's LLM to count calls; with ``latency`` set, answers like a stub instead of calling it."""
+
+    def __init__(self, llm, latency=None):
+        self.llm = llm
+        self.latency = latency
+        self.calls = 0
+        self._parser = IntentParser()
+
+    def _stub_reply(self, prompt):
+        messages = prompt.to_messages()
+        if "Respond in JSON format only" in messages[-1].content:
+            # A plan as the LLM would write it; rules stand in for the model here
+            request = next(message.content for message in reversed(messages[:-1]) if message.type == "human")
+            calls = self._parser.parse(request) or []
+            plan = [{"id": call.id, "tool": call.tool, "args": call.args} for call in calls]
+            return AIMessage(content=json.dumps({"calls": plan or [{"id": "call1", "tool": "list_tables", "args": {}}]}))
+        return AIMessage(content="Here are the results.")
+
+    def invoke(self, prompt):
+        self.calls += 1
+        if self.latency is None:
+            return self.llm.invoke(prompt)
+        time.sleep(self.latency)
+        return self._stub_reply(prompt)
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        if self.latency is None:
+            return await self.llm.ainvoke(prompt)
+        await asyncio.sleep(self.latency)
+        return self._stub_reply(prompt)
+
+
+async def run(agent, counter, fast_path, repeat):
+    mcp_agent.FAST_PATH = fast_path
+    tools = await mcp_agent.get_mcp_tools()
+    rows = []
+    for request in REQUESTS:
+        latencies, calls = [], []
+        for _ in range(repeat):
+            state = {"messages": [HumanMessage(content=request)], "tool_calls": None, "tool_results": None, "mcp_tools": tools}
+            before = counter.calls
+            start = time.perf_counter()
+            await agent.ainvoke(state)
+            latencies.append(time.perf_counter() - start)
+            calls.append(counter.calls - before)
+        rows.append({
+            "request": request,
+            "llm_calls": statistics.mean(calls),
+            "latency_ms": statistics.median(latencies) * 1000,
+        })
+    return rows
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare agent turns with and without the fast-path intent parser")
+    parser.add_argument("--repeat", type=int, default=3, help="Turns per request and mode (default: 3)")
+    parser.add_argument("--stub-llm", type=float, metavar="SECONDS", default=None,
+                        help="Replace the LLM with a stub that answers after SECONDS, instead of calling the real model")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to PATH as JSON")
+    args = parser.parse_args()
+
+    # Cached replies would hide the LLM calls being measured
+    mcp_agent.llm_cache = None
+    counter = CountingLLM(mcp_agent.llm, args.stub_llm)
+    # Chains are built on every call from mcp_agent.llm, so swapping it in counts every LLM call
+    mcp_agent.llm = RunnableLambda(counter.invoke, afunc=counter.ainvoke)
+    agent = mcp_agent.create_agent_graph()
+
+    try:
+        results = {
+            "llm": f"stub ({args.stub_llm}s)" if args.stub_llm is not None else "real",
+            "with_fast_path": await run(agent, counter, True, args.repeat),
+            "without_fast_path": await run(agent, counter, False, args.repeat),
+        }
+    finally:
+        await mcp_agent.session.close()
+
+    print(f"LLM: {results['llm']}, {args.repeat} turns per request\n")
+    print(f"{'request':<40} {'LLM calls':>16} {'median turn (ms)':>22}")
+    print(f"{'':<40} {'fast':>7} {'LLM':>8} {'fast':>10} {'LLM':>11}")
+    for fast, slow in zip(results["with_fast_path"], results["without_fast_path"]):
+        print(f"{fast['request'][:40]:<40} {fast['llm_calls']:>7.1f} {slow['llm_calls']:>8.1f} "
+              f"{fast['latency_ms']:>10.1f} {slow['latency_ms']:>11.1f}")
+    print()
+    for mode in ("with_fast_path", "without_fast_path"):
+        rows = results[mode]
+        print(f"{mode.replace('_', ' ')}: {statistics.mean(row['llm_calls'] for row in rows):.2f} LLM calls per turn, "
+              f"{statistics.mean(row['latency_ms'] for row in rows):.1f} ms mean turn latency")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,132 @@
+import asyncio
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+# Methods that are safe to send again after the server may have seen them
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE"}
+
+# Responses worth retrying: the API is restarting or its pool is exhausted
+RETRY_STATUS_CODES = {502, 503, 504}
+
+
+class ApiClient:
+    """
+    Shared async HTTP client for the Chinook CRUD API.
+
+    One ``httpx.AsyncClient`` keeps a bounded pool of keep-alive connections
+    that every tool call reuses. ``max_concurrency`` caps the requests in
+    flight; callers over the limit wait for a slot instead of opening more
+    connections.
+
+    Failed requests are retried up to ``retries`` times with exponential
+    backoff and jitter. Connection errors are always retried, since the
+    request never reached the API. Timeouts and 502/503/504 responses are
+    retried only for idempotent methods, so a ``POST`` is never applied twice.
+
+    Callbacks in ``request_listeners`` are called after every attempt with
+    the method, path, response status (``None`` if no response arrived) and
+    duration in seconds.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 30.0,
+        max_concurrency: int = 16,
+        retries: int = 2,
+        backoff: float = 0.2,
+    ):
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {"requests": 0, "retries": 0, "failures": 0}
+        self.request_listeners: List[Callable[[str, str, Optional[int], float], None]] = []
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        # Connections and the semaphore belong to the loop that created them
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client
+
+    def _delay(self, attempt: int) -> float:
+        return self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    async def request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        client = self._ensure_client()
+        method = method.upper()
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                try:
+                    response = await self._send(client, method, path, kwargs)
+                except httpx.ConnectError:
+                    if attempt >= self.retries:
+                        self._stats["failures"] += 1
+                        raise
+                except httpx.TimeoutException:
+                    if method not in IDEMPOTENT_METHODS or attempt >= self.retries:
+                        self._stats["failures"] += 1
+                        raise
+                else:
+                    self._stats["requests"] += 1
+                    if (
+                        response.status_code not in RETRY_STATUS_CODES
+                        or method not in IDEMPOTENT_METHODS
+                        or attempt >= self.retries
+                    ):
+                        return response
+            # Back off outside the semaphore so waiting retries do not hold a slot
+            self._stats["retries"] += 1
+            await asyncio.sleep(self._delay(attempt))
+            attempt += 1
+
+    async def _send(self, client: httpx.AsyncClient, method: str, path: str, kwargs: Dict[str, Any]) -> httpx.Response:
+        started = time.perf_counter()
+        status = None
+        try:
+            response = await client.request(method, path, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            for listener in self.request_listeners:
+                listener(method, path, status, time.perf_counter() - started)
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        return await self.request("GET", path, params=params)
+
+    async def post(self, path: str, json: Any = None) -> httpx.Response:
+        return await self.request("POST", path, json=json)
+
+    async def put(self, path: str, json: Any = None) -> httpx.Response:
+        return await self.request("PUT", path, json=json)
+
+    async def delete(self, path: str, json: Any = None) -> httpx.Response:
+        return await self.request("DELETE", path, json=json)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"max_concurrency": self.max_concurrency, **self._stats}
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Dict, Optional
+
+from api_client import ApiClient
+
+# Query parameters that are not column filters, as understood by the CRUD API
+PAGING_PARAMS = ("limit", "offset", "cursor", "fields", "order_by", "expand")
+
+
+class BackendError(Exception):
+    """A failed call, carrying the HTTP status and body the CRUD API would have returned."""
+
+    def __init__(self, status_code: int, details: str):
+        super().__init__(f"{status_code}: {details}")
+        self.status_code = status_code
+        self.details = details
+
+
+class HttpBackend:
+    """Calls the CRUD API over HTTP through a shared ``ApiClient``."""
+
+    name = "http"
+
+    def __init__(self, client: ApiClient):
+        self.client = client
+
+    async def _call(self, method: str, path: str, params: Optional[Dict[str, Any]] = None, json: Any = None) -> Any:
+        response = await self.client.request(method, path, params=params, json=json)
+        if response.status_code != 200:
+            raise BackendError(response.status_code, response.text)
+        return response.json()
+
+    async def list_tables(self) -> Dict[str, Any]:
+        return await self._call("GET", "/")
+
+    async def get_records(self, table_name: str, params: Dict[str, Any]) -> Any:
+        return await self._call("GET", f"/{table_name}", params=params)
+
+    async def get_record(self, table_name: str, record_id: Any, params: Optional[Dict[str, Any]] = None) -> Any:
+        return await self._call("GET", f"/{table_name}/{record_id}", params=params)
+
+    async def get_records_by_ids(self, table_name: str, params: Dict[str, Any]) -> Any:
+        return await self._call("GET", f"/{table_name}", params=params)
+
+    async def describe_table(self, table_name: str) -> Any:
+        return await self._call("GET", f"/schema/{table_name}")
+
+    async def get_related_records(self, table_name: str, params: Dict[str, Any]) -> Any:
+        return await self._call("GET", f"/related/{table_name}", params=params)
+
+    async def aggregate_records(self, table_name: str, params: Dict[str, Any]) -> Any:
+        return await self._call("GET", f"/aggregate/{table_name}", params=params)
+
+    async def create_record(self, table_name: str, data: Dict[str, Any]) -> Any:
+        return await self._call("POST", f"/{table_name}", json=data)
+
+    async def update_record(self, table_name: str, record_id: Any, data: Dict[str, Any]) -> Any:
+        return await self._call("PUT", f"/{table_name}/{record_id}", json=data)
+
+    async def delete_record(self, table_name: str, record_id: Any) -> Any:
+        return await self._call("DELETE", f"/{table_name}/{record_id}")
+
+    async def bulk(self, operation: str, table_name: str, body: Dict[str, Any]) -> Any:
+        method = {"create": "POST", "update": "PUT", "delete": "DELETE"}[operation]
+        return await self._call(method, f"/bulk/{table_name}", json=body)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class LocalBackend:
+    """
+    Calls the CRUD API's ``Repository`` in this process, skipping HTTP and JSON.
+
+    The API package is imported from ``api_dir`` and configured by the same
+    ``CHINOOK_*`` variables as the API server; ``CHINOOK_DB_PATH`` defaults
+    to the ``chinook.db`` next to it. Database work runs in worker threads so
+    the event loop stays free, and concurrent tool calls share the API's
+    connection pool and single writer.
+    """
+
+    name = "local"
+
+    def __init__(self, api_dir: str):
+        api_dir = os.path.abspath(api_dir)
+        os.environ.setdefault("CHINOOK_DB_PATH", os.path.join(api_dir, "chinook.db"))
+        if api_dir not in sys.path:
+            sys.path.insert(0, api_dir)
+        import server
+        from db_pool import PoolExhaustedError
+        from repository import RepositoryError
+
+        self.server = server
+        self.repository = server.repository
+        self._errors = (RepositoryError, PoolExhaustedError)
+
+    async def _run(self, fn, *args, **kwargs) -> Any:
+        try:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        except self._errors as e:
+            status_code = getattr(e, "status_code", 503)
+            detail = getattr(e, "detail", str(e))
+            # Same body as the API's error responses, so tool results do not depend on the backend
+            raise BackendError(status_code, json.dumps({"detail": detail}, separators=(",", ":")))
+
+    def _split(self, params: Dict[str, Any], named: tuple):
+        options = {key: params[key] for key in named if key in params}
+        filters = [(key, value) for key, value in params.items() if key not in named]
+        return options, filters
+
+    async def list_tables(self) -> Dict[str, Any]:
+        tables = await self._run(self.repository.tables)
+        return {"message": "Chinook Database API", "tables": tables}
+
+    async def get_records(self, table_name: str, params: Dict[str, Any]) -> Any:
+        options, filters = self._split(params, PAGING_PARAMS)
+        return await self._run(self.repository.list_records, table_name, filters, **options)
+
+    async def get_record(self, table_name: str, record_id: Any, params: Optional[Dict[str, Any]] = None) -> Any:
+        return await self._run(self.repository.get_record, table_name, record_id, (params or {}).get("expand"))
+
+    async def get_records_by_ids(self, table_name: str, params: Dict[str, Any]) -> Any:
+        return await self._run(
+            self.repository.get_many, table_name, [params["ids"]], params.get("fields"), params.get("expand")
+        )
+
+    async def describe_table(self, table_name: str) -> Any:
+        return await self._run(self.repository.describe, table_name)
+
+    async def get_related_records(self, table_name: str, params: Dict[str, Any]) -> Any:
+        options, filters = self._split(params, PAGING_PARAMS + ("path",))
+        path = options.pop("path")
+        return await self._run(self.repository.related, table_name, path, filters, **options)
+
+    async def aggregate_records(self, table_name: str, params: Dict[str, Any]) -> Any:
+        options, filters = self._split(params, ("metrics", "group_by", "having", "order_by", "limit"))
+        return await self._run(self.repository.aggregate, table_name, filters=filters, **options)
+
+    async def create_record(self, table_name: str, data: Dict[str, Any]) -> Any:
+        return await self._run(self.repository.create, table_name, data)
+
+    async def update_record(self, table_name: str, record_id: Any, data: Dict[str, Any]) -> Any:
+        return await self._run(self.repository.update, table_name, record_id, data)
+
+    async def delete_record(self, table_name: str, record_id: Any) -> Any:
+        return await self._run(self.repository.delete, table_name, record_id)
+
+    async def bulk(self, operation: str, table_name: str, body: Dict[str, Any]) -> Any:
+        items = body["ids"] if operation == "delete" else body["records"]
+        return await self._run(self.repository.bulk, operation, table_name, items, body.get("mode", "atomic"))
+
+    async def aclose(self):
+        await asyncio.to_thread(self.server.pool.close)
+
+
+BACKENDS = {
+    "http": HttpBackend,
+    "local": LocalBackend,
+}
@@ -0,0 +1,92 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from result_compaction import estimate_tokens
+
+# summarize(previous_summary, messages) -> new summary covering both
+Summarizer = Callable[[Optional[str], List[BaseMessage]], Awaitable[str]]
+
+
+def message_tokens(message: BaseMessage) -> int:
+    # A few tokens of per-message overhead for the role and separators
+    return estimate_tokens(str(message.content)) + 4
+
+
+class ConversationHistory:
+    """
+    The conversation the agent sends to the LLM, bounded in turns and tokens.
+
+    A turn is a user message and everything the agent added in reply. The
+    newest turns are kept verbatim up to ``max_turns`` and ``max_tokens``.
+    Older turns are folded into a rolling summary by ``summarize``. Folding
+    stops at ``max_tokens // 2``, so the summarizer runs once every few turns
+    rather than on every turn.
+
+    Pinned messages (``pin(name, message)``) always follow the summary and
+    are never summarized. The agent pins its latest tool results there, so
+    result handles stay usable after their turn leaves the window.
+    """
+
+    def __init__(self, summarize: Summarizer, max_tokens: int = 6000, max_turns: int = 20):
+        self.summarize = summarize
+        self.max_tokens = max_tokens
+        self.max_turns = max_turns
+        self.summary: Optional[str] = None
+        self.turns: List[List[BaseMessage]] = []
+        self.pinned: Dict[str, BaseMessage] = {}
+        self.stats = {"turns": 0, "summarized_turns": 0, "summaries": 0}
+
+    def add_turn(self, messages: List[BaseMessage]):
+        """Record one turn: the user message and the agent's new messages, without system prompts."""
+        self.turns.append([message for message in messages if not isinstance(message, SystemMessage)])
+        self.stats["turns"] += 1
+
+    def pin(self, name: str, message: BaseMessage):
+        self.pinned[name] = message
+
+    def _summary_message(self) -> Optional[SystemMessage]:
+        if not self.summary:
+            return None
+        return SystemMessage(content=f"Summary of the earlier conversation:\n{self.summary}")
+
+    def messages(self, user_message: Optional[HumanMessage] = None) -> List[BaseMessage]:
+        """Summary, pinned messages and recent turns, followed by ``user_message`` if given."""
+        recent = [message for turn in self.turns for message in turn]
+        # A pinned message still inside the window is sent only once, in its turn
+        pinned = [message for message in self.pinned.values() if not any(message is other for other in recent)]
+        summary = self._summary_message()
+        context = ([summary] if summary is not None else []) + pinned + recent
+        if user_message is not None:
+            context.append(user_message)
+        return context
+
+    def tokens(self) -> int:
+        return sum(message_tokens(message) for message in self.messages())
+
+    async def compact(self):
+        """Fold the oldest turns into the summary once the window is over its turn or token limit."""
+        if len(self.turns) <= self.max_turns and self.tokens() <= self.max_tokens:
+            return
+        folded = []
+        # Always keep the latest turn verbatim, even if it alone is over budget
+        while len(self.turns) > 1 and (len(self.turns) > self.max_turns or self.tokens() > self.max_tokens // 2):
+            folded.extend(self.turns.pop(0))
+            self.stats["summarized_turns"] += 1
+        if not folded:
+            return
+        try:
+            self.summary = await self.summarize(self.summary, folded)
+        except Exception:
+            # Keep the user's requests at least, so the next summary can still mention them
+            requests = "; ".join(str(message.content)[:200] for message in folded if isinstance(message, HumanMessage))
+            self.summary = "\n".join(part for part in (self.summary, f"Earlier requests: {requests}") if part)
+        self.stats["summaries"] += 1
+
+    def clear(self):
+        self.summary = None
+        self.turns.clear()
+        self.pinned.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"window_turns": len(self.turns), "tokens": self.tokens(), "has_summary": bool(self.summary), **self.stats}
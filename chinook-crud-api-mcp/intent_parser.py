@@ -0,0 +1,141 @@
+import os
+import re
+from typing import Dict, List, Optional
+
+from tool_dag import ToolCall
+
+TABLES = [
+    "Album", "Artist", "Customer", "Employee", "Genre", "Invoice",
+    "InvoiceLine", "MediaType", "Playlist", "PlaylistTrack", "Track",
+]
+
+# Tables keyed by more than one column; "artist 5" style phrasings do not apply to them
+COMPOSITE_KEY_TABLES = {"PlaylistTrack"}
+
+# The column a "named ..." / "rename ... to ..." phrasing sets
+NAME_COLUMNS = {"Album": "Title", "Artist": "Name", "Genre": "Name", "MediaType": "Name", "Playlist": "Name", "Track": "Name"}
+
+# Tables a record can be created in from a name alone; the others have required columns besides it
+CREATE_BY_NAME_TABLES = {"Artist", "Genre", "MediaType", "Playlist"}
+
+# Largest page the CRUD API serves (its CHINOOK_MAX_PAGE_SIZE); "show the first 99999999 tracks" gets this many
+MAX_LIMIT = int(os.environ.get("CHINOOK_MAX_PAGE_SIZE", "10000"))
+
+# A bare name running into another clause ("Foo and delete artist 3") is really a compound request
+_COMPOUND = re.compile(
+    r"[,;]|\b(?:and|then|also)\b"
+    r"|\b(?:create|add|insert|update|change|modify|rename|delete|remove|set|get|show|list|find|fetch|display)\b",
+    re.IGNORECASE,
+)
+
+_POLITE_PREFIX = re.compile(
+    r"^(?:(?:please|can you|could you|would you|i want to|i'd like to|i would like to|let's)\s+)+", re.IGNORECASE
+)
+_POLITE_SUFFIX = re.compile(r"(?:\s+please)?\s*[?.!]*$", re.IGNORECASE)
+
+
+def _aliases(table: str) -> List[str]:
+    """Ways a table is written in a request: ``InvoiceLine`` as invoiceline(s), invoice line(s), invoice_line(s)."""
+    words = re.findall(r"[A-Z][a-z]*", table)
+    forms = {table.lower(), " ".join(words).lower(), "_".join(words).lower()}
+    return sorted(forms | {form + "s" for form in forms}, key=len, reverse=True)
+
+
+class IntentParser:
+    """
+    Maps common CRUD phrasings straight to tool calls, without an LLM.
+
+    Each rule is a regular expression that must match the whole request,
+    after polite prefixes and suffixes are removed. Arguments are typed:
+    IDs and limits become ints, limits are capped at ``MAX_LIMIT``, and names
+    keep their original case. ``parse`` returns ``None`` when no rule
+    matches. Such requests, any request with extra conditions ("artists
+    with more than 3 albums") and unquoted names that run into another
+    clause ("Foo and delete artist 3") are left to the LLM planner.
+    """
+
+    def __init__(self, tables: Optional[List[str]] = None):
+        self.tables = tables or TABLES
+        self._table_by_alias: Dict[str, str] = {}
+        for table in self.tables:
+            for alias in _aliases(table):
+                self._table_by_alias[alias] = table
+        table = "(?P<table>" + "|".join(re.escape(alias) for alias in sorted(self._table_by_alias, key=len, reverse=True)) + ")"
+        record = r"(?:\s+(?:with\s+)?(?:the\s+)?(?:id|number|no\.?)\s*|\s*#\s*|\s+)(?P<id>\d+)"
+        value = r"""(?:'(?P<sq>[^']+)'|"(?P<dq>[^"]+)"|(?P<bare>\S.*))"""
+        read = r"(?:get|show|find|fetch|display|look\s*up|give|retrieve)(?:\s+me)?"
+        rule = lambda pattern: re.compile(r"^" + pattern + r"$", re.IGNORECASE)
+        self._rules = [
+            ("list_tables", rule(
+                r"(?:(?:list|show|get|display|what\s+are)(?:\s+me)?(?:\s+all)?(?:\s+the)?(?:\s+available)?\s+tables"
+                r"(?:\s+(?:in|of)\s+the\s+database)?|what\s+tables\s+(?:are\s+there|exist|do\s+you\s+have))"
+            )),
+            ("describe_table", rule(r"describe(?:\s+the)?(?:\s+table)?\s+" + table + r"(?:\s+table)?")),
+            ("describe_table", rule(
+                r"(?:show|get|display|what\s+are|list)(?:\s+me)?\s+(?:the\s+)?(?:schema|columns|structure|fields)\s+(?:of|for|in)\s+"
+                r"(?:the\s+)?(?:table\s+)?" + table + r"(?:\s+table)?"
+            )),
+            ("get_records_by_ids", rule(
+                read + r"(?:\s+the)?\s+" + table + r"(?:\s+with)?(?:\s+ids?)?\s+(?P<ids>\d+(?:\s*(?:,|and|,\s*and)\s*\d+)+)"
+            )),
+            ("get_record", rule(
+                r"(?:" + read + r"(?:\s+the)?(?:\s+details|\s+info(?:rmation)?)?(?:\s+(?:for|of|on|about))?(?:\s+the)?\s+)?" + table + record
+            )),
+            ("get_all_records", rule(
+                r"(?:list|show|get|display|fetch)(?:\s+me)?(?:\s+all)?(?:\s+the)?(?:\s+(?:first|top))?(?:\s+(?P<limit>\d+))?"
+                r"(?:\s+records\s+(?:from|in|of)(?:\s+the)?)?\s+" + table + r"(?:\s+table)?(?:\s+records)?"
+            )),
+            ("delete_record", rule(r"(?:delete|remove)(?:\s+the)?\s+" + table + record)),
+            ("create_record", rule(
+                r"(?:create|add|insert)(?:\s+an?)?(?:\s+new)?\s+" + table
+                + r"\s+(?:named|called|with\s+(?:the\s+)?name(?:\s+of)?)\s+" + value
+            )),
+            ("update_record", rule(
+                r"(?P<verb>update|change|modify|rename)\s+" + table + record
+                + r"(?:\s+to\s+have\s+the\s+name|\s+to\s+be\s+(?:named|called)|\s+name\s+to|'s\s+name\s+to|(?P<to>\s+to))\s+" + value
+            )),
+            ("update_record", rule(r"(?:set|change|update)\s+the\s+name\s+of\s+" + table + record + r"\s+to\s+" + value)),
+        ]
+
+    def parse(self, text: str) -> Optional[List[ToolCall]]:
+        text = _POLITE_SUFFIX.sub("", _POLITE_PREFIX.sub("", text.strip()))
+        for tool, pattern in self._rules:
+            match = pattern.match(text)
+            if match is None:
+                continue
+            args = self._arguments(tool, match)
+            if args is not None:
+                return [ToolCall(id="call1", tool=tool, args=args)]
+        return None
+
+    def _arguments(self, tool: str, match: re.Match) -> Optional[Dict]:
+        groups = match.groupdict()
+        table = self._table_by_alias.get((groups.get("table") or "").lower())
+        if tool == "list_tables":
+            return {}
+        if table is None:
+            return None
+        if tool == "describe_table":
+            return {"table_name": table}
+        if tool == "get_all_records":
+            if not groups.get("limit"):
+                return {"table_name": table}
+            limit = int(groups["limit"])
+            return {"table_name": table, "limit": min(limit, MAX_LIMIT)} if limit > 0 else None
+        if table in COMPOSITE_KEY_TABLES:
+            return None
+        if tool == "get_records_by_ids":
+            return {"table_name": table, "ids": [int(i) for i in re.findall(r"\d+", groups["ids"])]}
+        if tool in ("get_record", "delete_record"):
+            return {"table_name": table, "record_id": int(groups["id"])}
+        name = groups.get("sq") or groups.get("dq") or (groups.get("bare") or "").strip()
+        if not name or (groups.get("bare") and _COMPOUND.search(name)):
+            return None
+        if tool == "create_record" and table in CREATE_BY_NAME_TABLES:
+            return {"table_name": table, "data": {NAME_COLUMNS[table]: name}}
+        # "update track 5 to genre 3" is not a rename; a bare "to" only names the record after "rename" or in quotes
+        if tool == "update_record" and groups.get("to") and groups.get("bare") and groups.get("verb", "").lower() != "rename":
+            return None
+        if tool == "update_record" and table in NAME_COLUMNS:
+            return {"table_name": table, "record_id": int(groups["id"]), "data": {NAME_COLUMNS[table]: name}}
+        return None
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from langchain_core.messages import BaseMessage
+
+EMBEDDING_DIMENSIONS = 512
+
+# Numbers and quoted strings; two questions are only similar if these are identical
+_LITERALS = re.compile(r"\d+(?:\.\d+)?|'[^']*'|\"[^\"]*\"")
+_WORDS = re.compile(r"[a-z]+")
+
+# Filler that changes the wording of a request but not its meaning
+STOPWORDS = frozenset(
+    "a an the me my us our please can could would will you i we want like to of for in on is are "
+    "do does all any some this that these those there give just".split()
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    chain TEXT NOT NULL,
+    context TEXT NOT NULL,
+    literals TEXT NOT NULL,
+    question TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    response TEXT NOT NULL,
+    tables TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_similar ON llm_cache (chain, context, literals);
+CREATE INDEX IF NOT EXISTS llm_cache_used ON llm_cache (used_at);
+"""
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split()).rstrip("?.! ")
+
+
+def hashed_embedding(text: str) -> List[float]:
+    """
+    Local embedding: hashed word and character-trigram counts, L2-normalized.
+
+    Needs no model, and is close for rephrasings that share their content
+    words ("show me all artists" / "show all the artists").
+    """
+    vector = [0.0] * EMBEDDING_DIMENSIONS
+    text = text.lower()
+    words = [word for word in _WORDS.findall(text) if word not in STOPWORDS]
+    features = [f"w:{word}" for word in words]
+    for word in words:
+        padded = f" {word} "
+        features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode(), digest_size=4).digest()
+        vector[int.from_bytes(digest, "little") % EMBEDDING_DIMENSIONS] += 1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-level cache of LLM replies, stored in SQLite so it survives restarts.
+
+    The cache key separates the user's question from its context. The
+    context is every other prompt message: the system prompt, tool list,
+    history and tool results. Level one is an exact match on the chain,
+    the context and the normalized question. Level two finds an earlier
+    question with the same chain and context whose embedding has a cosine
+    similarity of at least ``similarity``. The two questions must also
+    contain the same numbers and quoted strings, so "get artist 5" never
+    answers "get artist 6". Callers turn level two off for replies that
+    must not be reused for a merely similar question, such as tool plans.
+
+    Entries expire ``ttl`` seconds after they are written. Once there are
+    more than ``max_entries``, the least recently used are dropped.
+    ``invalidate(table)`` drops every entry whose answer was built from
+    that table's data.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = 3600.0,
+        max_entries: int = 2000,
+        similarity: float = 0.92,
+        embed: Callable[[str], List[float]] = hashed_embedding,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.embed = embed
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self.stats = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "stores": 0, "invalidated": 0}
+
+    def _keys(self, chain: str, messages: List[BaseMessage], question: str):
+        # The question is matched separately, so it is left out of the context
+        context = [(message.type, str(message.content)) for message in messages if str(message.content) != question]
+        question = normalize(question)
+        context_hash = _digest(context)
+        literals = _digest(sorted(_LITERALS.findall(question)))
+        return _digest([chain, context_hash, question]), context_hash, literals, question
+
+    def get(self, chain: str, messages: List[BaseMessage], question: str, similar: bool = True) -> Optional[str]:
+        """The cached reply to ``question``; with ``similar=False`` only an exact match counts."""
+        key, context, literals, question = self._keys(chain, messages, question)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE llm_cache SET used_at = ? WHERE key = ?", (now, key))
+                self.stats["exact_hits"] += 1
+                return row[0]
+            candidates = similar and self._conn.execute(
+                "SELECT key, embedding, response FROM llm_cache"
+                " WHERE chain = ? AND context = ? AND literals = ? AND created_at > ?",
+                (chain, context, literals, now - self.ttl),
+            ).fetchall()
+            if candidates:
+                embedding = self.embed(question)
+                best, best_score = None, self.similarity
+                for candidate_key, blob, response in candidates:
+                    score = sum(a * b for a, b in zip(embedding, array("f", blob)))
+                    if score >= best_score:
+                        best, best_score = (candidate_key, response), score
+                if best is not None:
+                    self._conn.execute("UPDATE llm_cache SET used_at = ? WHERE key = ?", (now, best[0]))
+                    self.stats["similar_hits"] += 1
+                    return best[1]
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, chain: str, messages: List[BaseMessage], question: str, response: str, tables: Iterable[str] = ()):
+        key, context, literals, question = self._keys(chain, messages, question)
+        embedding = array("f", self.embed(question)).tobytes()
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, chain, context, literals, question, embedding, response, json.dumps(sorted(set(tables))), now, now),
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN"
+                " (SELECT key FROM llm_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.stats["stores"] += 1
+
+    def invalidate(self, table: str):
+        """Drop every answer built from ``table``; called after a tool changed its data."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_cache WHERE EXISTS (SELECT 1 FROM json_each(llm_cache.tables) WHERE value = ?)",
+                (table,),
+            )
+            self.stats["invalidated"] += cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {"entries": entries, **self.stats}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
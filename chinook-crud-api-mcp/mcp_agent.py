@@ -3,19 +3,28 @@
 
 import asyncio
 import json
+import os
 import sys
+import time
 from typing import Dict, List, Any, Optional, TypedDict, Annotated
 
-from fastmcp import Client
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, END
 from litellm import completion
 from langchain_core.language_models import BaseChatModel
 from langchain_community.chat_models import ChatOpenAI
 
+from history import ConversationHistory
+from intent_parser import IntentParser
+from llm_cache import LLMCache
+from mcp_session import READ_ONLY_TOOLS, MCPSession
+from result_compaction import ResultStore, compact_result
+from tool_dag import PlanError, ToolCall, parse_plan, run_plan
+
 llm = ChatOpenAI(
     model="US Claude 3.7 Sonnet By Anthropic (Served via LiteLLM)",
     temperature=0.1,
@@ -26,12 +35,51 @@ llm = ChatOpenAI(
 # MCP client setup
 MCP_URL = "http://localhost:52796/mcp"
 
+# One MCP session per agent process, reused by every tool call
+session = MCPSession(MCP_URL)
+
+# Tool plans: most calls in one plan, and most of them running at once
+MAX_PLAN_CALLS = int(os.environ.get("CHINOOK_AGENT_MAX_PLAN_CALLS", "8"))
+MAX_PARALLEL_TOOLS = int(os.environ.get("CHINOOK_AGENT_MAX_PARALLEL_TOOLS", "4"))
+
+# Tool results: tokens of results sent to the LLM per turn, and how many full results are kept for paging
+RESULT_TOKEN_BUDGET = int(os.environ.get("CHINOOK_AGENT_RESULT_TOKENS", "4000"))
+RESULT_STORE_SIZE = int(os.environ.get("CHINOOK_AGENT_RESULT_STORE_SIZE", "32"))
+
+result_store = ResultStore(RESULT_STORE_SIZE)
+
+# Simple CRUD requests are turned into tool calls by rules, skipping the planning LLM call
+FAST_PATH = os.environ.get("CHINOOK_AGENT_FAST_PATH", "1") != "0"
+intent_parser = IntentParser()
+
+# LLM replies cached on disk, matched exactly or by question similarity; an empty path turns the cache off
+LLM_CACHE_PATH = os.environ.get("CHINOOK_AGENT_LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.db"))
+LLM_CACHE_TTL = float(os.environ.get("CHINOOK_AGENT_LLM_CACHE_TTL", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("CHINOOK_AGENT_LLM_CACHE_MAX_ENTRIES", "2000"))
+LLM_CACHE_SIMILARITY = float(os.environ.get("CHINOOK_AGENT_LLM_CACHE_SIMILARITY", "0.92"))
+
+llm_cache = LLMCache(LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_SIMILARITY) if LLM_CACHE_PATH else None
+
+# Streaming: get_all_records calls above this many rows are fetched page by page, and turn timings are printed
+STREAM_PAGE_ROWS = int(os.environ.get("CHINOOK_AGENT_STREAM_PAGE_ROWS", "500"))
+SHOW_TIMINGS = os.environ.get("CHINOOK_AGENT_SHOW_TIMINGS", "1") != "0"
+
+# Conversation history: tokens and turns kept verbatim, and the length of the summary of older turns
+HISTORY_TOKENS = int(os.environ.get("CHINOOK_AGENT_HISTORY_TOKENS", "6000"))
+HISTORY_TURNS = int(os.environ.get("CHINOOK_AGENT_HISTORY_TURNS", "20"))
+SUMMARY_WORDS = int(os.environ.get("CHINOOK_AGENT_SUMMARY_WORDS", "200"))
+
+# Answered by the agent from result_store rather than by the MCP server
+READ_RESULT_TOOL = {
+    "name": "read_result",
+    "description": "Pages through a tool result that was too large to show in full (params: handle, offset, limit, fields)"
+}
+
 # Define state
 class AgentState(TypedDict):
     messages: List[Any]
-    current_tool: Optional[str]
-    tool_args: Optional[Dict]
-    tool_result: Optional[str]
+    tool_calls: Optional[List[Dict]]
+    tool_results: Optional[List[Dict]]
     mcp_tools: Optional[List[Dict]]
 
 # System prompt
@@ -64,38 +112,68 @@ Always be helpful, clear, and concise in your responses.
 # Tool descriptions
 TOOL_DESCRIPTIONS = {
     "list_tables": "Lists all available tables in the database",
-    "get_all_records": "Gets all records from a specific table (params: table_name, limit)",
-    "get_record": "Gets a specific record by ID from a table (params: table_name, record_id)",
+    "get_all_records": "Gets records from a specific table (params: table_name, limit, filters, fields, order_by, expand)",
+    "get_record": "Gets a specific record by ID from a table (params: table_name, record_id, expand)",
+    "get_records_by_ids": "Gets several records by ID in one query and lists missing IDs (params: table_name, ids, fields, expand)",
+    "describe_table": "Describes a table's columns, keys and relations (params: table_name)",
+    "get_related_records": "Follows relations from matching rows to related rows in one query (params: table_name, path, filters, fields)",
+    "aggregate_records": "Computes counts, sums and averages per group inside the database (params: table_name, metrics, group_by, filters, order_by, limit)",
     "create_record": "Creates a new record in a table (params: table_name, data)",
     "update_record": "Updates an existing record in a table (params: table_name, record_id, data)",
-    "delete_record": "Deletes a record from a table (params: table_name, record_id)"
+    "delete_record": "Deletes a record from a table (params: table_name, record_id)",
+    "bulk_create_records": "Creates many records in one transaction (params: table_name, records, mode)",
+    "bulk_update_records": "Updates many records in one transaction (params: table_name, records, mode)",
+    "bulk_delete_records": "Deletes many records in one transaction (params: table_name, ids, mode)",
+    "read_result": READ_RESULT_TOOL["description"]
 }
 
-# Function to get available MCP tools
+# Function to get available MCP tools (cached by the session)
 async def get_mcp_tools():
-    client = Client(MCP_URL)
-    tools = []
-    
-    async with client:
-        tools = await client.list_tools()
-    
-    return [{"name": tool.name, "description": tool.description} for tool in tools]
+    return await session.list_tools()
 
 # Function to execute MCP tool
 async def execute_mcp_tool(tool_name: str, args: Dict = None):
     if args is None:
         args = {}
     
-    client = Client(MCP_URL)
-    result = None
+    result = await session.call_tool(tool_name, args)
     
-    async with client:
-        result = await client.call_tool(tool_name, args)
-    
-    if result and len(result) > 0:
-        return result[0].text
+    if result and result.content:
+        return result.content[0].text
     return "No result returned"
 
+# Function to fetch a large get_all_records result as a stream of keyset pages
+async def stream_records(args: Dict):
+    """
+    Fetch ``limit`` rows ``STREAM_PAGE_ROWS`` at a time, reporting each page to the output stream.
+
+    Returns the same list one get_all_records call would, but the user sees
+    progress while a large result arrives.
+    """
+    writer = get_stream_writer()
+    limit = args["limit"]
+    records, cursor = [], ""
+    while cursor is not None and len(records) < limit:
+        page_args = {**args, "limit": min(STREAM_PAGE_ROWS, limit - len(records)), "cursor": cursor}
+        page = json.loads(await execute_mcp_tool("get_all_records", page_args))
+        if "error" in page:
+            return json.dumps(page)
+        records.extend(page["records"])
+        cursor = page["next_cursor"]
+        writer({"tool_progress": {"tool": "get_all_records", "table_name": args["table_name"], "rows": len(records), "limit": limit}})
+    return json.dumps(records)
+
+# Function to execute a planned call: read_result locally, large pages streamed, everything else through MCP
+async def execute_agent_tool(tool_name: str, args: Dict = None):
+    args = args or {}
+    if tool_name == READ_RESULT_TOOL["name"]:
+        return json.dumps(result_store.page(**args), separators=(",", ":"))
+    # Keyset pages cannot be combined with offset, order_by or a caller's own cursor
+    pageable = "cursor" not in args and not args.get("offset") and not args.get("order_by")
+    if tool_name == "get_all_records" and pageable and isinstance(args.get("limit"), int) and args["limit"] > STREAM_PAGE_ROWS:
+        return await stream_records(args)
+    return await execute_mcp_tool(tool_name, args)
+
 # Define the agent nodes
 def agent_prompt(state: AgentState):
     """Generate agent prompt based on the current state."""
@@ -112,32 +190,91 @@ def agent_prompt(state: AgentState):
     else:
         system_message = SystemMessage(content=SYSTEM_PROMPT)
     
-    # Add tool result if available
-    if state.get("tool_result"):
-        tool_name = state.get("current_tool", "unknown")
-        tool_args = state.get("tool_args", {})
-        
-        # Format the tool result in a readable way
-        try:
-            result_json = json.loads(state["tool_result"])
-            formatted_result = json.dumps(result_json, indent=2)
-        except:
-            formatted_result = state["tool_result"]
-        
-        tool_message = AIMessage(content=f"I executed the '{tool_name}' tool with arguments: {json.dumps(tool_args, indent=2)}\n\nResult:\n```json\n{formatted_result}\n```")
-        
+    # Add tool results if available
+    if state.get("tool_results"):
         # Add the tool message before generating the response
-        all_messages = [system_message] + messages + [tool_message]
+        all_messages = [system_message] + messages + [tool_results_message(state["tool_results"])]
     else:
         all_messages = [system_message] + messages
     
     return {"messages": all_messages}
 
+def tool_results_message(tool_results: List[Dict]) -> AIMessage:
+    """One message holding the arguments and result of every call in the plan."""
+    # Results share the token budget; each one is compacted to fit its part
+    budget = RESULT_TOKEN_BUDGET // max(1, len(tool_results))
+    sections = []
+    for outcome in tool_results:
+        header = f"I executed the '{outcome['tool']}' tool (call '{outcome['id']}') with arguments: {json.dumps(outcome.get('args', {}))}"
+        if "error" in outcome:
+            sections.append(f"{header}\n\nError:\n{outcome['error']}")
+            continue
+        
+        formatted_result = compact_result(outcome["result"], budget, outcome.get("handle"))
+        sections.append(f"{header}\n\nResult:\n```\n{formatted_result}\n```")
+    return AIMessage(content="\n\n".join(sections), name="tool_results")
+
+def latest_user_message(messages: List[Any]) -> str:
+    return next((message.content for message in reversed(messages) if message.type == "human"), "")
+
+def fast_path_plan(messages: List[Any]) -> Optional[List[ToolCall]]:
+    """Tool calls for the latest user message if it is a simple CRUD request, else None."""
+    if not FAST_PATH:
+        return None
+    user_message = latest_user_message(messages)
+    return intent_parser.parse(user_message) if user_message else None
+
+async def cached_chain(
+    name: str,
+    prompt: ChatPromptTemplate,
+    inputs: Dict,
+    question: str,
+    tables: List[str] = (),
+    stream: bool = False,
+    cache: bool = True,
+    similar: bool = True,
+) -> str:
+    """
+    Run ``prompt | llm | StrOutputParser()``, answering from llm_cache when it can.
+    
+    With ``stream`` the reply is sent to the graph's output stream token by
+    token as the LLM produces it (a cached reply is sent in one piece).
+    With ``similar=False`` only an exact match of the question is served.
+    """
+    prompt_value = await prompt.ainvoke(inputs)
+    messages = prompt_value.to_messages()
+    writer = get_stream_writer() if stream else None
+    use_cache = cache and llm_cache is not None
+    if use_cache:
+        cached = await asyncio.to_thread(llm_cache.get, name, messages, question, similar)
+        if cached is not None:
+            if writer:
+                writer({"token": cached})
+            return cached
+    
+    chain = llm | StrOutputParser()
+    if writer:
+        chunks = []
+        async for chunk in chain.astream(prompt_value):
+            chunks.append(chunk)
+            writer({"token": chunk})
+        result = "".join(chunks)
+    else:
+        result = await chain.ainvoke(prompt_value)
+    
+    if use_cache:
+        await asyncio.to_thread(llm_cache.put, name, messages, question, result, tables)
+    return result
+
 def should_use_tool(state: AgentState) -> str:
     """Determine if a tool should be used based on the last message."""
     last_message = state["messages"][-1]
     
     if last_message.type == "human":
+        # Requests the fast path understands always use their tool ("describe Track" has no keyword below)
+        if fast_path_plan(state["messages"]):
+            return "select_tool"
+        
         # Check if the user is asking for data or performing an operation
         content = last_message.content.lower()
         data_keywords = ["list", "show", "get", "find", "search", "query", "display", "fetch"]
@@ -146,126 +283,153 @@ def should_use_tool(state: AgentState) -> str:
         if any(keyword in content for keyword in data_keywords + modify_keywords):
             return "select_tool"
     
-    # If there's a tool result, we should format the response
-    if state.get("tool_result"):
+    # If there are tool results, we should format the response
+    if state.get("tool_results"):
         return "format_response"
     
     # Default to direct response
     return "respond"
 
-def select_tool(state: AgentState):
+async def select_tool(state: AgentState):
     """Select the appropriate tool based on user input."""
     messages = state["messages"]
-    mcp_tools = state.get("mcp_tools", [])
+    mcp_tools = state.get("mcp_tools") or []
+    
+    # Simple requests need no LLM call
+    calls = fast_path_plan(messages)
+    if calls:
+        return {"tool_calls": [call.__dict__ for call in calls]}
     
     # Create a prompt to select the tool
     tool_selection_prompt = ChatPromptTemplate.from_messages([
         SystemMessage(content=f"""
 You are an assistant that helps select the appropriate tool based on user input.
 Available tools:
-{json.dumps(mcp_tools, indent=2)}
+{json.dumps(mcp_tools + [READ_RESULT_TOOL], indent=2)}
 
 Your task is to:
 1. Analyze the user's request
-2. Select the most appropriate tool from the available tools
-3. Provide the necessary arguments for the tool in JSON format
+2. Plan every tool call needed to answer it, at most {MAX_PLAN_CALLS} calls
+3. Provide the necessary arguments for each call in JSON format
 
-Respond with a JSON object containing:
+Respond with a JSON object listing the calls. Give each call an "id". Calls
+that do not depend on each other run at the same time. When a call needs
+the result of another, use "$<id>.<field>" as the argument value; "*" maps
+over a list, so "$albums.*.AlbumId" is the AlbumId of every returned row.
+For example:
 {{
-  "tool": "tool_name",
-  "args": {{
-    "arg1": "value1",
-    "arg2": "value2"
-  }}
+  "calls": [
+    {{"id": "artist", "tool": "get_all_records", "args": {{"table_name": "Artist", "filters": {{"Name": "AC/DC"}}}}}},
+    {{"id": "albums", "tool": "get_all_records", "args": {{"table_name": "Album", "filters": {{"ArtistId": "$artist.0.ArtistId"}}}}}},
+    {{"id": "genres", "tool": "get_all_records", "args": {{"table_name": "Genre"}}}}
+  ]
 }}
+Add "depends_on": ["<id>", ...] to a call that must wait for others without using their results.
 """),
         MessagesPlaceholder(variable_name="messages"),
-        HumanMessage(content="Based on the conversation above, which tool should I use and what arguments should I provide? Respond in JSON format only.")
+        HumanMessage(content="Based on the conversation above, which tools should I call and with what arguments? Respond in JSON format only.")
     ])
     
-    # Create a chain to select the tool
-    chain = tool_selection_prompt | llm | StrOutputParser()
-    
-    # Run the chain
-    result = chain.invoke({"messages": messages})
+    # Run the chain; a plan depends only on the request, not on data, so it is kept across writes.
+    # Plans are only reused for the same request: a similar one may need a different tool, and
+    # serving a cached delete or update plan for a read would change data nobody asked to change.
+    result = await cached_chain("select_tool", tool_selection_prompt, {"messages": messages}, latest_user_message(messages), similar=False)
     
     try:
-        # Parse the result
-        tool_selection = json.loads(result)
+        # Parse the result into a plan of tool calls
+        calls = parse_plan(result, max_calls=MAX_PLAN_CALLS)
         
-        # Update the state with the selected tool and arguments
-        return {
-            "current_tool": tool_selection.get("tool"),
-            "tool_args": tool_selection.get("args", {})
-        }
-    except json.JSONDecodeError:
-        # If the result is not valid JSON, return an error
+        # Update the state with the planned calls
+        return {"tool_calls": [call.__dict__ for call in calls]}
+    except PlanError as e:
+        # If the plan cannot be run, report the error instead
         return {
-            "current_tool": None,
-            "tool_args": None,
-            "tool_result": "Error: Could not parse tool selection"
+            "tool_calls": None,
+            "tool_results": [{"id": "plan", "tool": "plan", "args": {}, "error": f"Could not parse tool selection: {e}"}]
         }
 
 async def execute_tool(state: AgentState):
-    """Execute the selected tool with the provided arguments."""
-    tool_name = state.get("current_tool")
-    tool_args = state.get("tool_args", {})
+    """Run the planned tool calls, independent ones concurrently."""
+    calls = [ToolCall(**call) for call in state.get("tool_calls") or []]
     
-    if not tool_name:
-        return {"tool_result": "Error: No tool selected"}
+    if not calls:
+        return {"tool_results": state.get("tool_results") or [{"id": "plan", "tool": "plan", "args": {}, "error": "No tool selected"}]}
     
-    try:
-        # Execute the tool
-        result = await execute_mcp_tool(tool_name, tool_args)
+    outcomes = await run_plan(calls, execute_agent_tool, max_concurrency=MAX_PARALLEL_TOOLS)
+    
+    # Keep each full result so the agent can page through what compaction leaves out
+    tool_results = [outcome.to_dict() for outcome in outcomes]
+    for result in tool_results:
+        if "result" in result and result["tool"] != READ_RESULT_TOOL["name"]:
+            result["handle"] = result_store.put(result["result"])
         
-        # Update the state with the tool result
-        return {"tool_result": result}
-    except Exception as e:
-        # If there's an error, return the error message
-        return {"tool_result": f"Error executing tool: {str(e)}"}
+        # Cached answers built from a table are stale once a tool has changed it
+        changed = result["tool"] not in READ_ONLY_TOOLS and result["tool"] != READ_RESULT_TOOL["name"]
+        if changed and llm_cache is not None and "result" in result and "table_name" in result.get("args", {}):
+            llm_cache.invalidate(result["args"]["table_name"])
+    
+    # Update the state with every call's result
+    return {"tool_results": tool_results}
 
-def format_response(state: AgentState):
-    """Format the response based on the tool result."""
-    # The agent_prompt function already adds the tool result to the messages
-    # So we just need to generate a response
+async def format_response(state: AgentState):
+    """Format one response from the results of every tool call in the plan."""
+    # Tools run after agent_prompt, so their results are added here
+    messages = state["messages"] + [tool_results_message(state.get("tool_results") or [])]
     
     response_prompt = ChatPromptTemplate.from_messages([
         MessagesPlaceholder(variable_name="messages"),
-        HumanMessage(content="Please provide a helpful response based on the tool execution result.")
+        HumanMessage(content="Please provide a helpful response based on the tool execution results.")
     ])
     
-    # Create a chain to generate the response
-    chain = response_prompt | llm | StrOutputParser()
-    
-    # Run the chain
-    result = chain.invoke({"messages": state["messages"]})
+    # Run the chain; the answer is dropped from the cache when a tool changes one of the tables it read
+    tool_results = state.get("tool_results") or []
+    tables = sorted({result["args"]["table_name"] for result in tool_results if isinstance(result.get("args"), dict) and "table_name" in result["args"]})
+    question = latest_user_message(state["messages"])
+    # Errors may be transient, so an answer built on one is not worth keeping
+    cache = not any("error" in result for result in tool_results)
+    result = await cached_chain("format_response", response_prompt, {"messages": messages}, question, tables, stream=True, cache=cache)
     
     # Add the response to the messages
     return {
-        "messages": state["messages"] + [AIMessage(content=result)],
-        "current_tool": None,
-        "tool_args": None,
-        "tool_result": None
+        "messages": messages + [AIMessage(content=result)],
+        "tool_calls": None,
+        "tool_results": None
     }
 
-def respond(state: AgentState):
+async def respond(state: AgentState):
     """Generate a direct response without using tools."""
     response_prompt = ChatPromptTemplate.from_messages([
         SystemMessage(content=SYSTEM_PROMPT),
         MessagesPlaceholder(variable_name="messages")
     ])
     
-    # Create a chain to generate the response
-    chain = response_prompt | llm | StrOutputParser()
-    
     # Run the chain
-    result = chain.invoke({"messages": state["messages"]})
+    result = await cached_chain("respond", response_prompt, {"messages": state["messages"]}, latest_user_message(state["messages"]), stream=True)
     
     # Add the response to the messages
     return {
         "messages": state["messages"] + [AIMessage(content=result)]
     }
 
+async def summarize_history(previous_summary: Optional[str], messages: List[Any]) -> str:
+    """Fold turns leaving the history window into the rolling summary."""
+    transcript = "\n".join(f"{message.type}: {message.content}" for message in messages)
+    if previous_summary:
+        transcript = f"Summary so far:\n{previous_summary}\n\nNewer messages:\n{transcript}"
+    
+    summary_prompt = ChatPromptTemplate.from_messages([
+        SystemMessage(content=f"""
+You summarize a conversation between a user and an agent working on the Chinook Database.
+The summary replaces these messages in the agent's memory, so keep what later requests
+may refer to: table names, record IDs, values the user supplied, records that were
+created, updated or deleted, and result handles such as r3. At most {SUMMARY_WORDS} words.
+"""),
+        ("human", "{transcript}")
+    ])
+    
+    chain = summary_prompt | llm | StrOutputParser()
+    return await chain.ainvoke({"transcript": transcript})
+
 # Create the graph
 def create_agent_graph():
     workflow = StateGraph(AgentState)
@@ -313,39 +477,81 @@ async def main():
     # Create the agent
     agent = create_agent_graph()
     
+    # Only recent turns are resent to the LLM; older ones live on as a summary
+    history = ConversationHistory(summarize_history, max_tokens=HISTORY_TOKENS, max_turns=HISTORY_TURNS)
+    
     # Initialize the state
     state = {
         "messages": [],
-        "current_tool": None,
-        "tool_args": None,
-        "tool_result": None,
+        "tool_calls": None,
+        "tool_results": None,
         "mcp_tools": mcp_tools
     }
     
     print("\nMCP Agent is ready! Type 'exit' to quit.\n")
     
     # Main loop
-    while True:
-        # Get user input
-        user_input = input("You: ")
-        
-        if user_input.lower() in ["exit", "quit"]:
-            print("Goodbye!")
-            break
-        
-        # Add the user message to the state
-        state["messages"].append(HumanMessage(content=user_input))
-        
-        # Run the agent
-        result = await agent.ainvoke(state)
-        
-        # Update the state
-        state = result
-        
-        # Print the agent's response
-        if state["messages"] and state["messages"][-1].type == "ai":
-            print("\nAgent:", state["messages"][-1].content)
-            print()
+    try:
+        while True:
+            # Get user input
+            user_input = input("You: ")
+            
+            if user_input.lower() in ["exit", "quit"]:
+                print("Goodbye!")
+                break
+            
+            # Send the bounded history followed by the user message
+            user_message = HumanMessage(content=user_input)
+            state["messages"] = history.messages(user_message)
+            
+            # Served from the session cache unless the server's tool list changed
+            state["mcp_tools"] = await get_mcp_tools()
+            
+            # Run the agent, printing the answer as it is generated
+            started = time.perf_counter()
+            first_token = None
+            result = state
+            async for mode, chunk in agent.astream(state, stream_mode=["custom", "values"]):
+                if mode == "values":
+                    result = chunk
+                elif "tool_progress" in chunk:
+                    progress = chunk["tool_progress"]
+                    print(f"  [{progress['tool']} {progress['table_name']}: {progress['rows']}/{progress['limit']} rows]")
+                elif "token" in chunk:
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                        print("\nAgent: ", end="")
+                    print(chunk["token"], end="", flush=True)
+            elapsed = time.perf_counter() - started
+            
+            # Update the state
+            state = result
+            
+            # Record what the agent added after the user message; the system prompt is rebuilt every turn
+            last_human = max(i for i, message in enumerate(state["messages"]) if message.type == "human")
+            new_messages = state["messages"][last_human + 1:]
+            history.add_turn([user_message] + new_messages)
+            
+            # Keep the latest tool results, and their handles, even after the turn is summarized
+            for message in new_messages:
+                if getattr(message, "name", None) == "tool_results":
+                    history.pin("tool_results", message)
+            
+            # Print the agent's response, unless it was already streamed
+            if first_token is not None:
+                print("\n")
+            elif state["messages"] and state["messages"][-1].type == "ai":
+                print("\nAgent:", state["messages"][-1].content)
+                print()
+            if SHOW_TIMINGS:
+                first = f"{first_token * 1000:.0f} ms" if first_token is not None else "n/a"
+                print(f"(first token {first}, turn {elapsed * 1000:.0f} ms)\n")
+            
+            await history.compact()
+    finally:
+        await session.close()
+        if llm_cache is not None:
+            llm_cache.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,80 +1,395 @@
-import requests
+import functools
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import pydantic_core
 from fastmcp import FastMCP
-from typing import Dict, Any, List, Optional
+from starlette.requests import Request
+from starlette.responses import Response
+from typing import Dict, Any, List, Optional, Union
+
+from api_client import ApiClient
+from backends import BACKENDS, BackendError, HttpBackend, LocalBackend
 
 # API base URL
-API_BASE_URL = "http://localhost:50514"
+API_BASE_URL = os.environ.get("CHINOOK_API_URL", "http://localhost:50514")
+
+# Port the MCP server listens on
+MCP_PORT = int(os.environ.get("CHINOOK_MCP_PORT", "52796"))
+
+# Shared HTTP client: keep-alive pool, timeouts, retries and a cap on concurrent requests
+api = ApiClient(
+    API_BASE_URL,
+    timeout=float(os.environ.get("CHINOOK_HTTP_TIMEOUT", "30.0")),
+    connect_timeout=float(os.environ.get("CHINOOK_HTTP_CONNECT_TIMEOUT", "5.0")),
+    max_connections=int(os.environ.get("CHINOOK_HTTP_MAX_CONNECTIONS", "20")),
+    max_keepalive=int(os.environ.get("CHINOOK_HTTP_MAX_KEEPALIVE", "10")),
+    keepalive_expiry=float(os.environ.get("CHINOOK_HTTP_KEEPALIVE_EXPIRY", "30.0")),
+    max_concurrency=int(os.environ.get("CHINOOK_HTTP_MAX_CONCURRENCY", "16")),
+    retries=int(os.environ.get("CHINOOK_HTTP_RETRIES", "2")),
+    backoff=float(os.environ.get("CHINOOK_HTTP_BACKOFF", "0.2")),
+)
+
+# Where tool calls go: "http" calls the API server, "local" runs its data layer in this process
+BACKEND = os.environ.get("CHINOOK_MCP_BACKEND", "http")
+API_DIR = os.path.abspath(os.environ.get(
+    "CHINOOK_API_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chinook-crud-api")
+))
+
+# The metrics registry is the API package's own metrics.py, with either backend
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+from metrics import CONTENT_TYPE, ROW_BUCKETS, SIZE_BUCKETS, Registry
+
+if BACKEND not in BACKENDS:
+    raise ValueError(f"Unknown CHINOOK_MCP_BACKEND '{BACKEND}', expected one of: {', '.join(BACKENDS)}")
+backend = LocalBackend(API_DIR) if BACKEND == "local" else HttpBackend(api)
+
+# Tool and API-call metrics, served on /metrics; set CHINOOK_METRICS=0 to turn them off
+METRICS_ENABLED = os.environ.get("CHINOOK_METRICS", "1") != "0"
+registry = Registry()
+tool_duration = registry.histogram("chinook_mcp_tool_duration_seconds", "Time running a tool", ("tool", "table", "status"))
+tool_result_bytes = registry.histogram("chinook_mcp_tool_result_bytes", "Size of a tool result as JSON", ("tool",), SIZE_BUCKETS)
+tool_result_rows = registry.histogram("chinook_mcp_tool_result_rows", "Records in a tool result", ("tool", "table"), ROW_BUCKETS)
+tools_in_progress = registry.gauge("chinook_mcp_tools_in_progress", "Tool calls running")
+api_duration = registry.histogram(
+    "chinook_mcp_api_request_duration_seconds", "Time of each HTTP request to the CRUD API, retries included", ("method", "route", "status")
+)
+
+# First path segments of the API's fixed routes; every other path is /{table_name}[/{record_id}]
+API_PREFIXES = {"schema", "export", "aggregate", "related", "bulk"}
+
+def api_route(path: str) -> str:
+    """The API route template a request path matches, so record IDs do not become label values."""
+    parts = path.strip("/").split("/") if path.strip("/") else []
+    if not parts:
+        return "/"
+    if parts[0] in API_PREFIXES:
+        return f"/{parts[0]}/{{table_name}}"
+    return "/{table_name}" if len(parts) == 1 else "/{table_name}/{record_id}"
+
+def record_api_request(method: str, path: str, status: Optional[int], seconds: float):
+    api_duration.observe(seconds, method, api_route(path), str(status) if status is not None else "error")
+
+@registry.collector
+def api_client_metrics():
+    stats = api.stats()
+    yield "chinook_mcp_api_requests_total", "counter", "Responses received from the CRUD API", [({}, stats["requests"])]
+    yield "chinook_mcp_api_retries_total", "counter", "Requests to the CRUD API that were retried", [({}, stats["retries"])]
+    yield "chinook_mcp_api_failures_total", "counter", "Requests to the CRUD API that failed after retries", [({}, stats["failures"])]
+    yield "chinook_mcp_api_max_concurrency", "gauge", "Cap on concurrent requests to the CRUD API", [({}, stats["max_concurrency"])]
+
+def result_rows(result: Any) -> int:
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        for key in ("records", "results", "tables"):
+            if isinstance(result.get(key), list):
+                return len(result[key])
+        return 0 if "error" in result else 1
+    return 1
+
+def instrument_tool(fn):
+    """Record each call's duration, status, result size and row count; a no-op when metrics are off."""
+    if not METRICS_ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        table = kwargs.get("table_name", "")
+        started = time.perf_counter()
+        status = "error"
+        tools_in_progress.inc()
+        try:
+            result = await fn(*args, **kwargs)
+            status = "error" if isinstance(result, dict) and "error" in result else "ok"
+            return result
+        finally:
+            tools_in_progress.dec()
+            tool_duration.observe(time.perf_counter() - started, fn.__name__, table, status)
+            if status == "ok":
+                tool_result_bytes.observe(len(pydantic_core.to_json(result)), fn.__name__)
+                tool_result_rows.observe(result_rows(result), fn.__name__, table)
+
+    return wrapper
+
+if METRICS_ENABLED:
+    api.request_listeners.append(record_api_request)
 
 # Get available tables
-def get_tables() -> List[str]:
-    response = requests.get(f"{API_BASE_URL}/")
-    return response.json()["tables"]
+async def get_tables() -> List[str]:
+    return (await backend.list_tables())["tables"]
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    try:
+        yield
+    finally:
+        await backend.aclose()
 
 # Create MCP server
-mcp = FastMCP("Chinook Database MCP Server")
+mcp = FastMCP("Chinook Database MCP Server", lifespan=lifespan)
 
 # Tool to list all available tables
 @mcp.tool(
     name="list_tables",
     description="List all available tables in the database"
 )
-def list_tables() -> Dict[str, Any]:
+@instrument_tool
+async def list_tables() -> Dict[str, Any]:
     """List all available tables in the Chinook database."""
-    response = requests.get(f"{API_BASE_URL}/")
-    return response.json()
+    return await backend.list_tables()
+
+# Convert tool filters into the API's column[__op]=value query parameters
+def filter_params(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    params = {}
+    for key, value in (filters or {}).items():
+        if isinstance(value, (list, tuple)):
+            value = ",".join(str(v) for v in value)
+        elif value is None:
+            value = "null"
+        params[key] = value
+    return params
 
 # Tool to get all records from a table
 @mcp.tool(
     name="get_all_records",
-    description="Get all records from a specific table"
+    description="Get records from a specific table, optionally filtered, projected and sorted on the server"
 )
-def get_all_records(
+@instrument_tool
+async def get_all_records(
     table_name: str,
     limit: int = 100,
-    offset: int = 0
-) -> List[Dict[str, Any]]:
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    fields: Optional[List[str]] = None,
+    order_by: Optional[str] = None,
+    expand: Optional[List[str]] = None
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
     """
-    Get all records from a specific table.
+    Get records from a specific table.
+    
+    Prefer filters/fields over fetching large pages and filtering locally.
     
     Args:
         table_name: Name of the table to query
         limit: Maximum number of records to return (default: 100)
         offset: Number of records to skip (default: 0)
+        cursor: Opt-in keyset pagination. Pass "" for the first page, then the
+            returned "next_cursor" for each following page until it is null.
+            The result is then {"records": [...], "next_cursor": ...} and
+            offset is ignored.
+        filters: Column filters as {"column[__op]": value}. Operators are eq
+            (default), ne, gt, gte, lt, lte, like and in, e.g.
+            {"ArtistId": 1}, {"Milliseconds__gte": 300000},
+            {"AlbumId__in": [1, 4]}. None matches NULL.
+        fields: Columns to return, e.g. ["TrackId", "Name"] (default: all)
+        order_by: Comma-separated columns to sort by, prefix with "-" for
+            descending, e.g. "-Milliseconds,Name"
+        expand: Related records to embed, following foreign keys, e.g.
+            ["Artist", "Tracks.Genre"]. See describe_table for relation names.
     """
-    response = requests.get(f"{API_BASE_URL}/{table_name}", params={"limit": limit, "offset": offset})
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return {"error": f"Failed to get records: {response.status_code}", "details": response.text}
+    params = {"limit": limit, "offset": offset}
+    if cursor is not None:
+        params = {"limit": limit, "cursor": cursor}
+    if fields:
+        params["fields"] = ",".join(fields)
+    if order_by:
+        params["order_by"] = order_by
+    if expand:
+        params["expand"] = ",".join(expand)
+    params.update(filter_params(filters))
+    try:
+        return await backend.get_records(table_name, params)
+    except BackendError as e:
+        return {"error": f"Failed to get records: {e.status_code}", "details": e.details}
 
 # Tool to get a specific record by ID
 @mcp.tool(
     name="get_record",
     description="Get a specific record by ID from a table"
 )
-def get_record(
+@instrument_tool
+async def get_record(
     table_name: str,
-    record_id: int
+    record_id: Union[int, str],
+    expand: Optional[List[str]] = None
 ) -> Dict[str, Any]:
     """
     Get a specific record by ID from a table.
     
     Args:
         table_name: Name of the table
-        record_id: ID of the record to retrieve
+        record_id: ID of the record to retrieve (comma-separated for composite keys, e.g. "1,3402")
+        expand: Related records to embed, e.g. ["Artist", "Tracks"]
     """
-    response = requests.get(f"{API_BASE_URL}/{table_name}/{record_id}")
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return {"error": f"Failed to get record: {response.status_code}", "details": response.text}
+    params = {"expand": ",".join(expand)} if expand else None
+    try:
+        return await backend.get_record(table_name, record_id, params)
+    except BackendError as e:
+        return {"error": f"Failed to get record: {e.status_code}", "details": e.details}
+
+# Tool to get several records by ID in one query
+@mcp.tool(
+    name="get_records_by_ids",
+    description="Get several records by ID from a table in a single query, reporting IDs that do not exist"
+)
+@instrument_tool
+async def get_records_by_ids(
+    table_name: str,
+    ids: List[Union[int, str]],
+    fields: Optional[List[str]] = None,
+    expand: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Get several records by ID from a table in a single query.
+    
+    Use this instead of calling get_record once per ID, e.g. to look up the
+    albums referenced by a list of tracks.
+    
+    Args:
+        table_name: Name of the table
+        ids: IDs of the records to retrieve; composite keys comma-separated, e.g. ["1,3402", "1,3389"]
+        fields: Columns to return, e.g. ["AlbumId", "Title"] (default: all)
+        expand: Related records to embed, e.g. ["Artist"]
+    
+    Returns:
+        {"records": [...], "missing": [...]} with records in the order requested
+    """
+    params = {"ids": ";".join(str(record_id) for record_id in ids)}
+    if fields:
+        params["fields"] = ",".join(fields)
+    if expand:
+        params["expand"] = ",".join(expand)
+    try:
+        return await backend.get_records_by_ids(table_name, params)
+    except BackendError as e:
+        return {"error": f"Failed to get records: {e.status_code}", "details": e.details}
+
+# Tool to describe a table's columns, keys and relations
+@mcp.tool(
+    name="describe_table",
+    description="Describe a table's columns, primary key, indexes and relations to other tables"
+)
+@instrument_tool
+async def describe_table(table_name: str) -> Dict[str, Any]:
+    """
+    Describe a table's schema, including the relation names usable in
+    expand and get_related_records paths.
+    
+    Args:
+        table_name: Name of the table
+    """
+    try:
+        return await backend.describe_table(table_name)
+    except BackendError as e:
+        return {"error": f"Failed to describe table: {e.status_code}", "details": e.details}
+
+# Tool to follow foreign keys from one table to another
+@mcp.tool(
+    name="get_related_records",
+    description="Follow foreign-key relations from matching rows of one table and return the distinct related rows, joined inside the database"
+)
+@instrument_tool
+async def get_related_records(
+    table_name: str,
+    path: str,
+    filters: Optional[Dict[str, Any]] = None,
+    fields: Optional[List[str]] = None,
+    order_by: Optional[str] = None,
+    expand: Optional[List[str]] = None,
+    limit: int = 100,
+    offset: int = 0
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Follow a dotted relation path and return the distinct rows it reaches.
+    
+    Example: customers who bought AC/DC tracks is table_name="Artist",
+    filters={"ArtistId": 1}, path="Albums.Tracks.InvoiceLines.Invoice.Customer".
+    
+    Args:
+        table_name: Table to start from
+        path: Dotted relation names, e.g. "Albums.Tracks"
+        filters: Filters selecting the starting rows, same format as get_all_records
+        fields: Columns of the returned rows (default: all)
+        order_by: Sort for the returned rows, e.g. "-Total"
+        expand: Relations to embed in each returned row
+        limit: Maximum number of records to return (default: 100)
+        offset: Number of records to skip (default: 0)
+    """
+    params = {"path": path, "limit": limit, "offset": offset}
+    if fields:
+        params["fields"] = ",".join(fields)
+    if order_by:
+        params["order_by"] = order_by
+    if expand:
+        params["expand"] = ",".join(expand)
+    params.update(filter_params(filters))
+    try:
+        return await backend.get_related_records(table_name, params)
+    except BackendError as e:
+        return {"error": f"Failed to get related records: {e.status_code}", "details": e.details}
+
+# Tool to compute aggregates inside the database
+@mcp.tool(
+    name="aggregate_records",
+    description="Compute count/sum/avg/min/max over a table, optionally grouped, inside the database"
+)
+@instrument_tool
+async def aggregate_records(
+    table_name: str,
+    metrics: Optional[List[str]] = None,
+    group_by: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    having: Optional[Dict[str, Any]] = None,
+    order_by: Optional[str] = None,
+    limit: int = 100
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Aggregate rows of a table instead of downloading and counting them.
+    
+    Column references may follow to-one relations with dots, e.g. "Genre.Name"
+    or "Album.ArtistId" on Track.
+    
+    Example: top 5 genres by track count is table_name="Track",
+    group_by=["Genre.Name"], metrics=["count"], order_by="-count", limit=5.
+    
+    Args:
+        table_name: Table to aggregate
+        metrics: Aggregates as "func" or "func:column" with func one of count,
+            count_distinct, sum, avg, min, max, e.g. ["count", "sum:Milliseconds"].
+            Results are named "count" and "func_column" (dots become "_").
+            Default: ["count"]
+        group_by: Columns to group by, e.g. ["GenreId"] or ["Genre.Name"]
+        filters: Row filters applied before grouping, same format as get_all_records
+        having: Group filters on metric names as {"metric__op": value},
+            e.g. {"count__gte": 10}
+        order_by: Comma-separated group or metric names, "-" for descending
+        limit: Maximum number of groups to return (default: 100)
+    """
+    params = {"metrics": ",".join(metrics or ["count"]), "limit": limit}
+    if group_by:
+        params["group_by"] = ",".join(group_by)
+    if having:
+        params["having"] = ",".join(f"{key}:{value}" for key, value in having.items())
+    if order_by:
+        params["order_by"] = order_by
+    params.update(filter_params(filters))
+    try:
+        return await backend.aggregate_records(table_name, params)
+    except BackendError as e:
+        return {"error": f"Failed to aggregate records: {e.status_code}", "details": e.details}
 
 # Tool to create a new record
 @mcp.tool(
     name="create_record",
     description="Create a new record in a table"
 )
-def create_record(
+@instrument_tool
+async def create_record(
     table_name: str,
     data: Dict[str, Any]
 ) -> Dict[str, Any]:
@@ -85,20 +400,20 @@ def create_record(
         table_name: Name of the table
         data: Data for the new record as a dictionary
     """
-    response = requests.post(f"{API_BASE_URL}/{table_name}", json=data)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return {"error": f"Failed to create record: {response.status_code}", "details": response.text}
+    try:
+        return await backend.create_record(table_name, data)
+    except BackendError as e:
+        return {"error": f"Failed to create record: {e.status_code}", "details": e.details}
 
 # Tool to update an existing record
 @mcp.tool(
     name="update_record",
     description="Update an existing record in a table"
 )
-def update_record(
+@instrument_tool
+async def update_record(
     table_name: str,
-    record_id: int,
+    record_id: Union[int, str],
     data: Dict[str, Any]
 ) -> Dict[str, Any]:
     """
@@ -106,41 +421,122 @@ def update_record(
     
     Args:
         table_name: Name of the table
-        record_id: ID of the record to update
+        record_id: ID of the record to update (comma-separated for composite keys)
         data: Updated data for the record as a dictionary
     """
-    response = requests.put(f"{API_BASE_URL}/{table_name}/{record_id}", json=data)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return {"error": f"Failed to update record: {response.status_code}", "details": response.text}
+    try:
+        return await backend.update_record(table_name, record_id, data)
+    except BackendError as e:
+        return {"error": f"Failed to update record: {e.status_code}", "details": e.details}
 
 # Tool to delete a record
 @mcp.tool(
     name="delete_record",
     description="Delete a record from a table"
 )
-def delete_record(
+@instrument_tool
+async def delete_record(
     table_name: str,
-    record_id: int
+    record_id: Union[int, str]
 ) -> Dict[str, Any]:
     """
     Delete a record from a table.
     
     Args:
         table_name: Name of the table
-        record_id: ID of the record to delete
+        record_id: ID of the record to delete (comma-separated for composite keys)
+    """
+    try:
+        return await backend.delete_record(table_name, record_id)
+    except BackendError as e:
+        return {"error": f"Failed to delete record: {e.status_code}", "details": e.details}
+
+# Bulk tools: one HTTP request and one transaction for many rows
+@mcp.tool(
+    name="bulk_create_records",
+    description="Create many records in a table in a single transaction"
+)
+@instrument_tool
+async def bulk_create_records(
+    table_name: str,
+    records: List[Dict[str, Any]],
+    mode: str = "atomic"
+) -> Dict[str, Any]:
+    """
+    Create many records in a table in a single transaction.
+    
+    Args:
+        table_name: Name of the table
+        records: Data for each new record
+        mode: "atomic" rolls everything back if any row fails; "partial"
+            commits the rows that succeed and reports the others
+    """
+    try:
+        return await backend.bulk("create", table_name, {"records": records, "mode": mode})
+    except BackendError as e:
+        return {"error": f"Failed to create records: {e.status_code}", "details": e.details}
+
+@mcp.tool(
+    name="bulk_update_records",
+    description="Update many records in a table in a single transaction"
+)
+@instrument_tool
+async def bulk_update_records(
+    table_name: str,
+    records: List[Dict[str, Any]],
+    mode: str = "atomic"
+) -> Dict[str, Any]:
+    """
+    Update many records in a table in a single transaction.
+    
+    Args:
+        table_name: Name of the table
+        records: One dict per record holding its primary key column(s) and
+            the columns to change, e.g. {"ArtistId": 5, "Name": "New Name"}
+        mode: "atomic" or "partial", as for bulk_create_records
+    """
+    try:
+        return await backend.bulk("update", table_name, {"records": records, "mode": mode})
+    except BackendError as e:
+        return {"error": f"Failed to update records: {e.status_code}", "details": e.details}
+
+@mcp.tool(
+    name="bulk_delete_records",
+    description="Delete many records from a table in a single transaction"
+)
+@instrument_tool
+async def bulk_delete_records(
+    table_name: str,
+    ids: List[Union[int, str, Dict[str, Any]]],
+    mode: str = "atomic"
+) -> Dict[str, Any]:
+    """
+    Delete many records from a table in a single transaction.
+    
+    Args:
+        table_name: Name of the table
+        ids: Record IDs; composite keys as "1,3402" or {"PlaylistId": 1, "TrackId": 3402}
+        mode: "atomic" or "partial", as for bulk_create_records
     """
-    response = requests.delete(f"{API_BASE_URL}/{table_name}/{record_id}")
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return {"error": f"Failed to delete record: {response.status_code}", "details": response.text}
+    try:
+        return await backend.bulk("delete", table_name, {"ids": ids, "mode": mode})
+    except BackendError as e:
+        return {"error": f"Failed to delete records: {e.status_code}", "details": e.details}
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def get_metrics(request: Request) -> Response:
+    """Tool and API-call metrics in the Prometheus text format; with the local backend, also the API's own."""
+    if not METRICS_ENABLED:
+        return Response("Metrics are disabled", status_code=404)
+    body = registry.render()
+    if BACKEND == "local":
+        body += backend.server.registry.render()
+    return Response(body, media_type=CONTENT_TYPE)
 
 def main():
     print("Starting Chinook Database MCP Server...")
     # Start the MCP server
-    mcp.run(transport="streamable-http", port=52796, host="0.0.0.0")
+    mcp.run(transport="streamable-http", port=MCP_PORT, host="0.0.0.0")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from fastmcp import Client
+from fastmcp.client.messages import MessageHandler
+from fastmcp.exceptions import ToolError
+
+# Tools that only read, so a call interrupted by a dropped connection can safely be sent again
+READ_ONLY_TOOLS = frozenset({
+    "list_tables",
+    "get_all_records",
+    "get_record",
+    "get_records_by_ids",
+    "describe_table",
+    "get_related_records",
+    "aggregate_records",
+})
+
+
+class _ToolListWatcher(MessageHandler):
+    def __init__(self, session: "MCPSession"):
+        self.session = session
+
+    async def on_tool_list_changed(self, message):
+        self.session.invalidate_tools()
+
+
+class MCPSession:
+    """
+    One long-lived MCP client session shared by every tool call of the agent.
+
+    The connection and MCP initialize handshake happen once, on first use;
+    after that each tool call is a single request. A call that fails with a
+    transport error drops the session and reconnects. Read-only tools are
+    then retried once; other tools re-raise, since the server may already
+    have applied them.
+
+    ``list_tools`` is cached until the server sends ``tools/list_changed``,
+    the session reconnects, or ``tools_ttl`` seconds pass.
+    """
+
+    def __init__(self, url: str, tools_ttl: float = 300.0, timeout: Optional[float] = 60.0):
+        self.url = url
+        self.tools_ttl = tools_ttl
+        self.timeout = timeout
+        self._client: Optional[Client] = None
+        self._lock = asyncio.Lock()
+        self._tools: Optional[List[Dict[str, Any]]] = None
+        self._tools_loaded_at = 0.0
+        self.stats = {"connects": 0, "reconnects": 0, "calls": 0, "tool_list_fetches": 0}
+
+    async def _connect(self) -> Client:
+        async with self._lock:
+            if self._client is None or not self._client.is_connected():
+                client = Client(self.url, message_handler=_ToolListWatcher(self), timeout=self.timeout)
+                await client.__aenter__()
+                self._client = client
+                self.stats["connects"] += 1
+            return self._client
+
+    async def _drop(self, client: Client):
+        async with self._lock:
+            if self._client is client:
+                self._client = None
+                self._tools = None
+                self.stats["reconnects"] += 1
+        try:
+            await client.__aexit__(None, None, None)
+        except Exception:
+            pass
+
+    def invalidate_tools(self):
+        self._tools = None
+
+    async def list_tools(self) -> List[Dict[str, Any]]:
+        if self._tools is not None and time.monotonic() - self._tools_loaded_at < self.tools_ttl:
+            return self._tools
+        client = await self._connect()
+        try:
+            tools = await client.list_tools()
+        except Exception:
+            await self._drop(client)
+            client = await self._connect()
+            tools = await client.list_tools()
+        self._tools = [{"name": tool.name, "description": tool.description} for tool in tools]
+        self._tools_loaded_at = time.monotonic()
+        self.stats["tool_list_fetches"] += 1
+        return self._tools
+
+    async def call_tool(self, tool_name: str, args: Optional[Dict[str, Any]] = None):
+        client = await self._connect()
+        self.stats["calls"] += 1
+        try:
+            return await client.call_tool(tool_name, args or {})
+        except ToolError:
+            # The tool ran and reported an error; the session itself is fine
+            raise
+        except Exception:
+            await self._drop(client)
+            if tool_name not in READ_ONLY_TOOLS:
+                raise
+            client = await self._connect()
+            return await client.call_tool(tool_name, args or {})
+
+    async def close(self):
+        async with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            await client.__aexit__(None, None, None)
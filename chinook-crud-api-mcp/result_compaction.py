@@ -0,0 +1,194 @@
+import json
+import math
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Longest cell value shown in a compacted table; longer values are cut with "…"
+MAX_CELL_CHARS = 80
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about four characters per token for JSON and English text."""
+    return (len(text) + 3) // 4
+
+
+def _rows_of(value: Any) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+    """Split a tool result into its rows and any other top-level fields (``next_cursor``, ``missing``)."""
+    if isinstance(value, list) and value and all(isinstance(row, dict) for row in value):
+        return value, {}
+    if isinstance(value, dict) and isinstance(value.get("records"), list):
+        rows = value["records"]
+        if all(isinstance(row, dict) for row in rows):
+            return rows, {key: item for key, item in value.items() if key != "records"}
+    return None, {}
+
+
+class ResultStore:
+    """
+    Full tool results kept under short handles (``r1``, ``r2``, ...), least recently used evicted.
+
+    Only a compacted view of a large result is sent to the LLM; the handle
+    lets the agent page through the rest with ``read_result``.
+    """
+
+    def __init__(self, max_results: int = 32):
+        self.max_results = max_results
+        self._results: "OrderedDict[str, Any]" = OrderedDict()
+        self._next = 1
+
+    def put(self, text: str) -> str:
+        try:
+            value = json.loads(text)
+        except (TypeError, json.JSONDecodeError):
+            value = text
+        handle = f"r{self._next}"
+        self._next += 1
+        self._results[handle] = value
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+        return handle
+
+    def get(self, handle: str) -> Any:
+        if handle not in self._results:
+            raise KeyError(f"Unknown or expired result handle: {handle}")
+        self._results.move_to_end(handle)
+        return self._results[handle]
+
+    def page(self, handle: str, offset: int = 0, limit: int = 50, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Rows ``offset`` to ``offset + limit`` of a stored result, or a slice of its text if it has no rows."""
+        value = self.get(handle)
+        offset, limit = max(0, int(offset)), max(1, int(limit))
+        rows, _ = _rows_of(value)
+        if rows is None:
+            text = value if isinstance(value, str) else json.dumps(value, separators=(",", ":"))
+            # Without rows, offset and limit count characters
+            return {"handle": handle, "offset": offset, "total": len(text), "text": text[offset:offset + limit * 100]}
+        page = rows[offset:offset + limit]
+        if fields:
+            page = [{key: row.get(key) for key in fields} for row in page]
+        return {"handle": handle, "offset": offset, "total": len(rows), "records": page}
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        text = json.dumps(value, separators=(",", ":"))
+    else:
+        text = str(value)
+    text = text.replace("\\", "\\\\").replace("|", "\\|").replace("\n", "\\n")
+    if len(text) > MAX_CELL_CHARS:
+        text = text[:MAX_CELL_CHARS - 1] + "…"
+    return text
+
+
+def _summary(rows: List[Dict[str, Any]], columns: List[str]) -> List[str]:
+    """Per-column statistics over every row: range and mean for numbers, distinct count for the rest."""
+    lines = []
+    for column in columns:
+        values = [row.get(column) for row in rows if row.get(column) is not None]
+        if not values:
+            continue
+        numbers = [value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+        if len(numbers) == len(values):
+            mean = sum(numbers) / len(numbers)
+            lines.append(f"{column}: min={min(numbers)} max={max(numbers)} mean={mean:.4g}")
+        else:
+            distinct = len({_cell(value) for value in values})
+            lines.append(f"{column}: {distinct} distinct")
+    return lines
+
+
+def _sample(count: int, keep: int) -> List[int]:
+    """Indexes of ``keep`` rows out of ``count``: the first half of them from the top, the rest spread evenly."""
+    if keep >= count:
+        return list(range(count))
+    head = math.ceil(keep / 2)
+    rest = keep - head
+    if rest == 0:
+        return list(range(head))
+    step = (count - head) / rest
+    return list(range(head)) + [head + int(i * step) for i in range(rest)]
+
+
+def _compact_rows(rows: List[Dict[str, Any]], extra: Dict[str, Any], budget: int, handle: Optional[str]) -> str:
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+
+    # Column pruning: a column that is empty or the same in every row is stated once instead of per row
+    notes = []
+    empty = [column for column in columns if all(row.get(column) is None for row in rows)]
+    constant = [
+        column for column in columns
+        if column not in empty and len(rows) > 1 and len({_cell(row.get(column)) for row in rows}) == 1
+    ]
+    if empty:
+        notes.append("empty columns: " + ", ".join(empty))
+    if constant:
+        notes.append("same in every row: " + ", ".join(f"{column}={_cell(rows[0].get(column))}" for column in constant))
+    columns = [column for column in columns if column not in empty and column not in constant]
+
+    header = [f"{len(rows)} rows"] + notes
+    if extra:
+        header.append(json.dumps(extra, separators=(",", ":")))
+
+    def render(indexes: List[int], with_summary: bool) -> str:
+        sampled = len(indexes) < len(rows)
+        lines = list(header)
+        lines.append("|".join((["#"] if sampled else []) + columns))
+        for i in indexes:
+            cells = [_cell(rows[i].get(column)) for column in columns]
+            lines.append("|".join(([str(i)] if sampled else []) + cells))
+        if sampled:
+            where = f"; full result under handle {handle}, page it with read_result" if handle else ""
+            lines.append(f"[... {len(rows) - len(indexes)} of {len(rows)} rows omitted{where} ...]")
+            if with_summary:
+                lines.append("summary of all rows:")
+                lines.extend(_summary(rows, columns))
+        return "\n".join(lines)
+
+    full = render(list(range(len(rows))), False)
+    if estimate_tokens(full) <= budget:
+        return full
+
+    # Largest sample that fits, with summary statistics; drop the statistics if even one row does not fit
+    for with_summary in (True, False):
+        low, high = 0, len(rows) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if estimate_tokens(render(_sample(len(rows), middle), with_summary)) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        text = render(_sample(len(rows), low), with_summary)
+        if low > 0 or estimate_tokens(text) <= budget:
+            return text
+    return _truncate(text, budget, handle)
+
+
+def _truncate(text: str, budget: int, handle: Optional[str]) -> str:
+    if estimate_tokens(text) <= budget:
+        return text
+    where = f"; full result under handle {handle}, page it with read_result" if handle else ""
+    keep = max(0, budget * 4 - 100)
+    return f"{text[:keep]}\n[... truncated, {len(text) - keep} more characters{where} ...]"
+
+
+def compact_result(text: str, budget: int, handle: Optional[str] = None) -> str:
+    """
+    Render a tool result in at most about ``budget`` tokens.
+
+    Rows become a ``|``-separated table with a single header line; columns
+    that are empty or constant are pruned into a note. If the table is
+    still over budget, a sample of rows is kept along with summary
+    statistics for every column. Anything else is compact JSON, cut at the
+    budget. Whatever is left out is marked, naming ``handle`` so the agent
+    can fetch it.
+    """
+    try:
+        value = json.loads(text)
+    except (TypeError, json.JSONDecodeError):
+        return _truncate(str(text), budget, handle)
+    rows, extra = _rows_of(value)
+    if rows:
+        return _compact_rows(rows, extra, budget, handle)
+    return _truncate(json.dumps(value, separators=(",", ":")), budget, handle)
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# "$albums.*.AlbumId": the AlbumId of every row returned by the call with id "albums"
+REFERENCE = re.compile(r"^\$([A-Za-z_][A-Za-z0-9_]*)((?:\.[^.]+)*)$")
+
+
+class PlanError(ValueError):
+    """Raised for plans that cannot be run: bad JSON, unknown references or cycles."""
+
+
+@dataclass
+class ToolCall:
+    id: str
+    tool: str
+    args: Dict[str, Any] = field(default_factory=dict)
+    depends_on: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ToolOutcome:
+    call: ToolCall
+    args: Optional[Dict[str, Any]] = None  # arguments after references were resolved
+    result: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        outcome = {"id": self.call.id, "tool": self.call.tool, "args": self.args if self.args is not None else self.call.args}
+        if self.error is not None:
+            outcome["error"] = self.error
+        else:
+            outcome["result"] = self.result
+        return outcome
+
+
+def _extract_json(text: str) -> Any:
+    """Parse the first JSON object in an LLM reply, ignoring code fences and surrounding prose."""
+    text = text.strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1).strip()
+    start = text.find("{")
+    if start == -1:
+        raise PlanError("No JSON object in tool plan")
+    try:
+        plan, _ = json.JSONDecoder().raw_decode(text[start:])
+    except json.JSONDecodeError as e:
+        raise PlanError(f"Invalid JSON in tool plan: {e}")
+    return plan
+
+
+def _references(value: Any) -> List[str]:
+    if isinstance(value, str):
+        match = REFERENCE.match(value)
+        return [match.group(1)] if match else []
+    if isinstance(value, dict):
+        return [ref for item in value.values() for ref in _references(item)]
+    if isinstance(value, list):
+        return [ref for item in value for ref in _references(item)]
+    return []
+
+
+def parse_plan(text: str, max_calls: int = 8) -> List[ToolCall]:
+    """
+    Parse the planner's reply into tool calls.
+
+    Accepts ``{"calls": [{"id", "tool", "args", "depends_on"}, ...]}`` or a
+    single ``{"tool", "args"}``. Dependencies are the union of
+    ``depends_on`` and the calls referenced from ``args``.
+    """
+    plan = _extract_json(text)
+    if "calls" not in plan:
+        plan = {"calls": [{"id": "call1", "tool": plan.get("tool"), "args": plan.get("args") or {}}]}
+    raw_calls = plan["calls"]
+    if not isinstance(raw_calls, list) or not raw_calls:
+        raise PlanError("Tool plan has no calls")
+    if len(raw_calls) > max_calls:
+        raise PlanError(f"Tool plan has {len(raw_calls)} calls, at most {max_calls} are allowed")
+
+    for index, raw in enumerate(raw_calls, 1):
+        if not isinstance(raw, dict) or not raw.get("tool"):
+            raise PlanError(f"Call {index} has no tool")
+    ids = [str(raw.get("id") or f"call{index}") for index, raw in enumerate(raw_calls, 1)]
+    if len(set(ids)) != len(ids):
+        raise PlanError("Tool plan reuses a call id")
+
+    calls = []
+    for call_id, raw in zip(ids, raw_calls):
+        args = raw.get("args") or {}
+        # Only "$name" strings naming another call are references; other text starting with "$" is left alone
+        references = [ref for ref in _references(args) if ref in ids]
+        depends_on = list(dict.fromkeys([str(dep) for dep in raw.get("depends_on") or []] + references))
+        calls.append(ToolCall(id=call_id, tool=raw["tool"], args=args, depends_on=depends_on))
+
+    for call in calls:
+        unknown = [dep for dep in call.depends_on if dep not in ids]
+        if unknown:
+            raise PlanError(f"Call {call.id} depends on unknown call(s): {', '.join(unknown)}")
+
+    # Kahn's algorithm; anything left over sits on a cycle
+    remaining = {call.id: set(call.depends_on) for call in calls}
+    while True:
+        ready = [call_id for call_id, deps in remaining.items() if not deps]
+        if not ready:
+            break
+        for call_id in ready:
+            del remaining[call_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    if remaining:
+        raise PlanError(f"Tool plan has a dependency cycle between: {', '.join(remaining)}")
+    return calls
+
+
+def _lookup(value: Any, path: List[str]) -> Any:
+    for i, step in enumerate(path):
+        if step == "*":
+            if not isinstance(value, list):
+                raise PlanError(f"'*' needs a list, got {type(value).__name__}")
+            return [_lookup(item, path[i + 1:]) for item in value]
+        if isinstance(value, list):
+            value = value[int(step)]
+        elif isinstance(value, dict):
+            if step not in value:
+                raise PlanError(f"Result has no field '{step}'")
+            value = value[step]
+        else:
+            raise PlanError(f"Cannot read '{step}' from {type(value).__name__}")
+    return value
+
+
+def resolve_references(value: Any, results: Dict[str, Any]) -> Any:
+    """Replace ``$id`` / ``$id.path`` strings with values from earlier results."""
+    if isinstance(value, str):
+        match = REFERENCE.match(value)
+        if not match or match.group(1) not in results:
+            return value
+        path = [step for step in match.group(2).split(".") if step]
+        return _lookup(results[match.group(1)], path)
+    if isinstance(value, dict):
+        return {key: resolve_references(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(item, results) for item in value]
+    return value
+
+
+async def run_plan(
+    calls: List[ToolCall],
+    execute: Callable[[str, Dict[str, Any]], Awaitable[str]],
+    max_concurrency: int = 4,
+) -> List[ToolOutcome]:
+    """
+    Run every call once its dependencies have finished, at most ``max_concurrency`` at a time.
+
+    Each call is its own task, so a call starts as soon as the calls it
+    depends on are done rather than waiting for a whole level of the DAG.
+    A call whose dependency failed is skipped with an error.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    done: Dict[str, asyncio.Future] = {call.id: asyncio.get_running_loop().create_future() for call in calls}
+    parsed: Dict[str, Any] = {}
+    outcomes: Dict[str, ToolOutcome] = {}
+
+    async def run(call: ToolCall):
+        outcome = ToolOutcome(call=call)
+        try:
+            for dep in call.depends_on:
+                await done[dep]
+            failed = [dep for dep in call.depends_on if outcomes[dep].error is not None]
+            if failed:
+                outcome.error = f"Skipped because {', '.join(failed)} failed"
+                return
+            try:
+                outcome.args = resolve_references(call.args, parsed)
+            except (PlanError, IndexError, ValueError) as e:
+                outcome.error = f"Could not resolve arguments: {e}"
+                return
+            async with semaphore:
+                try:
+                    outcome.result = await execute(call.tool, outcome.args)
+                except Exception as e:
+                    outcome.error = f"Error executing tool: {e}"
+                    return
+            try:
+                parsed[call.id] = json.loads(outcome.result)
+            except (TypeError, json.JSONDecodeError):
+                parsed[call.id] = outcome.result
+            # Tools report API failures as {"error": ...} results rather than raising
+            if isinstance(parsed[call.id], dict) and "error" in parsed[call.id]:
+                outcome.error, outcome.result = outcome.result, None
+        finally:
+            outcomes[call.id] = outcome
+            done[call.id].set_result(None)
+
+    await asyncio.gather(*(run(call) for call in calls))
+    return [outcomes[call.id] for call in calls]
@@ -0,0 +1,169 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from catalog import Table, quote_ident
+from query import FILTER_OPERATORS, QueryError, parse_filters
+
+AGGREGATE_FUNCTIONS = {
+    "count": "COUNT",
+    "count_distinct": "COUNT",
+    "sum": "SUM",
+    "avg": "AVG",
+    "min": "MIN",
+    "max": "MAX",
+}
+
+HAVING_OPERATORS = {op: sql for op, sql in FILTER_OPERATORS.items() if op not in ("like", "in")}
+
+
+@dataclass
+class Aggregation:
+    """
+    A GROUP BY query over one table, compiled to parameterized SQL.
+
+    Column references may follow to-one relations with dots, e.g.
+    ``Genre.Name`` on Track or ``Album.ArtistId``; each relation used is
+    joined once with a ``LEFT JOIN`` so rows with a NULL key still count.
+    """
+
+    table: Table
+    joins: Dict[str, Tuple[str, str]] = field(default_factory=dict)  # path -> (alias, JOIN clause)
+    group_by: List[Tuple[str, str]] = field(default_factory=list)  # (output name, SQL)
+    metrics: List[Tuple[str, str]] = field(default_factory=list)  # (output name, SQL)
+    where: List[str] = field(default_factory=list)
+    where_params: List[Any] = field(default_factory=list)
+    having: List[str] = field(default_factory=list)
+    having_params: List[Any] = field(default_factory=list)
+    order_by: List[Tuple[str, bool]] = field(default_factory=list)  # (output name, descending)
+
+    def column(self, ref: str) -> str:
+        """Resolve ``Relation.Relation.Column`` to a qualified column, joining as needed."""
+        *path, column = ref.split(".")
+        table, alias = self.table, "t0"
+        for depth, name in enumerate(path, 1):
+            relation = table.relations.get(name)
+            if relation is None:
+                raise QueryError(f"Unknown relation {table.name}.{name}")
+            if relation.many:
+                raise QueryError(f"Only to-one relations can be used in aggregates, {table.name}.{name} is to-many")
+            key = ".".join(path[:depth])
+            if key not in self.joins:
+                joined = f"j{len(self.joins) + 1}"
+                self.joins[key] = (
+                    joined,
+                    f"LEFT JOIN {quote_ident(relation.target)} AS {joined} ON {relation.join_condition(alias, joined)}",
+                )
+            alias = self.joins[key][0]
+            table = relation.target_table
+        if column not in table.columns:
+            raise QueryError(f"Unknown column for {table.name}: {column}")
+        return f"{alias}.{quote_ident(column)}"
+
+    def output_names(self) -> List[str]:
+        return [name for name, _ in self.group_by] + [name for name, _ in self.metrics]
+
+    def to_sql(self, limit: Optional[int] = None) -> Tuple[str, List[Any]]:
+        select = [f"{sql} AS {quote_ident(name)}" for name, sql in self.group_by + self.metrics]
+        sql = f"SELECT {', '.join(select)} FROM {quote_ident(self.table.name)} AS t0"
+        for _, join in self.joins.values():
+            sql += f" {join}"
+        params = list(self.where_params)
+        if self.where:
+            sql += f" WHERE {' AND '.join(self.where)}"
+        if self.group_by:
+            sql += f" GROUP BY {', '.join(expr for _, expr in self.group_by)}"
+        if self.having:
+            sql += f" HAVING {' AND '.join(self.having)}"
+            params.extend(self.having_params)
+        if self.order_by:
+            sql += " ORDER BY " + ", ".join(
+                f"{quote_ident(name)}{' DESC' if desc else ''}" for name, desc in self.order_by
+            )
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return sql, params
+
+
+def parse_metric(aggregation: Aggregation, spec: str) -> Tuple[str, str]:
+    """``count`` -> COUNT(*); ``sum:Milliseconds`` -> SUM(t0."Milliseconds") named ``sum_Milliseconds``."""
+    func, _, ref = spec.partition(":")
+    if func not in AGGREGATE_FUNCTIONS:
+        raise QueryError(f"Unknown aggregate '{func}', expected one of: {', '.join(AGGREGATE_FUNCTIONS)}")
+    if not ref:
+        if func != "count":
+            raise QueryError(f"Aggregate '{func}' needs a column, e.g. {func}:Milliseconds")
+        return "count", "COUNT(*)"
+    column = aggregation.column(ref)
+    name = f"{func}_{ref.replace('.', '_')}"
+    if func == "count_distinct":
+        return name, f"COUNT(DISTINCT {column})"
+    return name, f"{AGGREGATE_FUNCTIONS[func]}({column})"
+
+
+def _number(value: str) -> Any:
+    # Aggregates carry no column affinity, so a text value would compare as text
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+
+def parse_having(aggregation: Aggregation, having: str):
+    """``having=count__gte:10,sum_Milliseconds__gt:600000`` filters groups on computed metrics."""
+    metrics = dict(aggregation.metrics)
+    for term in having.split(","):
+        term = term.strip()
+        if not term:
+            continue
+        target, sep, value = term.partition(":")
+        if not sep:
+            raise QueryError(f"Invalid having term '{term}', expected metric__op:value")
+        name, _, op = target.partition("__")
+        op = op or "eq"
+        if name not in metrics:
+            raise QueryError(f"having refers to unknown metric '{name}', expected one of: {', '.join(metrics)}")
+        if op not in HAVING_OPERATORS:
+            raise QueryError(f"Unknown having operator '{op}', expected one of: {', '.join(HAVING_OPERATORS)}")
+        aggregation.having.append(f"{metrics[name]} {HAVING_OPERATORS[op]} ?")
+        aggregation.having_params.append(_number(value.strip()))
+
+
+def build_aggregation(
+    table: Table,
+    metrics: str,
+    group_by: Optional[str] = None,
+    filters: Iterable[Tuple[str, str]] = (),
+    having: Optional[str] = None,
+    order_by: Optional[str] = None,
+) -> Aggregation:
+    aggregation = Aggregation(table=table)
+
+    for ref in (group_by or "").split(","):
+        ref = ref.strip()
+        if ref:
+            aggregation.group_by.append((ref, aggregation.column(ref)))
+
+    for spec in (metrics or "count").split(","):
+        spec = spec.strip()
+        if spec:
+            aggregation.metrics.append(parse_metric(aggregation, spec))
+
+    aggregation.where, aggregation.where_params = parse_filters(table, filters, resolve=aggregation.column)
+
+    if having:
+        parse_having(aggregation, having)
+
+    names = aggregation.output_names()
+    for item in (order_by or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name = item.lstrip("+-")
+        if name not in names:
+            raise QueryError(f"order_by must name a group or metric, expected one of: {', '.join(names)}")
+        aggregation.order_by.append((name, item.startswith("-")))
+
+    return aggregation
@@ -0,0 +1,170 @@
+import itertools
+import sqlite3
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from catalog import Table, quote_ident
+
+class BulkRowError(Exception):
+    """A row that failed validation or execution."""
+
+
+class BulkAbort(Exception):
+    """Raised in atomic mode on the first failing row; the caller rolls back."""
+
+    def __init__(self, index: int, error: str):
+        super().__init__(f"Row {index} failed: {error}")
+        self.index = index
+        self.error = error
+
+
+def _check_columns(table: Table, columns):
+    unknown = [name for name in columns if name not in table.columns]
+    if unknown:
+        raise BulkRowError(f"Unknown column(s) for {table.name}: {', '.join(unknown)}")
+
+
+def _key_values(table: Table, record_id: Any) -> Tuple[Any, ...]:
+    if isinstance(record_id, dict):
+        missing = [col for col in table.key_columns if col not in record_id]
+        if missing:
+            raise BulkRowError(f"Missing key column(s): {', '.join(missing)}")
+        return tuple(record_id[col] for col in table.key_columns)
+    try:
+        return table.parse_key(record_id)
+    except ValueError as e:
+        raise BulkRowError(str(e))
+
+
+def _rowid_alias(table: Table) -> Optional[str]:
+    """The ``INTEGER PRIMARY KEY`` column that stores the rowid, if the table has one."""
+    if len(table.primary_key) == 1 and table.columns[table.primary_key[0]].type.upper() == "INTEGER":
+        return table.primary_key[0]
+    return None
+
+
+def _column_set(table: Table, record: Any, rowid_alias: Optional[str]) -> Optional[FrozenSet[str]]:
+    """Columns a record is batched by, or ``None`` when it has to be inserted on its own."""
+    if not isinstance(record, dict) or not record or any(name not in table.columns for name in record):
+        return None
+    # An integer rowid is the row's id; NULL or text would leave the id to SQLite
+    if rowid_alias in record and type(record[rowid_alias]) is not int:
+        return None
+    return frozenset(record)
+
+
+def _insert_sql(table: Table, columns: List[str]) -> str:
+    return (
+        f"INSERT INTO {quote_ident(table.name)} ({', '.join(quote_ident(c) for c in columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+
+
+def _run(
+    conn: sqlite3.Connection,
+    items: List[Any],
+    atomic: bool,
+    execute: Callable[[Any], Dict[str, Any]],
+    start: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Apply ``execute`` to every item inside the caller's transaction.
+
+    SQLite keeps each failed statement's changes out of the transaction, so in
+    partial mode a bad row is reported and the rest still commit together.
+    Results are numbered from ``start``.
+    """
+    results = []
+    for index, item in enumerate(items, start):
+        try:
+            result = execute(item)
+        except (BulkRowError, sqlite3.Error) as e:
+            if atomic:
+                raise BulkAbort(index, str(e))
+            results.append({"index": index, "status": "error", "error": str(e)})
+            continue
+        if atomic and result["status"] == "not_found":
+            raise BulkAbort(index, "Record not found")
+        results.append({"index": index, **result})
+    return results
+
+
+def bulk_create(conn: sqlite3.Connection, table: Table, records: List[Dict[str, Any]], atomic: bool):
+    """
+    Insert each run of consecutive records with the same columns with one ``executemany``.
+
+    A run that fails is rolled back to its savepoint and replayed row by row,
+    which reports the failing row exactly as before. Records that cannot be
+    batched (invalid, or with a rowid that is not an integer) always go row by row.
+    """
+    rowid_alias = _rowid_alias(table)
+
+    def execute(record: Dict[str, Any]):
+        if not record:
+            raise BulkRowError("Empty record")
+        _check_columns(table, record.keys())
+        cursor = conn.execute(_insert_sql(table, list(record)), list(record.values()))
+        return {"status": "created", "id": cursor.lastrowid}
+
+    def insert_run(run: List[Dict[str, Any]]) -> Optional[List[Any]]:
+        """Ids of the inserted rows, or ``None`` if the run failed and nothing was kept."""
+        columns = list(run[0])
+        conn.execute("SAVEPOINT bulk_run")
+        try:
+            conn.executemany(_insert_sql(table, columns), [[record[c] for c in columns] for record in run])
+        except sqlite3.Error:
+            conn.execute("ROLLBACK TO bulk_run")
+            conn.execute("RELEASE bulk_run")
+            return None
+        conn.execute("RELEASE bulk_run")
+        if rowid_alias in columns:
+            return [record[rowid_alias] for record in run]
+        # executemany leaves lastrowid unset; rowids SQLite picks within one statement run are consecutive
+        last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return list(range(last - len(run) + 1, last + 1))
+
+    results = []
+    groups = itertools.groupby(enumerate(records), key=lambda item: _column_set(table, item[1], rowid_alias))
+    for column_set, group in groups:
+        indexed = list(group)
+        start, run = indexed[0][0], [record for _, record in indexed]
+        ids = insert_run(run) if column_set is not None else None
+        if ids is None:
+            results.extend(_run(conn, run, atomic, execute, start))
+        else:
+            results.extend({"index": start + i, "status": "created", "id": row_id} for i, row_id in enumerate(ids))
+    return results
+
+
+def bulk_update(conn: sqlite3.Connection, table: Table, records: List[Dict[str, Any]], atomic: bool):
+    """Each record carries its key columns plus the columns to change."""
+
+    def execute(record: Dict[str, Any]):
+        _check_columns(table, [k for k in record if k not in table.key_columns])
+        key = _key_values(table, record)
+        data = {k: v for k, v in record.items() if k not in table.key_columns}
+        if not data:
+            raise BulkRowError("No columns to update")
+        set_clause = ", ".join(f"{quote_ident(k)} = ?" for k in data)
+        cursor = conn.execute(
+            f"UPDATE {quote_ident(table.name)} SET {set_clause} WHERE {table.key_clause()}",
+            list(data.values()) + list(key),
+        )
+        return {"status": "updated" if cursor.rowcount else "not_found"}
+
+    return _run(conn, records, atomic, execute)
+
+
+def bulk_delete(conn: sqlite3.Connection, table: Table, ids: List[Any], atomic: bool):
+    """``ids`` are plain ids, comma-separated composite ids or ``{column: value}`` dicts."""
+    sql = f"DELETE FROM {quote_ident(table.name)} WHERE {table.key_clause()}"
+
+    def execute(record_id: Any):
+        cursor = conn.execute(sql, _key_values(table, record_id))
+        return {"status": "deleted" if cursor.rowcount else "not_found"}
+
+    return _run(conn, ids, atomic, execute)
+
+
+def summarize(mode: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    failed = sum(1 for r in results if r["status"] in ("error", "not_found"))
+    return {"mode": mode, "succeeded": len(results) - failed, "failed": failed, "results": results}
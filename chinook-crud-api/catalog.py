@@ -0,0 +1,266 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def quote_ident(name: str) -> str:
+    """Quote an identifier for interpolation into SQL."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+@dataclass
+class Column:
+    name: str
+    type: str
+    notnull: bool
+    default: Optional[str]
+    pk: int  # 1-based position in the primary key, 0 if not part of it
+
+
+@dataclass
+class ForeignKey:
+    columns: List[str]
+    ref_table: str
+    ref_columns: List[str]
+    on_update: str
+    on_delete: str
+
+
+@dataclass
+class Index:
+    name: str
+    columns: List[str]
+    unique: bool
+    origin: str  # "c" for CREATE INDEX, "pk"/"u" for constraint-backed indexes
+
+
+@dataclass
+class Relation:
+    """
+    A navigable link between two tables derived from a foreign key.
+
+    Every foreign key yields two relations: a to-one relation on the
+    referencing table (``Album.Artist``) and a to-many relation on the
+    referenced table (``Album.Tracks``). Rows of ``target`` match when
+    ``target.target_columns = source.columns``.
+    """
+
+    name: str
+    target: str
+    columns: List[str]
+    target_columns: List[str]
+    many: bool
+    target_table: Optional["Table"] = field(default=None, repr=False, compare=False)
+
+    def join_condition(self, source_alias: str, target_alias: str) -> str:
+        return " AND ".join(
+            f"{target_alias}.{quote_ident(t)} = {source_alias}.{quote_ident(s)}"
+            for s, t in zip(self.columns, self.target_columns)
+        )
+
+
+@dataclass
+class Table:
+    name: str
+    columns: Dict[str, Column]
+    primary_key: List[str]
+    indexes: List[Index] = field(default_factory=list)
+    foreign_keys: List[ForeignKey] = field(default_factory=list)
+    relations: Dict[str, Relation] = field(default_factory=dict)
+
+    @property
+    def key_columns(self) -> List[str]:
+        """Columns identifying a row: the declared primary key, or rowid when there is none."""
+        return self.primary_key or ["rowid"]
+
+    def parse_key(self, record_id: str) -> Tuple[str, ...]:
+        """
+        Split a record id from the URL into one value per key column.
+
+        Composite keys are written comma-separated in primary key order,
+        e.g. ``/PlaylistTrack/1,3402``.
+        """
+        values = tuple(part.strip() for part in str(record_id).split(","))
+        if len(values) != len(self.key_columns):
+            raise ValueError(
+                f"Expected {len(self.key_columns)} key value(s) for {', '.join(self.key_columns)}"
+            )
+        return values
+
+    def key_clause(self) -> str:
+        """``WHERE`` condition matching one row by its key columns."""
+        return " AND ".join(f"{quote_ident(col)} = ?" for col in self.key_columns)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "primary_key": self.primary_key,
+            "columns": [
+                {"name": c.name, "type": c.type, "notnull": c.notnull, "default": c.default, "pk": c.pk}
+                for c in self.columns.values()
+            ],
+            "indexes": [
+                {"name": i.name, "columns": i.columns, "unique": i.unique, "origin": i.origin}
+                for i in self.indexes
+            ],
+            "foreign_keys": [
+                {
+                    "columns": fk.columns,
+                    "ref_table": fk.ref_table,
+                    "ref_columns": fk.ref_columns,
+                    "on_update": fk.on_update,
+                    "on_delete": fk.on_delete,
+                }
+                for fk in self.foreign_keys
+            ],
+            "relations": [
+                {"name": r.name, "target": r.target, "many": r.many, "columns": r.columns, "target_columns": r.target_columns}
+                for r in self.relations.values()
+            ],
+        }
+
+
+def load_table(conn: sqlite3.Connection, name: str) -> Table:
+    quoted = quote_ident(name)
+
+    columns = {}
+    for row in conn.execute(f"PRAGMA table_info({quoted})"):
+        # cid, name, type, notnull, dflt_value, pk
+        columns[row[1]] = Column(name=row[1], type=row[2], notnull=bool(row[3]), default=row[4], pk=row[5])
+    primary_key = [c.name for c in sorted(columns.values(), key=lambda c: c.pk) if c.pk]
+
+    indexes = []
+    for row in conn.execute(f"PRAGMA index_list({quoted})").fetchall():
+        # seq, name, unique, origin, partial
+        index_name = row[1]
+        index_columns = [
+            info[2] for info in conn.execute(f"PRAGMA index_info({quote_ident(index_name)})")
+        ]
+        indexes.append(Index(name=index_name, columns=index_columns, unique=bool(row[2]), origin=row[3]))
+
+    foreign_keys: Dict[int, ForeignKey] = {}
+    for row in conn.execute(f"PRAGMA foreign_key_list({quoted})"):
+        # id, seq, table, from, to, on_update, on_delete, match
+        fk = foreign_keys.setdefault(
+            row[0], ForeignKey(columns=[], ref_table=row[2], ref_columns=[], on_update=row[5], on_delete=row[6])
+        )
+        fk.columns.append(row[3])
+        fk.ref_columns.append(row[4])
+
+    return Table(
+        name=name,
+        columns=columns,
+        primary_key=primary_key,
+        indexes=indexes,
+        foreign_keys=list(foreign_keys.values()),
+    )
+
+
+def _unique_name(table: Table, name: str) -> str:
+    candidate, n = name, 2
+    while candidate in table.relations or candidate in table.columns:
+        candidate, n = f"{name}{n}", n + 1
+    return candidate
+
+
+def link_relations(tables: Dict[str, Table]):
+    """Populate ``Table.relations`` in both directions from every table's foreign keys."""
+    for child in tables.values():
+        for fk in child.foreign_keys:
+            parent = tables.get(fk.ref_table)
+            if parent is None:
+                continue
+            # A foreign key without explicit target columns references the primary key
+            ref_columns = fk.ref_columns if all(fk.ref_columns) else parent.primary_key
+
+            # To-one, named after the column: Album.ArtistId -> Album.Artist
+            if len(fk.columns) == 1 and fk.columns[0].endswith("Id") and len(fk.columns[0]) > 2:
+                one_name = fk.columns[0][:-2]
+            elif len(fk.columns) == 1:
+                one_name = fk.columns[0] + parent.name
+            else:
+                one_name = parent.name
+            one_name = _unique_name(child, one_name)
+            child.relations[one_name] = Relation(
+                name=one_name,
+                target=parent.name,
+                columns=list(fk.columns),
+                target_columns=list(ref_columns),
+                many=False,
+                target_table=parent,
+            )
+
+            # To-many, named after the child table: Album.Tracks
+            siblings = [other for other in child.foreign_keys if other.ref_table == parent.name]
+            many_name = f"{child.name}s"
+            if len(siblings) > 1:
+                many_name += "By" + one_name
+            many_name = _unique_name(parent, many_name)
+            parent.relations[many_name] = Relation(
+                name=many_name,
+                target=child.name,
+                columns=list(ref_columns),
+                target_columns=list(fk.columns),
+                many=True,
+                target_table=child,
+            )
+
+
+class SchemaCatalog:
+    """
+    In-memory copy of the database schema.
+
+    Loaded once and reused by every request. ``PRAGMA schema_version`` is
+    re-checked at most every ``check_interval`` seconds and the catalog is
+    reloaded only when it changes.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._tables: Dict[str, Table] = {}
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, conn: sqlite3.Connection):
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        names = [
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+            )
+        ]
+        tables = {name: load_table(conn, name) for name in names}
+        link_relations(tables)
+        with self._lock:
+            self._tables = tables
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def refresh(self, conn: sqlite3.Connection):
+        """Reload the catalog if the schema changed since it was last loaded."""
+        if self._version is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        if version != self._version:
+            self.load(conn)
+        else:
+            self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._version
+
+    def tables(self, conn: sqlite3.Connection) -> List[str]:
+        self.refresh(conn)
+        return list(self._tables)
+
+    def get(self, conn: sqlite3.Connection, name: str) -> Optional[Table]:
+        self.refresh(conn)
+        return self._tables.get(name)
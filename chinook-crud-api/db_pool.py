@@ -0,0 +1,500 @@
+import functools
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Tuning PRAGMAs accepted from configuration, applied in this order on every connection
+PRAGMA_NAMES = ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout", "temp_store")
+
+# Called after every statement on a pooled connection with (sql, params, seconds, rows)
+StatementListener = Callable[[str, Any, float, int], None]
+
+_SQL_TOKEN = re.compile(r'"(?:[^"]|"")*"|\[[^\]]*\]|\'(?:[^\']|\'\')*\'|\w+|\S')
+
+
+def _name(token: str) -> str:
+    if token.startswith('"'):
+        return token[1:-1].replace('""', '"')
+    return token[1:-1] if token.startswith("[") else token
+
+
+# Statements are built from a small set of shapes with bound parameters, so their text repeats
+@functools.lru_cache(maxsize=4096)
+def statement_target(sql: str) -> Tuple[str, str]:
+    """
+    ``(operation, table)`` of a statement, e.g. ``("select", "Track")``.
+
+    For a SELECT this is the first table in its outermost FROM clause, so
+    subqueries embedding related rows do not count. PRAGMAs report the
+    pragma name as the table.
+    """
+    tokens = _SQL_TOKEN.findall(sql)
+    if not tokens:
+        return "", ""
+    operation = tokens[0].lower()
+    if operation == "with":
+        operation = "select"
+    words = [token.lower() for token in tokens]
+    if operation == "select":
+        depth = 0
+        for i, word in enumerate(words):
+            if word == "(":
+                depth += 1
+            elif word == ")":
+                depth -= 1
+            elif word == "from" and depth == 0 and i + 1 < len(tokens):
+                if tokens[i + 1] == "(":
+                    # FROM (subquery): the table it reads
+                    return operation, statement_target(" ".join(tokens[i + 2:]))[1]
+                return operation, _name(tokens[i + 1])
+        return operation, ""
+    if operation in ("insert", "replace") and "into" in words:
+        return "insert", _name(tokens[words.index("into") + 1])
+    if operation == "update" and len(tokens) > 1:
+        # UPDATE [OR ROLLBACK|ABORT|...] table
+        return operation, _name(tokens[3] if words[1] == "or" and len(tokens) > 3 else tokens[1])
+    if operation == "delete" and len(tokens) > 2:
+        return operation, _name(tokens[2])
+    if operation == "pragma" and len(tokens) > 1:
+        return operation, words[3] if len(tokens) > 3 and tokens[2] == "." else words[1]
+    return operation, ""
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: Dict[str, Any]):
+    for name in PRAGMA_NAMES:
+        if name not in pragmas or pragmas[name] is None:
+            continue
+        value = str(pragmas[name])
+        # Values are interpolated, so only accept bare keywords and integers
+        if not re.fullmatch(r"-?\w+", value):
+            raise ValueError(f"Invalid value for PRAGMA {name}: {value!r}")
+        conn.execute(f"PRAGMA {name} = {value}")
+    unknown = set(pragmas) - set(PRAGMA_NAMES)
+    if unknown:
+        raise ValueError(f"Unsupported PRAGMA(s): {', '.join(sorted(unknown))}")
+
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Times one statement from ``execute`` until its last row is fetched.
+
+    The statement is reported to the connection's listeners once it is
+    finished: after a write, after ``fetchall``, when fetching runs out of
+    rows, or when the cursor is re-executed, closed or garbage collected.
+    The time therefore covers stepping through every row read, not just the
+    first step that ``execute`` runs.
+    """
+
+    _statement: Optional[list] = None
+
+    def execute(self, sql: str, parameters: Any = ()):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except Exception:
+            self._statement = [sql, parameters, time.perf_counter() - started, 0]
+            self._finish()
+            raise
+        self._statement = [sql, parameters, time.perf_counter() - started, 0]
+        if self.description is None:
+            self._statement[3] = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Any):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._statement = [sql, None, time.perf_counter() - started, max(self.rowcount, 0)]
+            self._finish()
+        return self
+
+    def _timed(self, fetch: Callable, *args):
+        started = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            if self._statement is not None:
+                self._statement[2] += time.perf_counter() - started
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if self._statement is not None:
+            if row is None:
+                self._finish()
+            else:
+                self._statement[3] += 1
+        return row
+
+    def fetchmany(self, size: Optional[int] = None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        if self._statement is not None:
+            self._statement[3] += len(rows)
+            if not rows:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._statement is not None:
+            self._statement[3] += len(rows)
+            self._finish()
+        return rows
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _finish(self):
+        statement, self._statement = self._statement, None
+        if statement is None:
+            return
+        for listener in self.connection.statement_listeners:
+            try:
+                listener(*statement)
+            except Exception:
+                # Instrumentation must never fail the query it observes
+                pass
+
+
+class TimedConnection(sqlite3.Connection):
+    """A connection that reports its statements to ``statement_listeners``, and skips timing when there are none."""
+
+    statement_listeners: List[StatementListener] = []
+
+    def execute(self, sql: str, parameters: Any = ()):
+        if not self.statement_listeners:
+            return super().execute(sql, parameters)
+        return self.cursor(TimedCursor).execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Any):
+        if not self.statement_listeners:
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor(TimedCursor).executemany(sql, seq_of_parameters)
+
+
+class SerialWriter:
+    """
+    A dedicated thread that owns the writing connection and runs write jobs in order.
+
+    Jobs that queue up while a transaction is running are committed together
+    (group commit): each job runs inside its own SAVEPOINT so a failing job
+    only undoes its own changes, and the batch pays for a single COMMIT.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], sqlite3.Connection],
+        queue_size: int = 1024,
+        batch_size: int = 64,
+        timeout: float = 5.0,
+    ):
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._connect = connect
+        self._conn: Optional[sqlite3.Connection] = None
+        self._queue: "queue.Queue[Optional[Tuple[Callable, Future, float]]]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._stats = {
+            "jobs": 0,
+            "failed_jobs": 0,
+            "batches": 0,
+            "rejected": 0,
+            "queue_wait_ms": 0.0,
+            "commit_time_ms": 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        future: Future = Future()
+        try:
+            self._queue.put((fn, future, time.perf_counter()), timeout=self.timeout)
+        except queue.Full:
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise PoolExhaustedError(f"Write queue full for more than {self.timeout}s")
+        return future.result()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            batch = [job]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stop = True
+                    break
+                batch.append(job)
+            self._execute(batch)
+            if stop:
+                break
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _execute(self, batch: List[Tuple[Callable, Future, float]]):
+        started = time.perf_counter()
+        outcomes = []
+        try:
+            if self._conn is None:
+                self._conn = self._connect()
+            conn = self._conn
+            # Take the write lock up front rather than upgrading mid-transaction
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, future, _ in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT job")
+                try:
+                    result = fn(conn)
+                except Exception as e:
+                    if not conn.in_transaction:
+                        # SQLite aborted the whole transaction, taking earlier jobs with it
+                        raise
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    outcomes.append((future, False, e))
+                else:
+                    conn.execute("RELEASE job")
+                    outcomes.append((future, True, result))
+            commit_started = time.perf_counter()
+            conn.execute("COMMIT")
+            commit_ms = (time.perf_counter() - commit_started) * 1000
+        except Exception as e:
+            if self._conn is not None and self._conn.in_transaction:
+                self._conn.rollback()
+            for fn, future, _ in batch:
+                if future.done():
+                    continue
+                # Jobs not reached yet are still pending and must be marked running first
+                if future.running() or future.set_running_or_notify_cancel():
+                    future.set_exception(e)
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["jobs"] += len(batch)
+                self._stats["failed_jobs"] += len(batch)
+            return
+
+        for future, ok, value in outcomes:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["jobs"] += len(batch)
+            self._stats["failed_jobs"] += sum(1 for _, ok, _ in outcomes if not ok)
+            self._stats["queue_wait_ms"] += sum((started - enqueued) * 1000 for _, _, enqueued in batch)
+            self._stats["commit_time_ms"] += commit_ms
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"queue_depth": self._queue.qsize(), "batch_size": self.batch_size, **self._stats}
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+class ConnectionPool:
+    """
+    Long-lived SQLite connections shared across requests.
+
+    Reads check out one of at most ``size`` pooled connections. Writes are
+    handed to a single ``SerialWriter`` thread that owns the only writing
+    connection, since SQLite allows one writer at a time anyway; serializing
+    them here avoids lock contention inside the database file.
+
+    Every connection is opened with the same tuning ``pragmas``. Callbacks
+    in ``statement_listeners`` are called after every statement run on any
+    of them, with its SQL, parameters, duration in seconds and the number
+    of rows read or changed.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = 8,
+        timeout: float = 5.0,
+        pragmas: Optional[Dict[str, Any]] = None,
+        writer_queue_size: int = 1024,
+        writer_batch_size: int = 64,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = dict(pragmas or {})
+        self.writer_queue_size = writer_queue_size
+        self.writer_batch_size = writer_batch_size
+
+        # LIFO so the most recently used (warmest page cache) connection is reused first
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._in_use = 0
+        self._lock = threading.Lock()
+
+        self._writer: Optional[SerialWriter] = None
+        self.statement_listeners: List[StatementListener] = []
+
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_ms": 0.0,
+            "exhausted": 0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections are handed between worker threads, never used by two at once
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=TimedConnection)
+        conn.row_factory = sqlite3.Row
+        # Shared, so listeners added later apply to connections already open
+        conn.statement_listeners = self.statement_listeners
+        apply_pragmas(conn, self.pragmas)
+        return conn
+
+    def _connect_writer(self) -> sqlite3.Connection:
+        conn = self._connect()
+        # The writer manages its own BEGIN/SAVEPOINT/COMMIT
+        conn.isolation_level = None
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            self._stats["checkouts"] += 1
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = None
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if conn is not None:
+                self._in_use += 1
+                return conn
+
+        if create:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            with self._lock:
+                self._in_use += 1
+            return conn
+
+        # Every connection is checked out; wait for one to be returned
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._stats["waits"] += 1
+                self._stats["exhausted"] += 1
+                self._stats["wait_time_ms"] += (time.perf_counter() - started) * 1000
+            raise PoolExhaustedError(
+                f"No database connection available after {self.timeout}s (pool size {self.size})"
+            )
+        with self._lock:
+            self._stats["waits"] += 1
+            self._stats["wait_time_ms"] += (time.perf_counter() - started) * 1000
+            self._in_use += 1
+        return conn
+
+    def _release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(conn)
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Check out a pooled connection for reads."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def write(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """
+        Run ``fn(conn)`` on the serialized writer and return its result.
+
+        ``fn`` runs inside a transaction that is committed before this returns;
+        if it raises, its changes are rolled back and the exception re-raised here.
+        """
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = SerialWriter(
+                        self._connect_writer, queue_size=self.writer_queue_size, batch_size=self.writer_batch_size, timeout=self.timeout
+                    )
+        return self._writer.submit(fn)
+
+    def storage_settings(self) -> Dict[str, Any]:
+        """Effective values of the tuned PRAGMAs, as seen by a pooled connection."""
+        with self.reader() as conn:
+            return {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in PRAGMA_NAMES}
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool occupancy and checkout counters."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "timeout": self.timeout,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                **self._stats,
+                "writer": self._writer.stats() if self._writer is not None else None,
+            }
+
+    def close(self):
+        """Close idle connections and the writer; the pool reconnects lazily if used again."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
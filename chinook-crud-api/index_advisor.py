@@ -0,0 +1,435 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from catalog import SchemaCatalog, Table, quote_ident
+from db_pool import ConnectionPool
+from query_log import QueryLog
+from repository import BadRequestError, NotFoundError
+
+logger = logging.getLogger("chinook.indexes")
+
+# Indexes created through the advisor; only these can be dropped through it
+MANAGED_PREFIX = "IX_"
+
+# Indexes holding more columns than this are not worth making covering
+MAX_COVERING_COLUMNS = 5
+
+# PRAGMA optimize only looks beyond the tables its own connection queried from 3.46 on
+OPTIMIZE_ALL_TABLES = sqlite3.sqlite_version_info >= (3, 46, 0)
+
+ANALYZED_OPERATIONS = {"select", "update", "delete"}
+
+_IDENT = r'(?:"(?:[^"]|"")+"|\w+)'
+_COLUMN = rf'(?:({_IDENT})\.)?"((?:[^"]|"")+)"'
+_TABLE_REF = re.compile(
+    rf"\b(?:FROM|JOIN|UPDATE)\s+({_IDENT})"
+    r"(?:\s+(?:AS\s+)?(?!(?:WHERE|JOIN|LEFT|INNER|CROSS|ON|ORDER|GROUP|HAVING|LIMIT|SET)\b)(\w+))?",
+    re.IGNORECASE,
+)
+_JOIN = re.compile(rf"{_COLUMN}\s*=\s*{_COLUMN}")
+_PREDICATE = re.compile(rf"{_COLUMN}\s*(=|!=|<>|>=|<=|>|<|\bIN\b|\bLIKE\b|\bIS\s+NOT\b|\bIS\b|\bBETWEEN\b)", re.IGNORECASE)
+_ROW_VALUE = re.compile(r'\(\s*("(?:[^"]|"")+"(?:\s*,\s*"(?:[^"]|"")+")*)\s*\)\s*IN\b', re.IGNORECASE)
+_REFERENCE = re.compile(_COLUMN)
+_NOT_A_COLUMN = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO|AS)\s*$", re.IGNORECASE)
+_OUTER_STAR = re.compile(r"\s*SELECT\s+(?:rowid AS rowid,\s*)?\*", re.IGNORECASE)
+_SET_CLAUSE = re.compile(r"\bSET\b.*?(?=\bWHERE\b|$)", re.IGNORECASE | re.DOTALL)
+_PLAN_ACCESS = re.compile(r"^(SCAN|SEARCH)\s+(?:TABLE\s+)?(\S+)(?:\s+AS\s+(\S+))?(?:\s+USING\s+(.*))?$")
+
+EQUALITY = {"=", "IN", "IS"}
+RANGE = {"<", "<=", ">", ">=", "BETWEEN"}
+
+
+def _unquote(name: str) -> str:
+    return name[1:-1].replace('""', '"') if name.startswith('"') else name
+
+
+def _column(quoted: str) -> str:
+    """A column name as matched between its double quotes."""
+    return quoted.replace('""', '"')
+
+
+@dataclass
+class Access:
+    """How one table of a statement is filtered: equality, join and range columns, in order of appearance."""
+
+    ref: str
+    table: str
+    equality: List[str] = field(default_factory=list)
+    joins: List[str] = field(default_factory=list)
+    ranges: List[str] = field(default_factory=list)
+    referenced: List[str] = field(default_factory=list)
+    star: bool = False
+    depth: int = 0  # parentheses around the table reference; subqueries are deeper than the outer query
+
+    def add(self, target: List[str], column: str):
+        if column not in target:
+            target.append(column)
+
+    @property
+    def key(self) -> List[str]:
+        """Index columns serving this access: equalities and joins first, then one range."""
+        key = list(self.equality) + [col for col in self.joins if col not in self.equality]
+        key += [col for col in self.ranges if col not in key][:1]
+        return key
+
+
+def table_accesses(sql: str, tables: Dict[str, Table]) -> Dict[str, Access]:
+    """
+    Columns each table reference in ``sql`` is filtered or joined on, keyed by alias.
+
+    This reads the SQL the API itself generates, where every column is a
+    quoted identifier, optionally qualified by an alias. Unqualified
+    columns belong to the statement's outermost table: the first one
+    outside parentheses, since expanded relations come as subqueries in
+    the select list ahead of it.
+    """
+    accesses: Dict[str, Access] = {}
+    outer = None
+    for match in _TABLE_REF.finditer(sql):
+        table = _unquote(match.group(1))
+        if table not in tables:
+            continue
+        ref = match.group(2) or table
+        depth = sql.count("(", 0, match.start()) - sql.count(")", 0, match.start())
+        accesses.setdefault(ref, Access(ref, table, depth=depth))
+        if outer is None and depth == 0:
+            outer = ref
+    if outer is None:
+        return {}
+
+    def resolve(qualifier: Optional[str], column: str) -> Optional[Access]:
+        access = accesses.get(_unquote(qualifier) if qualifier else outer)
+        if access is None or _column(column) not in tables[access.table].columns:
+            return None
+        return access
+
+    where = _SET_CLAUSE.sub("", sql) if sql.lstrip()[:6].upper() == "UPDATE" else sql
+    joined = set()
+    for match in _JOIN.finditer(where):
+        left, right = resolve(match.group(1), match.group(2)), resolve(match.group(3), match.group(4))
+        if left is None or right is None:
+            continue
+        # A correlated subquery looks up its own table by the outer row, never the other way round
+        if left.depth >= right.depth:
+            left.add(left.joins, _column(match.group(2)))
+        if right.depth >= left.depth:
+            right.add(right.joins, _column(match.group(4)))
+        joined.add(match.start())
+    for match in _PREDICATE.finditer(where):
+        access = resolve(match.group(1), match.group(2))
+        if access is None or match.start() in joined:
+            continue
+        column, op = _column(match.group(2)), " ".join(match.group(3).upper().split())
+        if op in EQUALITY:
+            access.add(access.equality, column)
+        elif op in RANGE:
+            access.add(access.ranges, column)
+    for match in _ROW_VALUE.finditer(where):
+        for name in re.findall(r'"(?:[^"]|"")+"', match.group(1)):
+            if resolve(None, name[1:-1]) is not None:
+                accesses[outer].add(accesses[outer].equality, _column(name[1:-1]))
+
+    for match in _REFERENCE.finditer(sql):
+        if _NOT_A_COLUMN.search(sql, 0, match.start()):
+            continue
+        access = resolve(match.group(1), match.group(2))
+        if access is not None:
+            access.add(access.referenced, _column(match.group(2)))
+    accesses[outer].star = bool(_OUTER_STAR.match(sql)) or not sql.lstrip().upper().startswith("SELECT")
+    return accesses
+
+
+def index_columns(table: Table) -> List[List[str]]:
+    """Column lists of every index on ``table``, including an INTEGER PRIMARY KEY (the rowid)."""
+    indexes = [index.columns for index in table.indexes]
+    if len(table.primary_key) == 1 and table.columns[table.primary_key[0]].type.upper() == "INTEGER":
+        indexes.append(list(table.primary_key))
+    return indexes
+
+
+def is_served(table: Table, equality: Sequence[str], ranges: Sequence[str] = ()) -> bool:
+    """Whether an existing index starts with ``equality`` (in any order) followed by ``ranges``."""
+    for columns in index_columns(table):
+        if set(columns[:len(equality)]) == set(equality) and columns[len(equality):len(equality) + len(ranges)] == list(ranges):
+            return True
+    return False
+
+
+def index_name(table: str, columns: Sequence[str]) -> str:
+    """``IX_TrackGenreIdMilliseconds``, after Chinook's own ``IFK_TrackGenreId``."""
+    return MANAGED_PREFIX + table + "".join(re.sub(r"\W", "", col) for col in columns)
+
+
+class IndexAdvisor:
+    """
+    Recommends, creates and drops secondary indexes, and keeps planner statistics fresh.
+
+    Recommendations come from two places: foreign keys without an index
+    starting with their columns, and statements seen by the ``QueryLog``
+    whose ``EXPLAIN QUERY PLAN`` scans a table they filter or join on.
+    Each statement shape is explained once, with the parameters of the
+    statement the log kept for it, and again after the schema changes.
+
+    The index hit rate is the share of filtered table accesses, weighted by
+    calls, that the plan serves from an index (or the rowid) rather than a
+    full scan or an automatic index SQLite builds for a single statement.
+    """
+
+    def __init__(self, pool: ConnectionPool, catalog: SchemaCatalog, query_log: QueryLog, analysis_limit: int = 1000):
+        self.pool = pool
+        self.catalog = catalog
+        self.query_log = query_log
+        self.analysis_limit = analysis_limit
+        self._plans: Dict[str, List[Dict[str, Any]]] = {}
+        self._plans_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_optimize: Optional[Dict[str, Any]] = None
+
+    def _tables(self) -> Dict[str, Table]:
+        with self.pool.reader() as conn:
+            return {name: self.catalog.get(conn, name) for name in self.catalog.tables(conn)}
+
+    def _accesses(self, sample: Dict[str, Any], tables: Dict[str, Table]) -> List[Dict[str, Any]]:
+        """Each filtered table access of a logged statement, with how its plan reaches the table."""
+        with self._lock:
+            if self._plans_version != self.catalog.version:
+                self._plans, self._plans_version = {}, self.catalog.version
+            cached = self._plans.get(sample["fingerprint"])
+        if cached is not None:
+            return cached
+        accesses = table_accesses(sample["sql"], tables)
+        plan = self.query_log.explain(sample["sql"], sample["params"]) or []
+        result = []
+        for line in plan:
+            match = _PLAN_ACCESS.match(line.strip())
+            if not match:
+                continue
+            access = accesses.get(match.group(3) or match.group(2))
+            if access is None or not access.key:
+                # Unfiltered scans have nothing an index could narrow down
+                continue
+            using = match.group(4) or ""
+            if match.group(1) == "SEARCH" and "AUTOMATIC" not in using:
+                outcome = "index"
+            else:
+                outcome = "automatic_index" if "AUTOMATIC" in using else "scan"
+            result.append({"table": access.table, "outcome": outcome, "plan": line.strip(), "access": access})
+        with self._lock:
+            self._plans[sample["fingerprint"]] = result
+        return result
+
+    def usage(self, limit: int = 10) -> Dict[str, Any]:
+        """Index hit rate over the logged statements, per table, and the costliest statements that scan."""
+        tables = self._tables()
+        totals = {"index": 0, "automatic_index": 0, "scan": 0}
+        per_table: Dict[str, Dict[str, int]] = {}
+        misses = []
+        for sample in self.query_log.samples():
+            if sample["operation"] not in ANALYZED_OPERATIONS or sample["params"] is None:
+                continue
+            for access in self._accesses(sample, tables):
+                outcome = access["outcome"]
+                totals[outcome] += sample["calls"]
+                counts = per_table.setdefault(access["table"], {"index": 0, "automatic_index": 0, "scan": 0})
+                counts[outcome] += sample["calls"]
+                if outcome != "index":
+                    misses.append({
+                        "fingerprint": sample["fingerprint"],
+                        "table": access["table"],
+                        "plan": access["plan"],
+                        "calls": sample["calls"],
+                        "total_ms": sample["total_ms"],
+                    })
+        misses.sort(key=lambda miss: miss["total_ms"], reverse=True)
+        return {
+            "index_hit_rate": _hit_rate(totals),
+            "lookups": totals,
+            "tables": {name: {**counts, "index_hit_rate": _hit_rate(counts)} for name, counts in sorted(per_table.items())},
+            "misses": misses[:limit],
+        }
+
+    def recommend(self) -> List[Dict[str, Any]]:
+        """Indexes worth creating, costliest scans first, then unindexed foreign keys."""
+        tables = self._tables()
+        found: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]] = {}
+        for sample in self.query_log.samples():
+            if sample["operation"] not in ANALYZED_OPERATIONS or sample["params"] is None:
+                continue
+            for entry in self._accesses(sample, tables):
+                access: Access = entry["access"]
+                table = tables[access.table]
+                if entry["outcome"] == "index":
+                    continue
+                equality = [col for col in access.key if col not in access.ranges]
+                if is_served(table, equality, access.key[len(equality):]):
+                    # The planner chose to scan despite a usable index; another index will not help
+                    continue
+                columns = list(access.key)
+                extra = [col for col in access.referenced if col not in columns]
+                covering = not access.star and len(columns) + len(extra) <= MAX_COVERING_COLUMNS
+                if covering:
+                    columns += extra
+                recommendation = found.setdefault((access.table, tuple(columns)), {
+                    "name": index_name(access.table, columns),
+                    "table": access.table,
+                    "columns": columns,
+                    "covering": covering,
+                    "reason": "scan",
+                    "calls": 0,
+                    "total_ms": 0.0,
+                    "statements": [],
+                })
+                recommendation["calls"] += sample["calls"]
+                recommendation["total_ms"] = round(recommendation["total_ms"] + sample["total_ms"], 3)
+                recommendation["statements"].append(sample["fingerprint"])
+
+        # An index whose columns start with another one's serves both
+        for (table_name, columns), recommendation in list(found.items()):
+            wider = [
+                other for (other_table, other_columns), other in found.items()
+                if other_table == table_name and len(other_columns) > len(columns) and other_columns[:len(columns)] == columns
+            ]
+            if wider:
+                target = max(wider, key=lambda rec: rec["total_ms"])
+                target["calls"] += recommendation["calls"]
+                target["total_ms"] = round(target["total_ms"] + recommendation["total_ms"], 3)
+                target["statements"] += recommendation["statements"]
+                del found[(table_name, columns)]
+
+        recommendations = sorted(found.values(), key=lambda rec: rec["total_ms"], reverse=True)
+        for table in tables.values():
+            for fk in table.foreign_keys:
+                if is_served(table, fk.columns) or any(
+                    rec["table"] == table.name and set(rec["columns"][:len(fk.columns)]) == set(fk.columns)
+                    for rec in recommendations
+                ):
+                    continue
+                recommendations.append({
+                    "name": index_name(table.name, fk.columns),
+                    "table": table.name,
+                    "columns": list(fk.columns),
+                    "covering": False,
+                    "reason": f"foreign key to {fk.ref_table}",
+                    "calls": 0,
+                    "total_ms": 0.0,
+                    "statements": [],
+                })
+        return recommendations
+
+    def indexes(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": index.name,
+                "table": table.name,
+                "columns": index.columns,
+                "unique": index.unique,
+                "origin": index.origin,
+                "managed": index.name.startswith(MANAGED_PREFIX),
+            }
+            for table in self._tables().values()
+            for index in table.indexes
+        ]
+
+    def create(self, table_name: str, columns: Sequence[str], name: Optional[str] = None) -> Dict[str, Any]:
+        """Create an index (if it does not exist) through the writer, then gather its statistics."""
+        with self.pool.reader() as conn:
+            table = self.catalog.get(conn, table_name)
+        if table is None:
+            raise NotFoundError(f"Table '{table_name}' not found")
+        if not columns:
+            raise BadRequestError("At least one column is required")
+        unknown = [col for col in columns if col not in table.columns]
+        if unknown:
+            raise BadRequestError(f"Unknown column(s) for {table.name}: {', '.join(unknown)}")
+        name = name or index_name(table.name, columns)
+        if not name.startswith(MANAGED_PREFIX):
+            raise BadRequestError(f"Index names must start with {MANAGED_PREFIX}")
+
+        def create(conn: sqlite3.Connection):
+            conn.execute(f"PRAGMA analysis_limit = {int(self.analysis_limit)}")
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {quote_ident(name)} "
+                f"ON {quote_ident(table.name)} ({', '.join(quote_ident(col) for col in columns)})"
+            )
+            conn.execute(f"ANALYZE {quote_ident(name)}")
+
+        started = time.perf_counter()
+        self.pool.write(create)
+        self.catalog.invalidate()
+        logger.info("created index %s on %s (%s)", name, table.name, ", ".join(columns))
+        return {"name": name, "table": table.name, "columns": list(columns), "duration_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+    def create_recommended(self) -> List[Dict[str, Any]]:
+        return [self.create(rec["table"], rec["columns"], rec["name"]) for rec in self.recommend()]
+
+    def drop(self, name: str) -> Dict[str, Any]:
+        if not name.startswith(MANAGED_PREFIX):
+            raise BadRequestError(f"Only indexes named {MANAGED_PREFIX}... are managed here")
+        if not any(index["name"] == name for index in self.indexes()):
+            raise NotFoundError(f"Index '{name}' not found")
+        self.pool.write(lambda conn: conn.execute(f"DROP INDEX IF EXISTS {quote_ident(name)}"))
+        self.catalog.invalidate()
+        logger.info("dropped index %s", name)
+        return {"message": f"Index '{name}' dropped"}
+
+    def optimize(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Refresh the statistics the query planner uses.
+
+        Runs ``PRAGMA optimize``, which only re-analyzes tables whose
+        statistics are missing or stale, or a full ``ANALYZE`` when asked
+        to, when there are no statistics yet, or on SQLite older than 3.46.
+        ``analysis_limit`` bounds the rows sampled per index either way.
+        """
+        def run(conn: sqlite3.Connection) -> str:
+            conn.execute(f"PRAGMA analysis_limit = {int(self.analysis_limit)}")
+            analyzed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+            if full or not analyzed or not OPTIMIZE_ALL_TABLES:
+                conn.execute("ANALYZE")
+                return "analyze"
+            conn.execute("PRAGMA optimize = 0x10002")
+            return "optimize"
+
+        started = time.perf_counter()
+        at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        try:
+            mode = self.pool.write(run)
+        except Exception as e:
+            self.last_optimize = {"at": at, "error": str(e)}
+            raise
+        self.last_optimize = {"at": at, "mode": mode, "duration_ms": round((time.perf_counter() - started) * 1000, 3)}
+        return self.last_optimize
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.optimize()
+            except Exception:
+                logger.exception("scheduled optimize failed")
+
+    def start(self, interval: float):
+        """Run ``optimize`` every ``interval`` seconds on a background thread; 0 disables it."""
+        if interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="index-optimizer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+def _hit_rate(counts: Dict[str, int]) -> Optional[float]:
+    lookups = sum(counts.values())
+    return round(counts["index"] / lookups, 4) if lookups else None
@@ -0,0 +1,36 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Optional
+
+from catalog import Table
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(table: Table, key: List[Any]) -> str:
+    """Build an opaque continuation token from the key of the last row on a page."""
+    payload = json.dumps({"t": table.name, "k": list(key)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(table: Table, cursor: str) -> Optional[List[Any]]:
+    """
+    Return the key to seek past, or None for the first page.
+
+    An empty cursor starts from the beginning of the table.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = payload["k"]
+        table_name = payload["t"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+    if table_name != table.name or not isinstance(key, list) or len(key) != len(table.key_columns):
+        raise InvalidCursorError("Cursor does not belong to this table")
+    return key
@@ -0,0 +1,172 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from catalog import Table, quote_ident
+from relations import RelationError, decode_expanded, expand_columns, parse_expand
+
+# Query parameters of GET /{table_name} that are not column filters
+RESERVED_PARAMS = {
+    "limit", "offset", "cursor", "ids", "fields", "order_by", "format", "batch_size", "expand", "path",
+    "metrics", "group_by", "having",
+}
+
+# Filter suffixes: ?Milliseconds__gte=300000, ?GenreId__in=1,2,3
+FILTER_OPERATORS = {
+    "eq": "=",
+    "ne": "!=",
+    "gt": ">",
+    "gte": ">=",
+    "lt": "<",
+    "lte": "<=",
+    "like": "LIKE",
+    "in": "IN",
+}
+
+
+class QueryError(ValueError):
+    """Raised for filters, fields or sort keys that do not match the table schema."""
+
+
+@dataclass
+class RecordQuery:
+    """A validated selection over one table, compiled to parameterized SQL."""
+
+    table: Table
+    fields: Optional[List[str]] = None
+    where: List[str] = field(default_factory=list)
+    params: List[Any] = field(default_factory=list)
+    order_by: List[Tuple[str, bool]] = field(default_factory=list)  # (column, descending)
+    expand: List[Tuple[str, str]] = field(default_factory=list)  # (relation, select expression)
+
+    def select_clause(self, extra: Iterable[str] = ()) -> str:
+        if self.fields is None:
+            select = "*"
+        else:
+            columns = list(self.fields) + [col for col in extra if col not in self.fields]
+            select = ", ".join(quote_ident(col) for col in columns)
+        for _, expression in self.expand:
+            select += f", {expression}"
+        return select
+
+    def decode(self, row) -> Dict[str, Any]:
+        """Turn a result row into a record, parsing expanded relations."""
+        record = dict(row)
+        if self.expand:
+            decode_expanded(record, [name for name, _ in self.expand])
+        return record
+
+    def where_clause(self) -> str:
+        return " AND ".join(self.where)
+
+    def order_clause(self) -> str:
+        return ", ".join(f"{quote_ident(col)}{' DESC' if desc else ''}" for col, desc in self.order_by)
+
+    def to_sql(self, limit: Optional[int] = None, offset: Optional[int] = None) -> Tuple[str, List[Any]]:
+        sql = f"SELECT {self.select_clause()} FROM {quote_ident(self.table.name)}"
+        params = list(self.params)
+        if self.where:
+            sql += f" WHERE {self.where_clause()}"
+        if self.order_by:
+            sql += f" ORDER BY {self.order_clause()}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+            if offset:
+                sql += " OFFSET ?"
+                params.append(offset)
+        return sql, params
+
+
+def check_column(table: Table, column: str) -> str:
+    if column not in table.columns:
+        raise QueryError(f"Unknown column for {table.name}: {column}")
+    return column
+
+
+def parse_fields(table: Table, fields: Optional[str]) -> Optional[List[str]]:
+    """``fields=TrackId,Name`` -> ["TrackId", "Name"]; None selects every column."""
+    if not fields:
+        return None
+    return [check_column(table, name.strip()) for name in fields.split(",") if name.strip()]
+
+
+def parse_order_by(table: Table, order_by: Optional[str]) -> List[Tuple[str, bool]]:
+    """``order_by=-Milliseconds,Name`` sorts descending on Milliseconds, then ascending on Name."""
+    if not order_by:
+        return []
+    keys = []
+    for item in order_by.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        descending = item.startswith("-")
+        keys.append((check_column(table, item.lstrip("+-")), descending))
+    return keys
+
+
+def parse_filters(
+    table: Table,
+    filters: Iterable[Tuple[str, str]],
+    alias: Optional[str] = None,
+    resolve: Optional[Callable[[str], str]] = None,
+) -> Tuple[List[str], List[Any]]:
+    """
+    Compile ``column[__op]=value`` pairs into ``WHERE`` terms and bound parameters.
+
+    Values arrive as strings and are compared against the column directly, so
+    SQLite applies the column's type affinity and can use an index on it.
+    Columns are qualified with ``alias`` when the table is part of a join, or
+    mapped to SQL by ``resolve`` when references can span relations.
+    """
+    where = []
+    params: List[Any] = []
+    for key, value in filters:
+        column, _, op = key.partition("__")
+        op = op or "eq"
+        if op not in FILTER_OPERATORS:
+            raise QueryError(f"Unknown filter operator '{op}', expected one of: {', '.join(FILTER_OPERATORS)}")
+        if resolve is not None:
+            column_sql = resolve(column)
+        else:
+            check_column(table, column)
+            column_sql = f"{alias}.{quote_ident(column)}" if alias else quote_ident(column)
+
+        if op == "in":
+            values = value if isinstance(value, list) else [v.strip() for v in str(value).split(",")]
+            if not values:
+                raise QueryError(f"Empty value list for {key}")
+            where.append(f"{column_sql} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+        elif op in ("eq", "ne") and str(value).lower() == "null":
+            where.append(f"{column_sql} IS {'NOT ' if op == 'ne' else ''}NULL")
+        else:
+            where.append(f"{column_sql} {FILTER_OPERATORS[op]} ?")
+            params.append(value)
+    return where, params
+
+
+def build_query(
+    table: Table,
+    filters: Iterable[Tuple[str, str]] = (),
+    fields: Optional[str] = None,
+    order_by: Optional[str] = None,
+    expand: Optional[str] = None,
+) -> RecordQuery:
+    where, params = parse_filters(table, filters)
+    try:
+        expanded = expand_columns(table, parse_expand(table, expand)) if expand else []
+    except RelationError as e:
+        raise QueryError(str(e))
+    return RecordQuery(
+        table=table,
+        fields=parse_fields(table, fields),
+        where=where,
+        params=params,
+        order_by=parse_order_by(table, order_by),
+        expand=expanded,
+    )
+
+
+def filter_params(query_params: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Pick the column filters out of a request's ``(key, value)`` query parameters."""
+    return [(key, value) for key, value in query_params if key not in RESERVED_PARAMS]
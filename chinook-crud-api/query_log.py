@@ -0,0 +1,231 @@
+import collections
+import functools
+import logging
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from db_pool import statement_target
+
+logger = logging.getLogger("chinook.slow_queries")
+
+# Statements worth an EXPLAIN QUERY PLAN; transaction control and PRAGMAs have no plan
+EXPLAINED_OPERATIONS = {"select", "insert", "update", "delete"}
+
+ORDERINGS = ("total", "mean", "max", "calls", "rows")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w\".])-?\d+(?:\.\d+)?(?![\w\"])")
+_PLACEHOLDERS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\?, \.\.\.\)(?:\s*,\s*\(\?, \.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(sql: str) -> str:
+    """
+    ``sql`` with literals replaced by ``?`` and lists of placeholders collapsed.
+
+    ``IN (?, ?, ?)`` and ``IN (?, ?)`` both become ``IN (?, ...)``, and
+    multi-row ``VALUES`` lists become a single row, so statements that only
+    differ in how many ids they look up share a fingerprint.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _SPACE.sub(" ", sql).strip()
+    sql = _PLACEHOLDERS.sub("(?, ...)", sql)
+    return _ROWS.sub("(?, ...)", sql)
+
+
+def _shape(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    return type(value).__name__
+
+
+def param_shapes(params: Any) -> Any:
+    """Types (and lengths of strings) of bound parameters; the values themselves are never logged."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {name: _shape(value) for name, value in params.items()}
+    shapes = [_shape(value) for value in params]
+    # Long IN lists: keep the first few and count the rest
+    if len(shapes) > 10:
+        return shapes[:10] + [f"... {len(shapes) - 10} more"]
+    return shapes
+
+
+class QueryStats:
+    __slots__ = ("fingerprint", "operation", "table", "calls", "total", "max", "rows", "slow", "sql", "params")
+
+    def __init__(self, fingerprint: str, operation: str, table: str, sql: str, params: Any):
+        self.fingerprint = fingerprint
+        self.operation = operation
+        self.table = table
+        # One concrete statement of this shape, for EXPLAIN QUERY PLAN later on
+        self.sql = sql
+        self.params = params
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.slow = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "operation": self.operation,
+            "table": self.table,
+            "calls": self.calls,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "rows": self.rows,
+            "mean_rows": round(self.rows / self.calls, 1) if self.calls else 0.0,
+            "slow_calls": self.slow,
+        }
+
+
+class QueryLog:
+    """
+    Per-fingerprint statement statistics and a log of slow statements.
+
+    ``record`` is a pool statement listener: it is called after every
+    statement with its SQL, parameters, duration and row count. Statements
+    are grouped by ``fingerprint``. At most ``max_fingerprints`` groups are
+    kept; when a new one arrives, the group with the least total time is
+    dropped.
+
+    Statements slower than ``threshold_ms`` are logged as warnings on the
+    ``chinook.slow_queries`` logger and kept in a ring of the last
+    ``slow_log_size``. Each entry has the statement's plan, its parameter
+    shapes and its row count. The plan comes from ``EXPLAIN QUERY PLAN`` on
+    a separate read-only connection, so it never competes with requests for
+    a pooled connection or runs inside the writer's transaction.
+    """
+
+    def __init__(self, db_path: str, threshold_ms: float = 100.0, max_fingerprints: int = 500, slow_log_size: int = 100):
+        self.db_path = db_path
+        self.threshold_ms = threshold_ms
+        self.max_fingerprints = max_fingerprints
+        self._stats: Dict[str, QueryStats] = {}
+        self._slow: "collections.deque[Dict[str, Any]]" = collections.deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+        self._explain_lock = threading.Lock()
+        self._explain_conn: Optional[sqlite3.Connection] = None
+        self._explain_version: Optional[int] = None
+        self.since = time.time()
+
+    def record(self, sql: str, params: Any, seconds: float, rows: int):
+        key = fingerprint(sql)
+        slow = seconds * 1000 >= self.threshold_ms
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    del self._stats[min(self._stats.values(), key=lambda s: s.total).fingerprint]
+                stats = self._stats[key] = QueryStats(key, *statement_target(sql), sql, params)
+            stats.calls += 1
+            stats.total += seconds
+            stats.rows += rows
+            if seconds > stats.max:
+                stats.max = seconds
+            if slow:
+                stats.slow += 1
+            operation = stats.operation
+        if slow:
+            self._log_slow(sql, params, seconds, rows, key, operation)
+
+    def _log_slow(self, sql: str, params: Any, seconds: float, rows: int, key: str, operation: str):
+        plan = self.explain(sql, params) if operation in EXPLAINED_OPERATIONS else None
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "duration_ms": round(seconds * 1000, 3),
+            "rows": rows,
+            "fingerprint": key,
+            "sql": sql,
+            "params": param_shapes(params),
+            "plan": plan,
+        }
+        with self._lock:
+            self._slow.append(entry)
+        logger.warning(
+            "slow query (%.1f ms, %d rows): %s params=%s plan=%s",
+            entry["duration_ms"], rows, key, entry["params"], " | ".join(plan) if plan else None,
+        )
+
+    def explain(self, sql: str, params: Any) -> Optional[List[str]]:
+        """``EXPLAIN QUERY PLAN`` of ``sql`` as indented lines, e.g. ``["SCAN Track", "SEARCH Album USING ..."]``."""
+        if params is None:
+            # executemany: no single set of parameters to plan with
+            return None
+        with self._explain_lock:
+            try:
+                if self._explain_conn is not None:
+                    # EXPLAIN alone never reloads the schema, so indexes created since would not show up
+                    version = self._explain_conn.execute("PRAGMA schema_version").fetchone()[0]
+                    if version != self._explain_version:
+                        self._explain_conn.close()
+                        self._explain_conn = None
+                if self._explain_conn is None:
+                    uri = Path(self.db_path).absolute().as_uri() + "?mode=ro"
+                    self._explain_conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                    self._explain_version = self._explain_conn.execute("PRAGMA schema_version").fetchone()[0]
+                rows = self._explain_conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            except sqlite3.Error as e:
+                return [f"EXPLAIN failed: {e}"]
+        depth = {0: -1}
+        lines = []
+        for node, parent, _, detail in rows:
+            depth[node] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[node] + detail)
+        return lines
+
+    def top(self, limit: int = 20, order_by: str = "total") -> List[Dict[str, Any]]:
+        """The ``limit`` fingerprints with the highest ``order_by``: total, mean or max time, calls or rows."""
+        if order_by not in ORDERINGS:
+            raise ValueError(f"order_by must be one of: {', '.join(ORDERINGS)}")
+        with self._lock:
+            entries = [stats.to_dict() for stats in self._stats.values()]
+        field = {"total": "total_ms", "mean": "mean_ms", "max": "max_ms", "calls": "calls", "rows": "rows"}[order_by]
+        entries.sort(key=lambda entry: entry[field], reverse=True)
+        return entries[:limit]
+
+    def samples(self) -> List[Dict[str, Any]]:
+        """Every tracked fingerprint with one of its statements (``sql`` and ``params``) alongside its stats."""
+        with self._lock:
+            return [{**stats.to_dict(), "sql": stats.sql, "params": stats.params} for stats in self._stats.values()]
+
+    def slow(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """The most recent slow statements, newest first."""
+        with self._lock:
+            return list(reversed(self._slow))[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "since": datetime.fromtimestamp(self.since, timezone.utc).isoformat(timespec="seconds"),
+                "threshold_ms": self.threshold_ms,
+                "fingerprints": len(self._stats),
+                "statements": sum(stats.calls for stats in self._stats.values()),
+                "slow_statements": sum(stats.slow for stats in self._stats.values()),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+            self.since = time.time()
+
+    def close(self):
+        with self._explain_lock:
+            if self._explain_conn is not None:
+                self._explain_conn.close()
+                self._explain_conn = None
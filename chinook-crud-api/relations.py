@@ -0,0 +1,109 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from catalog import Relation, Table, quote_ident
+
+MAX_EXPAND_DEPTH = 3
+MAX_PATH_LENGTH = 8
+
+# Parsed ?expand= value: {"Tracks": {"InvoiceLines": {}}, "Artist": {}}
+ExpandTree = Dict[str, "ExpandTree"]
+
+
+class RelationError(ValueError):
+    """Raised for expand or path values that do not follow the table's foreign keys."""
+
+
+def resolve_path(table: Table, path: str) -> List[Relation]:
+    """Resolve a dotted relation path such as ``Albums.Tracks.InvoiceLines`` starting at ``table``."""
+    relations = []
+    current = table
+    for name in path.split("."):
+        name = name.strip()
+        relation = current.relations.get(name)
+        if relation is None:
+            available = ", ".join(current.relations) or "none"
+            raise RelationError(f"Unknown relation {current.name}.{name} (available: {available})")
+        relations.append(relation)
+        current = relation.target_table
+    if len(relations) > MAX_PATH_LENGTH:
+        raise RelationError(f"Relation paths are limited to {MAX_PATH_LENGTH} steps")
+    return relations
+
+
+def parse_expand(table: Table, expand: str) -> ExpandTree:
+    """``expand=Tracks.Genre,Artist`` -> {"Tracks": {"Genre": {}}, "Artist": {}}, validated against the catalog."""
+    tree: ExpandTree = {}
+    for path in expand.split(","):
+        path = path.strip()
+        if not path:
+            continue
+        relations = resolve_path(table, path)
+        if len(relations) > MAX_EXPAND_DEPTH:
+            raise RelationError(f"expand is limited to {MAX_EXPAND_DEPTH} levels")
+        node = tree
+        for relation in relations:
+            node = node.setdefault(relation.name, {})
+    return tree
+
+
+def _literal(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _json_row(table: Table, alias: str, tree: ExpandTree, depth: int) -> str:
+    pairs = [f"{_literal(col)}, {alias}.{quote_ident(col)}" for col in table.columns]
+    for name, subtree in tree.items():
+        relation = table.relations[name]
+        # json() keeps the nested document from being embedded as a string
+        pairs.append(f"{_literal(name)}, json({_subquery(relation, alias, subtree, depth + 1)})")
+    return f"json_object({', '.join(pairs)})"
+
+
+def _subquery(relation: Relation, outer: str, tree: ExpandTree, depth: int) -> str:
+    target = relation.target_table
+    alias = f"x{depth}"
+    row = _json_row(target, alias, tree, depth)
+    if relation.many:
+        row = f"json_group_array({row})"
+    return (
+        f"(SELECT {row} FROM {quote_ident(target.name)} AS {alias} "
+        f"WHERE {relation.join_condition(outer, alias)})"
+    )
+
+
+def expand_columns(table: Table, tree: ExpandTree, outer: Optional[str] = None) -> List[Tuple[str, str]]:
+    """
+    Correlated subqueries that build each expanded relation as JSON inside SQLite.
+
+    Returns ``(name, select expression)`` pairs to append to the outer
+    ``SELECT``; the outer table is referenced by ``outer`` (its name by default).
+    """
+    outer = outer or quote_ident(table.name)
+    return [
+        (name, f"{_subquery(table.relations[name], outer, subtree, 1)} AS {quote_ident(name)}")
+        for name, subtree in tree.items()
+    ]
+
+
+def path_join(relations: List[Relation], start: Table) -> Tuple[str, str]:
+    """
+    ``FROM ... JOIN ...`` clause walking ``relations`` from ``start``.
+
+    Returns the clause and the alias of the last table; the start table is ``t0``.
+    """
+    sql = f"{quote_ident(start.name)} AS t0"
+    for i, relation in enumerate(relations, 1):
+        sql += (
+            f" JOIN {quote_ident(relation.target)} AS t{i}"
+            f" ON {relation.join_condition(f't{i - 1}', f't{i}')}"
+        )
+    return sql, f"t{len(relations)}"
+
+
+def decode_expanded(record: Dict[str, Any], names: List[str]) -> Dict[str, Any]:
+    """Parse the JSON text SQLite returned for each expanded relation."""
+    for name in names:
+        if record.get(name) is not None:
+            record[name] = json.loads(record[name])
+    return record
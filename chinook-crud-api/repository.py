@@ -0,0 +1,429 @@
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from aggregate import build_aggregation
+from bulk import BulkAbort, bulk_create, bulk_delete, bulk_update, summarize
+from catalog import SchemaCatalog, Table, quote_ident
+from db_pool import ConnectionPool
+from pagination import InvalidCursorError, decode_cursor, encode_cursor
+from query import QueryError, RecordQuery, build_query, parse_filters
+from relations import RelationError, parse_expand, path_join, resolve_path
+
+BULK_OPERATIONS = {
+    "create": bulk_create,
+    "update": bulk_update,
+    "delete": bulk_delete,
+}
+
+
+class RepositoryError(Exception):
+    """An error meant for the caller, carrying the HTTP status it maps to."""
+
+    status_code = 500
+
+    def __init__(self, detail: Any):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class BadRequestError(RepositoryError):
+    status_code = 400
+
+
+class NotFoundError(RepositoryError):
+    status_code = 404
+
+
+class PayloadTooLargeError(RepositoryError):
+    status_code = 413
+
+
+class ConflictError(RepositoryError):
+    """A write that violates a constraint: a duplicate key, a missing foreign key row, a NULL in a NOT NULL column."""
+
+    status_code = 409
+
+
+@contextmanager
+def constraint_errors():
+    try:
+        yield
+    except sqlite3.IntegrityError as e:
+        raise ConflictError(str(e))
+
+
+class Repository:
+    """
+    The data operations behind the API routes, independent of HTTP.
+
+    ``server.py`` exposes these over FastAPI; the MCP server's in-process
+    backend calls them directly. ``filters`` are ``(column[__op], value)``
+    pairs as accepted by ``query.parse_filters``; the other arguments take
+    the same strings as the matching query parameters.
+
+    Callbacks in ``write_listeners`` are called with the table name after
+    every committed write to it.
+    """
+
+    def __init__(self, pool: ConnectionPool, catalog: SchemaCatalog, bulk_max_rows: int = 10000, max_page_size: int = 10000):
+        self.pool = pool
+        self.catalog = catalog
+        self.bulk_max_rows = bulk_max_rows
+        self.max_page_size = max_page_size
+        self.write_listeners: List[Callable[[str], None]] = []
+
+    def _written(self, table_name: str):
+        for listener in self.write_listeners:
+            listener(table_name)
+
+    def get_table(self, conn: sqlite3.Connection, table_name: str) -> Table:
+        table = self.catalog.get(conn, table_name)
+        if table is None:
+            raise NotFoundError("Table not found")
+        return table
+
+    def build_query(
+        self,
+        table: Table,
+        filters: Iterable[Tuple[str, Any]] = (),
+        fields: Optional[str] = None,
+        order_by: Optional[str] = None,
+        expand: Optional[str] = None,
+    ) -> RecordQuery:
+        try:
+            return build_query(table, filters, fields, order_by, expand)
+        except QueryError as e:
+            raise BadRequestError(str(e))
+
+    def tables_read(self, table_name: str, expand: Optional[str] = None) -> Set[str]:
+        """Tables a read of ``table_name`` with ``expand`` depends on."""
+        with self.pool.reader() as conn:
+            table = self.get_table(conn, table_name)
+            tables = {table.name}
+            if expand:
+                try:
+                    tree = parse_expand(table, expand)
+                except RelationError as e:
+                    raise BadRequestError(str(e))
+                nodes = [(table, tree)]
+                while nodes:
+                    current, subtree = nodes.pop()
+                    for name, children in subtree.items():
+                        target = current.relations[name].target_table
+                        tables.add(target.name)
+                        nodes.append((target, children))
+            return tables
+
+    def tables(self) -> List[str]:
+        with self.pool.reader() as conn:
+            return self.catalog.tables(conn)
+
+    def describe(self, table_name: str) -> Dict[str, Any]:
+        with self.pool.reader() as conn:
+            return self.get_table(conn, table_name).describe()
+
+    def list_records(
+        self,
+        table_name: str,
+        filters: Iterable[Tuple[str, Any]] = (),
+        limit: int = 100,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+        order_by: Optional[str] = None,
+        expand: Optional[str] = None,
+    ):
+        self._check_page(limit, offset)
+        with self.pool.reader() as conn:
+            table = self.get_table(conn, table_name)
+            query = self.build_query(table, filters, fields, order_by, expand)
+
+            if cursor is not None:
+                return self._records_after(conn, query, cursor, limit)
+
+            sql, params = query.to_sql(limit=limit, offset=offset)
+            rows = conn.execute(sql, params)
+            return [query.decode(row) for row in rows.fetchall()]
+
+    def _records_after(self, conn: sqlite3.Connection, query: RecordQuery, cursor: str, limit: int):
+        """Keyset pagination: seek past the key in ``cursor`` instead of counting an offset."""
+        table = query.table
+        if query.order_by:
+            raise BadRequestError("order_by cannot be combined with cursor, which always orders by primary key")
+        try:
+            after = decode_cursor(table, cursor)
+        except InvalidCursorError as e:
+            raise BadRequestError(str(e))
+
+        key_columns = ", ".join(quote_ident(col) for col in table.key_columns)
+        if table.primary_key:
+            # Key columns are needed to build the next cursor even when not projected
+            select = query.select_clause(extra=table.primary_key)
+            hidden = [col for col in table.primary_key if query.fields is not None and col not in query.fields]
+        else:
+            # Tables without a declared primary key page on rowid, which SELECT * does not include
+            select = f"rowid AS rowid, {query.select_clause()}"
+            hidden = []
+
+        where = list(query.where)
+        params = list(query.params)
+        if after is not None:
+            where.append(f"({key_columns}) > ({', '.join('?' for _ in after)})")
+            params.extend(after)
+        sql = f"SELECT {select} FROM {quote_ident(table.name)}"
+        if where:
+            sql += f" WHERE {' AND '.join(where)}"
+        # Fetch one extra row to know whether another page exists
+        sql += f" ORDER BY {key_columns} LIMIT ?"
+        params.append(limit + 1)
+
+        records = [query.decode(row) for row in conn.execute(sql, params).fetchall()]
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_cursor = encode_cursor(table, [records[-1][col] for col in table.key_columns])
+        for record in records:
+            for col in hidden:
+                del record[col]
+        return {"records": records, "next_cursor": next_cursor}
+
+    def get_record(self, table_name: str, record_id: Any, expand: Optional[str] = None) -> Dict[str, Any]:
+        with self.pool.reader() as conn:
+            table = self.get_table(conn, table_name)
+            key = self._parse_key(table, record_id)
+            query = self.build_query(table, expand=expand)
+
+            cursor = conn.execute(f"SELECT {query.select_clause()} FROM {quote_ident(table.name)} WHERE {table.key_clause()}", key)
+            row = cursor.fetchone()
+            if not row:
+                raise NotFoundError("Record not found")
+            return query.decode(row)
+
+    def get_many(
+        self,
+        table_name: str,
+        ids: Iterable[Any],
+        fields: Optional[str] = None,
+        expand: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Fetch records by key in as few queries as SQLite's variable limit allows.
+
+        ``ids`` are plain ids, comma-separated composite ids or
+        ``{column: value}`` dicts. Strings may hold several ids separated by
+        ``;``, or by ``,`` when the key has a single column: ``"1;2;3"``,
+        ``"1,2,3"`` or ``"1,3402;1,3389"``. Records come back in request order,
+        and ids with no matching row are listed under ``missing``.
+        """
+        with self.pool.reader() as conn:
+            table = self.get_table(conn, table_name)
+            keys = self._parse_ids(table, ids)
+            if len(keys) > self.bulk_max_rows:
+                raise PayloadTooLargeError(f"At most {self.bulk_max_rows} ids per request")
+            query = self.build_query(table, (), fields, None, expand)
+
+            key_columns = table.key_columns
+            if table.primary_key:
+                select = query.select_clause(extra=key_columns)
+                hidden = [col for col in key_columns if query.fields is not None and col not in query.fields]
+            else:
+                select = f"rowid AS rowid, {query.select_clause()}"
+                hidden = []
+
+            if len(key_columns) == 1:
+                column = quote_ident(key_columns[0])
+                match = lambda n: f"{column} IN ({', '.join('?' for _ in range(n))})"
+            else:
+                # Row values: ("PlaylistId", "TrackId") IN (VALUES (?, ?), (?, ?))
+                columns = ", ".join(quote_ident(col) for col in key_columns)
+                values = f"({', '.join('?' for _ in key_columns)})"
+                match = lambda n: f"({columns}) IN (VALUES {', '.join(values for _ in range(n))})"
+
+            chunk_size = max(1, conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER) // len(key_columns))
+            found: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+            for start in range(0, len(keys), chunk_size):
+                chunk = keys[start:start + chunk_size]
+                sql = f"SELECT {select} FROM {quote_ident(table.name)} WHERE {match(len(chunk))}"
+                params = [value for key in chunk for value in key]
+                for row in conn.execute(sql, params).fetchall():
+                    record = query.decode(row)
+                    found[tuple(str(record[col]) for col in key_columns)] = record
+
+        records, missing = [], []
+        for key in keys:
+            record = found.get(tuple(str(value) for value in key))
+            if record is None:
+                missing.append(key[0] if len(key) == 1 else ",".join(str(value) for value in key))
+                continue
+            for col in hidden:
+                record.pop(col, None)
+            records.append(record)
+        return {"records": records, "missing": missing}
+
+    def _parse_ids(self, table: Table, ids: Iterable[Any]) -> List[Tuple[Any, ...]]:
+        keys, seen = [], set()
+        single = len(table.key_columns) == 1
+        for item in ids:
+            if isinstance(item, dict):
+                missing = [col for col in table.key_columns if col not in item]
+                if missing:
+                    raise BadRequestError(f"Missing key column(s): {', '.join(missing)}")
+                parsed = [tuple(item[col] for col in table.key_columns)]
+            elif isinstance(item, str):
+                parts = [part.strip() for part in item.replace(";", ",").split(",")] if single else item.split(";")
+                parsed = [self._parse_key(table, part) for part in parts if part.strip()]
+            else:
+                parsed = [self._parse_key(table, item)]
+            for key in parsed:
+                if tuple(str(value) for value in key) not in seen:
+                    seen.add(tuple(str(value) for value in key))
+                    keys.append(key)
+        if not keys:
+            raise BadRequestError("No ids given")
+        return keys
+
+    def related(
+        self,
+        table_name: str,
+        path: str,
+        filters: Iterable[Tuple[str, Any]] = (),
+        limit: int = 100,
+        offset: int = 0,
+        fields: Optional[str] = None,
+        order_by: Optional[str] = None,
+        expand: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        self._check_page(limit, offset)
+        with self.pool.reader() as conn:
+            start = self.get_table(conn, table_name)
+            try:
+                relations = resolve_path(start, path)
+                start_where, start_params = parse_filters(start, filters, alias="t0")
+            except (RelationError, QueryError) as e:
+                raise BadRequestError(str(e))
+            target = relations[-1].target_table
+            query = self.build_query(target, (), fields, order_by, expand)
+
+            join, last = path_join(relations, start)
+            key_columns = ", ".join(quote_ident(col) for col in target.key_columns)
+            last_key_columns = ", ".join(f"{last}.{quote_ident(col)}" for col in target.key_columns)
+            semijoin = f"({key_columns}) IN (SELECT {last_key_columns} FROM {join}"
+            if start_where:
+                semijoin += f" WHERE {' AND '.join(start_where)}"
+            semijoin += ")"
+            query.where.append(semijoin)
+            query.params.extend(start_params)
+
+            sql, params = query.to_sql(limit=limit, offset=offset)
+            return [query.decode(row) for row in conn.execute(sql, params).fetchall()]
+
+    def aggregate(
+        self,
+        table_name: str,
+        metrics: str = "count",
+        group_by: Optional[str] = None,
+        filters: Iterable[Tuple[str, Any]] = (),
+        having: Optional[str] = None,
+        order_by: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        with self.pool.reader() as conn:
+            table = self.get_table(conn, table_name)
+            try:
+                aggregation = build_aggregation(
+                    table,
+                    metrics,
+                    group_by=group_by,
+                    filters=filters,
+                    having=having,
+                    order_by=order_by,
+                )
+            except QueryError as e:
+                raise BadRequestError(str(e))
+
+            sql, params = aggregation.to_sql(limit=limit)
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+    def create(self, table_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        def insert(conn: sqlite3.Connection):
+            table = self.get_table(conn, table_name)
+            self._check_columns(table, data.keys())
+
+            columns = ", ".join(quote_ident(k) for k in data.keys())
+            placeholders = ", ".join(["?" for _ in data])
+
+            with constraint_errors():
+                cursor = conn.execute(f"INSERT INTO {quote_ident(table.name)} ({columns}) VALUES ({placeholders})", list(data.values()))
+            return {"id": cursor.lastrowid, "message": "Record created"}
+
+        result = self.pool.write(insert)
+        self._written(table_name)
+        return result
+
+    def update(self, table_name: str, record_id: Any, data: Dict[str, Any]) -> Dict[str, Any]:
+        def update(conn: sqlite3.Connection):
+            table = self.get_table(conn, table_name)
+            key = self._parse_key(table, record_id)
+            self._check_columns(table, data.keys())
+
+            set_clause = ", ".join([f"{quote_ident(k)} = ?" for k in data.keys()])
+
+            with constraint_errors():
+                cursor = conn.execute(f"UPDATE {quote_ident(table.name)} SET {set_clause} WHERE {table.key_clause()}", list(data.values()) + list(key))
+            if cursor.rowcount == 0:
+                raise NotFoundError("Record not found")
+            return {"message": "Record updated"}
+
+        result = self.pool.write(update)
+        self._written(table_name)
+        return result
+
+    def delete(self, table_name: str, record_id: Any) -> Dict[str, Any]:
+        def delete(conn: sqlite3.Connection):
+            table = self.get_table(conn, table_name)
+            key = self._parse_key(table, record_id)
+
+            with constraint_errors():
+                cursor = conn.execute(f"DELETE FROM {quote_ident(table.name)} WHERE {table.key_clause()}", key)
+            if cursor.rowcount == 0:
+                raise NotFoundError("Record not found")
+            return {"message": "Record deleted"}
+
+        result = self.pool.write(delete)
+        self._written(table_name)
+        return result
+
+    def bulk(self, operation: str, table_name: str, items: List[Any], mode: str = "atomic") -> Dict[str, Any]:
+        """Run a bulk operation in one writer transaction; atomic failures roll back everything."""
+        if operation not in BULK_OPERATIONS:
+            raise BadRequestError(f"Unknown bulk operation '{operation}'")
+        if mode not in ("atomic", "partial"):
+            raise BadRequestError("mode must be 'atomic' or 'partial'")
+        if len(items) > self.bulk_max_rows:
+            raise PayloadTooLargeError(f"At most {self.bulk_max_rows} rows per bulk request")
+        execute = BULK_OPERATIONS[operation]
+        try:
+            results = self.pool.write(lambda conn: execute(conn, self.get_table(conn, table_name), items, mode == "atomic"))
+        except BulkAbort as e:
+            raise BadRequestError({"message": "Bulk operation rolled back", "index": e.index, "error": e.error})
+        self._written(table_name)
+        return summarize(mode, results)
+
+    def _check_page(self, limit: int, offset: int):
+        """The routes reject these with 422; in-process callers such as the MCP local backend get here directly."""
+        if not 1 <= limit <= self.max_page_size:
+            raise BadRequestError(f"limit must be between 1 and {self.max_page_size}")
+        if offset < 0:
+            raise BadRequestError("offset must not be negative")
+
+    def _parse_key(self, table: Table, record_id: Any):
+        try:
+            return table.parse_key(record_id)
+        except ValueError as e:
+            raise BadRequestError(str(e))
+
+    def _check_columns(self, table: Table, columns):
+        unknown = [name for name in columns if name not in table.columns]
+        if unknown:
+            raise BadRequestError(f"Unknown column(s) for {table.name}: {', '.join(unknown)}")
@@ -0,0 +1,149 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, Optional
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    etag: str
+    tables: FrozenSet[str]
+    expires_at: float
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """``If-None-Match`` comparison: weak, against a list of tags or ``*``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+class ResponseCache:
+    """
+    Read-through cache of rendered JSON responses, bounded by total bytes and age.
+
+    Entries are evicted least recently used first once ``max_bytes`` is
+    exceeded, and expire ``ttl`` seconds after they were stored so writes made
+    outside this process are picked up eventually. Each entry records the
+    tables its body was read from; ``invalidate(table)`` drops every entry
+    depending on that table.
+
+    A response computed while one of its tables was being written is not
+    stored: ``begin()`` returns a token taken before the read, and ``put``
+    ignores the entry if any of its tables was invalidated since.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 30.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._by_table: Dict[str, set] = {}
+        self._invalidated_at: Dict[str, int] = {}
+        self._sequence = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "not_modified": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "oversized": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def begin(self) -> int:
+        with self._lock:
+            return self._sequence
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry
+
+    def put(self, key: Hashable, body: bytes, tables: Iterable[str], token: int) -> CacheEntry:
+        """Store ``body`` for ``key``; the entry is returned whether or not it was kept."""
+        tables = frozenset(tables)
+        entry = CacheEntry(body=body, etag=make_etag(body), tables=tables, expires_at=time.monotonic() + self.ttl)
+        with self._lock:
+            if any(self._invalidated_at.get(table, -1) >= token for table in tables):
+                return entry
+            if len(body) > self.max_bytes:
+                self._stats["oversized"] += 1
+                return entry
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+        return entry
+
+    def record_not_modified(self):
+        with self._lock:
+            self._stats["not_modified"] += 1
+
+    def invalidate(self, table: str):
+        """Drop every entry read from ``table``; called after each committed write."""
+        with self._lock:
+            self._invalidated_at[table] = self._sequence
+            self._sequence += 1
+            for key in list(self._by_table.pop(table, ())):
+                self._remove(key)
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry.body)
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                **self._stats,
+            }
@@ -1,99 +1,476 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import sqlite3
-from typing import List, Dict, Any, Optional
+import csv
+import io
+import json
+import os
+import time
+from typing import List, Dict, Any, Callable, Iterator, Literal, Optional, Union
 
-app = FastAPI(title="Chinook Database API", version="1.0.0")
+from catalog import SchemaCatalog
+from db_pool import ConnectionPool, PoolExhaustedError, statement_target
+from index_advisor import IndexAdvisor
+from metrics import CONTENT_TYPE, ROW_BUCKETS, SIZE_BUCKETS, Registry
+from query_log import ORDERINGS, QueryLog
+from query import RecordQuery, filter_params
+from repository import Repository, RepositoryError
+from response_cache import ResponseCache, etag_matches, make_etag
 
-DB_PATH = "chinook.db"
+DB_PATH = os.environ.get("CHINOOK_DB_PATH", "chinook.db")
+POOL_SIZE = int(os.environ.get("CHINOOK_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.environ.get("CHINOOK_POOL_TIMEOUT", "5.0"))
+WRITER_QUEUE_SIZE = int(os.environ.get("CHINOOK_WRITER_QUEUE_SIZE", "1024"))
+WRITER_BATCH_SIZE = int(os.environ.get("CHINOOK_WRITER_BATCH_SIZE", "64"))
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Storage tuning applied to every connection; set a variable to an empty string to keep SQLite's default
+STORAGE_PRAGMAS = {
+    "journal_mode": os.environ.get("CHINOOK_JOURNAL_MODE", "wal"),
+    "synchronous": os.environ.get("CHINOOK_SYNCHRONOUS", "normal"),
+    "mmap_size": os.environ.get("CHINOOK_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "cache_size": os.environ.get("CHINOOK_CACHE_SIZE", "-20000"),
+    "busy_timeout": os.environ.get("CHINOOK_BUSY_TIMEOUT", "5000"),
+    "temp_store": os.environ.get("CHINOOK_TEMP_STORE", "memory"),
+}
+STORAGE_PRAGMAS = {name: value for name, value in STORAGE_PRAGMAS.items() if value}
+SCHEMA_CHECK_INTERVAL = float(os.environ.get("CHINOOK_SCHEMA_CHECK_INTERVAL", "1.0"))
+EXPORT_BATCH_SIZE = int(os.environ.get("CHINOOK_EXPORT_BATCH_SIZE", "500"))
+BULK_MAX_ROWS = int(os.environ.get("CHINOOK_BULK_MAX_ROWS", "10000"))
+MAX_PAGE_SIZE = int(os.environ.get("CHINOOK_MAX_PAGE_SIZE", "10000"))
+CACHE_MAX_BYTES = int(os.environ.get("CHINOOK_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL = float(os.environ.get("CHINOOK_CACHE_TTL", "30.0"))
+METRICS_ENABLED = os.environ.get("CHINOOK_METRICS", "1") != "0"
+SLOW_QUERY_MS = float(os.environ.get("CHINOOK_SLOW_QUERY_MS", "100"))
+QUERY_STATS_SIZE = int(os.environ.get("CHINOOK_QUERY_STATS_SIZE", "500"))
+SLOW_QUERY_LOG_SIZE = int(os.environ.get("CHINOOK_SLOW_QUERY_LOG_SIZE", "100"))
+OPTIMIZE_INTERVAL = float(os.environ.get("CHINOOK_OPTIMIZE_INTERVAL", "3600"))
+ANALYSIS_LIMIT = int(os.environ.get("CHINOOK_ANALYSIS_LIMIT", "1000"))
 
-def get_tables():
-    with get_db() as conn:
-        cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        return [row[0] for row in cursor.fetchall()]
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
 
-def get_table_schema(table_name: str):
-    with get_db() as conn:
-        cursor = conn.execute(f"PRAGMA table_info({table_name})")
-        return {row[1]: row[2] for row in cursor.fetchall()}
+pool = ConnectionPool(
+    DB_PATH,
+    size=POOL_SIZE,
+    timeout=POOL_TIMEOUT,
+    pragmas=STORAGE_PRAGMAS,
+    writer_queue_size=WRITER_QUEUE_SIZE,
+    writer_batch_size=WRITER_BATCH_SIZE,
+)
+catalog = SchemaCatalog(check_interval=SCHEMA_CHECK_INTERVAL)
+repository = Repository(pool, catalog, bulk_max_rows=BULK_MAX_ROWS, max_page_size=MAX_PAGE_SIZE)
+cache = ResponseCache(max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL)
+repository.write_listeners.append(cache.invalidate)
+
+registry = Registry()
+request_duration = registry.histogram(
+    "chinook_http_request_duration_seconds", "Time from request to last response byte", ("method", "route", "status")
+)
+response_size = registry.histogram("chinook_http_response_size_bytes", "Response body size", ("method", "route"), SIZE_BUCKETS)
+requests_in_progress = registry.gauge("chinook_http_requests_in_progress", "Requests being handled")
+serialization_duration = registry.histogram("chinook_json_serialization_seconds", "Time rendering JSON read responses", ("table",))
+sql_duration = registry.histogram(
+    "chinook_sql_statement_duration_seconds", "Time executing a statement and fetching its rows", ("operation", "table")
+)
+sql_rows = registry.histogram("chinook_sql_statement_rows", "Rows read or changed by a statement", ("operation", "table"), ROW_BUCKETS)
+sql_slow = registry.counter("chinook_sql_slow_statements_total", "Statements slower than CHINOOK_SLOW_QUERY_MS", ("operation", "table"))
+
+def record_statement(sql: str, params: Any, seconds: float, rows: int):
+    operation, table = statement_target(sql)
+    sql_duration.observe(seconds, operation, table)
+    sql_rows.observe(rows, operation, table)
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        sql_slow.inc(operation, table)
+
+@registry.collector
+def pool_and_cache_metrics():
+    """Gauges and counters read from the pool, writer and response cache on each scrape."""
+    stats = pool.stats()
+    writer = stats["writer"] or {}
+    cache_stats = cache.stats()
+    yield "chinook_pool_size", "gauge", "Maximum pooled read connections", [({}, stats["size"])]
+    yield "chinook_pool_connections", "gauge", "Pooled read connections by state", [
+        ({"state": "in_use"}, stats["in_use"]),
+        ({"state": "idle"}, stats["idle"]),
+    ]
+    yield "chinook_pool_checkouts_total", "counter", "Read connection checkouts", [({}, stats["checkouts"])]
+    yield "chinook_pool_waits_total", "counter", "Checkouts that waited for a connection", [({}, stats["waits"])]
+    yield "chinook_pool_wait_seconds_total", "counter", "Time spent waiting for a connection", [({}, stats["wait_time_ms"] / 1000)]
+    yield "chinook_pool_exhausted_total", "counter", "Checkouts that timed out", [({}, stats["exhausted"])]
+    yield "chinook_writer_queue_depth", "gauge", "Write jobs waiting for the writer", [({}, writer.get("queue_depth", 0))]
+    yield "chinook_writer_jobs_total", "counter", "Write jobs run", [
+        ({"result": "ok"}, writer.get("jobs", 0) - writer.get("failed_jobs", 0)),
+        ({"result": "failed"}, writer.get("failed_jobs", 0)),
+    ]
+    yield "chinook_writer_batches_total", "counter", "Group commits", [({}, writer.get("batches", 0))]
+    yield "chinook_writer_commit_seconds_total", "counter", "Time spent in COMMIT", [({}, writer.get("commit_time_ms", 0.0) / 1000)]
+    yield "chinook_cache_entries", "gauge", "Responses in the cache", [({}, cache_stats["entries"])]
+    yield "chinook_cache_bytes", "gauge", "Size of the cached responses", [({}, cache_stats["bytes"])]
+    yield "chinook_cache_lookups_total", "counter", "Response cache lookups by result", [
+        ({"result": "hit"}, cache_stats["hits"]),
+        ({"result": "miss"}, cache_stats["misses"]),
+    ]
+    yield "chinook_cache_not_modified_total", "counter", "Reads answered with 304 Not Modified", [({}, cache_stats["not_modified"])]
+    yield "chinook_cache_removals_total", "counter", "Entries dropped from the cache by reason", [
+        ({"reason": "evicted"}, cache_stats["evictions"]),
+        ({"reason": "expired"}, cache_stats["expirations"]),
+    ]
+    yield "chinook_cache_invalidations_total", "counter", "Table invalidations after writes", [({}, cache_stats["invalidations"])]
+    yield "chinook_schema_version", "gauge", "SQLite schema version last seen", [({}, catalog.version or 0)]
+
+class MetricsMiddleware:
+    """Times every request until its last body chunk is sent, labelled by route template rather than path."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status, size = 500, 0
+
+        async def send_and_count(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_and_count)
+        finally:
+            requests_in_progress.dec()
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            request_duration.observe(time.perf_counter() - started, scope["method"], path, str(status))
+            response_size.observe(size, scope["method"], path)
+
+if METRICS_ENABLED:
+    pool.statement_listeners.append(record_statement)
+
+query_log = QueryLog(DB_PATH, threshold_ms=SLOW_QUERY_MS, max_fingerprints=QUERY_STATS_SIZE, slow_log_size=SLOW_QUERY_LOG_SIZE)
+if QUERY_STATS_SIZE > 0:
+    pool.statement_listeners.append(query_log.record)
+advisor = IndexAdvisor(pool, catalog, query_log, analysis_limit=ANALYSIS_LIMIT)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with pool.reader() as conn:
+        catalog.load(conn)
+    advisor.start(OPTIMIZE_INTERVAL)
+    yield
+    advisor.stop()
+    pool.close()
+    query_log.close()
+
+app = FastAPI(title="Chinook Database API", version="1.0.0", lifespan=lifespan)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(PoolExhaustedError)
+def pool_exhausted_handler(request: Request, exc: PoolExhaustedError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+@app.exception_handler(RepositoryError)
+def repository_error_handler(request: Request, exc: RepositoryError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+
+class BulkRecords(BaseModel):
+    records: List[Dict[str, Any]]
+    mode: Literal["atomic", "partial"] = "atomic"
+
+class BulkIds(BaseModel):
+    ids: List[Union[int, str, Dict[str, Any]]]
+    mode: Literal["atomic", "partial"] = "atomic"
+
+class IndexSpec(BaseModel):
+    table: str
+    columns: List[str]
+    name: Optional[str] = None
+
+def request_filters(request: Request):
+    """Column filters from the request's query string, e.g. ``?Milliseconds__gte=300000``."""
+    return filter_params(request.query_params.multi_items())
+
+def cached_json(request: Request, table_name: str, expand: Optional[str], compute: Callable[[], Any]) -> Response:
+    """
+    Serve a JSON read through the response cache, with ``ETag``/``If-None-Match`` support.
+
+    The key is the path, query string and schema version. ``X-Cache`` tells
+    whether the body came from the cache.
+    """
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())), catalog.version)
+    entry = cache.get(key) if cache.enabled else None
+    status = "HIT"
+    if entry is None:
+        status = "MISS"
+        token = cache.begin()
+        data = compute()
+        started = time.perf_counter()
+        body = JSONResponse(content=data).body
+        serialization_duration.observe(time.perf_counter() - started, table_name)
+        if cache.enabled:
+            entry = cache.put(key, body, repository.tables_read(table_name, expand), token)
+            etag = entry.etag
+        else:
+            etag = make_etag(body)
+    else:
+        body, etag = entry.body, entry.etag
+    
+    headers = {"ETag": etag, "X-Cache": status}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def stream_rows(query: RecordQuery, export_format: str, limit: Optional[int], batch_size: int) -> Iterator[str]:
+    """
+    Yield the table as NDJSON lines or CSV text, one ``fetchmany`` batch at a time.
+
+    The connection stays checked out until the generator is exhausted or closed,
+    so only one batch of rows is held in memory at once.
+    """
+    sql, params = query.to_sql(limit=limit)
+    
+    with pool.reader() as conn:
+        rows = conn.execute(sql, params)
+        columns = [col[0] for col in rows.description]
+        
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+        
+        while True:
+            batch = rows.fetchmany(batch_size)
+            if not batch:
+                break
+            if export_format == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(batch)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(query.decode(row)) + "\n" for row in batch)
 
 @app.get("/")
 def root():
-    return {"message": "Chinook Database API", "tables": get_tables()}
+    return {"message": "Chinook Database API", "tables": repository.tables()}
+
+@app.get("/health")
+def health():
+    return {
+        "status": "ok",
+        "pool": pool.stats(),
+        "storage": pool.storage_settings(),
+        "cache": cache.stats(),
+        "schema_version": catalog.version,
+    }
+
+@app.get("/metrics")
+def get_metrics():
+    """Request, SQL, pool and cache metrics in the Prometheus text format."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+@app.get("/admin/queries")
+def get_query_stats(limit: int = 20, order_by: str = "total"):
+    """
+    Statement fingerprints with the most total time since start or the last reset.
+
+    ``order_by`` is ``total``, ``mean``, ``max``, ``calls`` or ``rows``.
+    """
+    if order_by not in ORDERINGS:
+        raise HTTPException(status_code=400, detail=f"order_by must be one of: {', '.join(ORDERINGS)}")
+    return {**query_log.stats(), "queries": query_log.top(limit, order_by)}
+
+@app.get("/admin/slow-queries")
+def get_slow_queries(limit: int = 50):
+    """The most recent statements over ``CHINOOK_SLOW_QUERY_MS``, newest first, with their query plans."""
+    return {"threshold_ms": query_log.threshold_ms, "queries": query_log.slow(limit)}
+
+@app.delete("/admin/queries")
+def reset_query_stats():
+    query_log.reset()
+    return {"message": "Query statistics reset"}
+
+@app.get("/admin/indexes")
+def get_indexes(limit: int = 10):
+    """Indexes per table, the index hit rate of the logged statements and the costliest scans."""
+    return {"indexes": advisor.indexes(), "usage": advisor.usage(limit), "last_optimize": advisor.last_optimize}
+
+@app.get("/admin/indexes/recommendations")
+def get_index_recommendations():
+    return {"recommendations": advisor.recommend()}
+
+@app.post("/admin/indexes/recommendations")
+def apply_index_recommendations():
+    """Create every recommended index."""
+    return {"created": advisor.create_recommended()}
+
+@app.post("/admin/indexes")
+def create_index(body: IndexSpec):
+    return advisor.create(body.table, body.columns, body.name)
+
+@app.delete("/admin/indexes/{name}")
+def drop_index(name: str):
+    return advisor.drop(name)
+
+@app.post("/admin/analyze")
+def analyze(full: bool = False):
+    """Refresh planner statistics now: ``PRAGMA optimize``, or a full ``ANALYZE`` with ``full=true``."""
+    return advisor.optimize(full)
+
+@app.get("/schema/{table_name}")
+def get_schema(table_name: str):
+    return repository.describe(table_name)
+
+@app.get("/export/{table_name}")
+def export_records(
+    table_name: str,
+    request: Request,
+    format: str = "ndjson",
+    limit: Optional[int] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    fields: Optional[str] = None,
+    order_by: Optional[str] = None,
+    expand: Optional[str] = None,
+):
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format, expected one of: {', '.join(EXPORT_MEDIA_TYPES)}")
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be at least 1")
+    
+    with pool.reader() as conn:
+        table = repository.get_table(conn, table_name)
+    query = repository.build_query(table, request_filters(request), fields, order_by, expand)
+    
+    return StreamingResponse(
+        stream_rows(query, format, limit, batch_size),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table.name}.{format}"'},
+    )
+
+@app.get("/aggregate/{table_name}")
+def aggregate_records(
+    table_name: str,
+    request: Request,
+    metrics: str = "count",
+    group_by: Optional[str] = None,
+    having: Optional[str] = None,
+    order_by: Optional[str] = None,
+    limit: int = 100,
+):
+    """
+    Compute count/sum/avg/min/max per group inside SQLite.
+
+    ``/aggregate/Track?group_by=Genre.Name&metrics=count&order_by=-count&limit=5``
+    returns the five genres with the most tracks. Column filters work as on
+    ``GET /{table_name}`` and may follow to-one relations, e.g. ``Album.ArtistId=1``.
+    """
+    return repository.aggregate(
+        table_name,
+        metrics,
+        group_by=group_by,
+        filters=request_filters(request),
+        having=having,
+        order_by=order_by,
+        limit=limit,
+    )
+
+@app.get("/related/{table_name}")
+def get_related_records(
+    table_name: str,
+    path: str,
+    request: Request,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    fields: Optional[str] = None,
+    order_by: Optional[str] = None,
+    expand: Optional[str] = None,
+):
+    """
+    Follow foreign keys from ``table_name`` along ``path`` and return the distinct rows reached.
+
+    Column filters select the starting rows, e.g.
+    ``/related/Artist?ArtistId=1&path=Albums.Tracks.InvoiceLines.Invoice.Customer``
+    returns the customers who bought tracks by artist 1. ``fields``,
+    ``order_by`` and ``expand`` apply to the rows returned. The whole chain
+    runs as a single join inside SQLite.
+    """
+    return repository.related(table_name, path, request_filters(request), limit, offset, fields, order_by, expand)
+
+@app.post("/bulk/{table_name}")
+def bulk_create_records(table_name: str, body: BulkRecords):
+    return repository.bulk("create", table_name, body.records, body.mode)
+
+@app.put("/bulk/{table_name}")
+def bulk_update_records(table_name: str, body: BulkRecords):
+    """Each record must include the table's key columns; the other columns are updated."""
+    return repository.bulk("update", table_name, body.records, body.mode)
+
+@app.delete("/bulk/{table_name}")
+def bulk_delete_records(table_name: str, body: BulkIds):
+    return repository.bulk("delete", table_name, body.ids, body.mode)
 
 @app.get("/{table_name}")
-def get_all_records(table_name: str, limit: int = 100, offset: int = 0):
-    if table_name not in get_tables():
-        raise HTTPException(status_code=404, detail="Table not found")
+def get_all_records(
+    table_name: str,
+    request: Request,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    ids: Optional[str] = None,
+    fields: Optional[str] = None,
+    order_by: Optional[str] = None,
+    expand: Optional[str] = None,
+):
+    """
+    List records, optionally filtered, projected, sorted and expanded.
+
+    Any query parameter other than the named ones filters on a column:
+    ``?ArtistId=1``, ``?Milliseconds__gte=300000``, ``?GenreId__in=1,2,3``.
+
+    ``?ids=1,5,9`` (``?ids=1,3402;1,3389`` for composite keys) fetches those
+    records instead and returns ``{"records": [...], "missing": [...]}``.
+    """
+    if ids is not None:
+        if cursor is not None or order_by or request_filters(request):
+            raise HTTPException(status_code=400, detail="ids cannot be combined with cursor, order_by or filters")
+        id_values = request.query_params.getlist("ids")
+        return cached_json(request, table_name, expand, lambda: repository.get_many(table_name, id_values, fields, expand))
     
-    with get_db() as conn:
-        cursor = conn.execute(f"SELECT * FROM {table_name} LIMIT ? OFFSET ?", (limit, offset))
-        return [dict(row) for row in cursor.fetchall()]
+    return cached_json(
+        request,
+        table_name,
+        expand,
+        lambda: repository.list_records(table_name, request_filters(request), limit, offset, cursor, fields, order_by, expand),
+    )
 
 @app.get("/{table_name}/{record_id}")
-def get_record(table_name: str, record_id: int):
-    if table_name not in get_tables():
-        raise HTTPException(status_code=404, detail="Table not found")
-    
-    schema = get_table_schema(table_name)
-    pk_column = next(iter(schema.keys()))
-    
-    with get_db() as conn:
-        cursor = conn.execute(f"SELECT * FROM {table_name} WHERE {pk_column} = ?", (record_id,))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Record not found")
-        return dict(row)
+def get_record(table_name: str, record_id: str, request: Request, expand: Optional[str] = None):
+    return cached_json(request, table_name, expand, lambda: repository.get_record(table_name, record_id, expand))
 
 @app.post("/{table_name}")
 def create_record(table_name: str, data: Dict[str, Any]):
-    if table_name not in get_tables():
-        raise HTTPException(status_code=404, detail="Table not found")
-    
-    columns = ", ".join(data.keys())
-    placeholders = ", ".join(["?" for _ in data])
-    
-    with get_db() as conn:
-        cursor = conn.execute(f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})", list(data.values()))
-        conn.commit()
-        return {"id": cursor.lastrowid, "message": "Record created"}
+    return repository.create(table_name, data)
 
 @app.put("/{table_name}/{record_id}")
-def update_record(table_name: str, record_id: int, data: Dict[str, Any]):
-    if table_name not in get_tables():
-        raise HTTPException(status_code=404, detail="Table not found")
-    
-    schema = get_table_schema(table_name)
-    pk_column = next(iter(schema.keys()))
-    
-    set_clause = ", ".join([f"{k} = ?" for k in data.keys()])
-    
-    with get_db() as conn:
-        cursor = conn.execute(f"UPDATE {table_name} SET {set_clause} WHERE {pk_column} = ?", list(data.values()) + [record_id])
-        conn.commit()
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Record not found")
-        return {"message": "Record updated"}
+def update_record(table_name: str, record_id: str, data: Dict[str, Any]):
+    return repository.update(table_name, record_id, data)
 
 @app.delete("/{table_name}/{record_id}")
-def delete_record(table_name: str, record_id: int):
-    if table_name not in get_tables():
-        raise HTTPException(status_code=404, detail="Table not found")
-    
-    schema = get_table_schema(table_name)
-    pk_column = next(iter(schema.keys()))
-    
-    with get_db() as conn:
-        cursor = conn.execute(f"DELETE FROM {table_name} WHERE {pk_column} = ?", (record_id,))
-        conn.commit()
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Record not found")
-        return {"message": "Record deleted"}
+def delete_record(table_name: str, record_id: str):
+    return repository.delete(table_name, record_id)
 
 if __name__ == "__main__":
     import uvicorn
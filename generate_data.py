@@ -0,0 +1,248 @@
+import argparse
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOURCE = os.path.join(ROOT, "chinook-crud-api", "chinook.db")
+
+# Reference data: copied once and shared by every copy of the other tables
+SHARED_TABLES = ("Genre", "MediaType", "Employee")
+# Copied --sales-scale times; every other table is catalog data, copied --catalog-scale times
+SALES_TABLES = ("Customer", "Invoice", "InvoiceLine")
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class Table:
+    """A source table held in memory, with the key offsets its copies are shifted by."""
+
+    def __init__(self, conn, name):
+        info = list(conn.execute(f"PRAGMA table_info({_quote(name)})"))
+        self.name = name
+        self.columns = [row[1] for row in info]
+        key = [row[1] for row in info if row[5]]
+        # Composite keys (PlaylistTrack) are made of foreign keys and shift with their parents
+        self.key = key[0] if len(key) == 1 else None
+        self.foreign_keys = {row[3]: row[2] for row in conn.execute(f"PRAGMA foreign_key_list({_quote(name)})")}
+        self.rows = conn.execute(f"SELECT * FROM {_quote(name)} ORDER BY rowid").fetchall()
+        self.offset = max((row[self.columns.index(self.key)] for row in self.rows), default=0) if self.key else 0
+
+    def index(self, column):
+        return self.columns.index(column)
+
+
+class Generator:
+    """
+    Builds a larger Chinook database from the real one, deterministically.
+
+    Catalog tables are copied ``catalog_scale`` times and sales tables
+    ``sales_scale`` times. Copy ``k`` of a row gets its integer key shifted
+    by ``k`` times the table's largest key. Its foreign keys point into the
+    same copy of the parent, so per-parent counts keep the shape of the
+    original: albums per artist, tracks per album, lines per invoice. The
+    exception is ``InvoiceLine.TrackId``, which points at a random catalog
+    copy of the same track, so sales spread over the whole catalog and
+    keep each track's popularity. Prices, genres, countries and invoice
+    totals are left as they are. Names, durations and dates are varied a
+    little, so copies are not exact duplicates.
+
+    All randomness comes from one RNG per (seed, table, copy). The same
+    arguments therefore produce the same database, whatever order the
+    tables are written in.
+    """
+
+    def __init__(self, source, catalog_scale=1, sales_scale=1, seed=0):
+        self.catalog_scale = catalog_scale
+        self.sales_scale = sales_scale
+        self.seed = seed
+        conn = sqlite3.connect(source)
+        try:
+            names = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )]
+            self.tables = {name: Table(conn, name) for name in names}
+            self.schema = [row[0] for row in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )]
+            self.indexes = [row[0] for row in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL ORDER BY name"
+            )]
+        finally:
+            conn.close()
+        self._dates = {}
+        customers = self.tables.get("Customer")
+        if customers:
+            self._first_names = [row[customers.index("FirstName")] for row in customers.rows]
+            self._last_names = [row[customers.index("LastName")] for row in customers.rows]
+
+    def copies(self, table):
+        if table in SHARED_TABLES:
+            return 1
+        return self.sales_scale if table in SALES_TABLES else self.catalog_scale
+
+    def _rng(self, table, copy):
+        return random.Random(f"{self.seed}:{table}:{copy}")
+
+    def _delta(self, table, column, copy):
+        """What key or foreign key ``column`` is shifted by in copy ``copy``."""
+        owner = table.name if column == table.key else table.foreign_keys.get(column)
+        if owner not in self.tables or self.copies(owner) == 1:
+            return 0
+        return copy * self.tables[owner].offset
+
+    def rows(self, name, copy):
+        """Rows of copy ``copy`` of table ``name``; copy 0 of every table is the original data."""
+        table = self.tables[name]
+        if copy == 0:
+            yield from table.rows
+            return
+        rng = self._rng(name, copy)
+        vary = getattr(self, f"_vary_{name}", None)
+        shifts = [
+            (i, self._delta(table, column, copy)) for i, column in enumerate(table.columns)
+            if column == table.key or column in table.foreign_keys
+        ]
+        shifts = [(i, delta) for i, delta in shifts if delta]
+        track = None
+        if name == "InvoiceLine":
+            # Any catalog copy of the same track: keeps its price and its share of sales
+            track = table.index("TrackId")
+            shifts = [(i, delta) for i, delta in shifts if i != track]
+            track_offset = self.tables["Track"].offset
+        for source in table.rows:
+            row = list(source)
+            for i, delta in shifts:
+                if row[i] is not None:
+                    row[i] += delta
+            if track is not None:
+                row[track] += int(rng.random() * self.catalog_scale) * track_offset
+            if vary:
+                vary(table, row, rng, copy)
+            yield row
+
+    def _vary_Artist(self, table, row, rng, copy):
+        i = table.index("Name")
+        if row[i] is not None:
+            row[i] = f"{row[i]} {copy + 1}"
+
+    def _vary_Album(self, table, row, rng, copy):
+        i = table.index("Title")
+        row[i] = f"{row[i]} (Vol. {copy + 1})"
+
+    def _vary_Playlist(self, table, row, rng, copy):
+        i = table.index("Name")
+        if row[i] is not None:
+            row[i] = f"{row[i]} {copy + 1}"
+
+    def _vary_Track(self, table, row, rng, copy):
+        # Durations and sizes move together, within ±10%
+        factor = rng.uniform(0.9, 1.1)
+        for column in ("Milliseconds", "Bytes"):
+            i = table.index(column)
+            if row[i] is not None:
+                row[i] = int(row[i] * factor)
+
+    def _vary_Customer(self, table, row, rng, copy):
+        # Names drawn from the real customers; address, country and support rep stay with the row
+        first, last = rng.choice(self._first_names), rng.choice(self._last_names)
+        row[table.index("FirstName")] = first
+        row[table.index("LastName")] = last
+        i = table.index("Email")
+        domain = row[i].split("@", 1)[1] if row[i] and "@" in row[i] else "example.com"
+        row[i] = f"{first}.{last}.{row[table.index('CustomerId')]}@{domain}".lower().replace(" ", "")
+
+    def _vary_Invoice(self, table, row, rng, copy):
+        # Within two weeks of the original date, so the yearly and monthly spread stays the same
+        i = table.index("InvoiceDate")
+        if row[i] not in self._dates:
+            self._dates[row[i]] = datetime.strptime(row[i], DATE_FORMAT)
+        row[i] = (self._dates[row[i]] + timedelta(days=int(rng.random() * 29) - 14)).strftime(DATE_FORMAT)
+
+    def write(self, target, progress=None):
+        """Create ``target`` and fill it; returns the row count per table."""
+        conn = sqlite3.connect(target, isolation_level=None)
+        try:
+            # A throwaway build: no journal and no fsync, then indexes once the rows are in
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("PRAGMA cache_size = -200000")
+            conn.execute("BEGIN")
+            for sql in self.schema:
+                conn.execute(sql)
+            counts = {}
+            for name, table in self.tables.items():
+                placeholders = ", ".join("?" * len(table.columns))
+                sql = f"INSERT INTO {_quote(name)} VALUES ({placeholders})"
+                counts[name] = 0
+                for copy in range(self.copies(name)):
+                    rows = list(self.rows(name, copy))
+                    conn.executemany(sql, rows)
+                    counts[name] += len(rows)
+                    if progress:
+                        progress(name, counts[name])
+            for sql in self.indexes:
+                conn.execute(sql)
+            conn.execute("COMMIT")
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+        return counts
+
+
+def generate(source, target, scale=1, catalog_scale=None, sales_scale=None, seed=0, progress=None):
+    """Write a copy of ``source`` to ``target`` with its catalog and sales tables scaled up."""
+    if os.path.exists(target):
+        os.remove(target)
+    generator = Generator(source, catalog_scale or scale, sales_scale or scale, seed)
+    return generator.write(target, progress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a larger Chinook database with the same keys and distributions")
+    parser.add_argument("output", help="Database file to create")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="Chinook database to scale (default: chinook-crud-api/chinook.db)")
+    parser.add_argument("--scale", type=int, default=10, help="Copies of the catalog and sales tables (default: 10)")
+    parser.add_argument("--catalog-scale", type=int, help="Copies of artists, albums, tracks and playlists (default: --scale)")
+    parser.add_argument("--sales-scale", type=int, help="Copies of customers, invoices and invoice lines (default: --scale)")
+    parser.add_argument("--invoice-lines", type=int, metavar="N",
+                        help="Pick the sales scale that gives at least N InvoiceLine rows, instead of --sales-scale")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed gives the same database (default: 0)")
+    parser.add_argument("--force", action="store_true", help="Overwrite the output file if it exists")
+    args = parser.parse_args()
+
+    if os.path.exists(args.output) and not args.force:
+        parser.error(f"{args.output} exists, use --force to overwrite it")
+    if os.path.abspath(args.output) == os.path.abspath(args.source):
+        parser.error("the output must not be the source database")
+    sales_scale = args.sales_scale
+    if args.invoice_lines:
+        conn = sqlite3.connect(args.source)
+        lines = conn.execute("SELECT COUNT(*) FROM InvoiceLine").fetchone()[0]
+        conn.close()
+        sales_scale = math.ceil(args.invoice_lines / lines)
+
+    started = time.perf_counter()
+
+    def progress(table, rows):
+        print(f"\r{table:<14} {rows:>12,} rows  {time.perf_counter() - started:7.1f}s ", end="", file=sys.stderr, flush=True)
+
+    counts = generate(args.source, args.output, args.scale, args.catalog_scale, sales_scale, args.seed, progress)
+    elapsed = time.perf_counter() - started
+    print(file=sys.stderr)
+    for table, rows in counts.items():
+        print(f"{table:<14} {rows:>12,}")
+    total = sum(counts.values())
+    print(f"{total:,} rows written to {args.output} in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,42 +19,31 @@ async def mcp_customer_analysis():
         
         # Step 1: Get AC/DC's artist info
         result = await client.call_tool("get_record", {"table_name": "Artist", "record_id": 1})
-        artist = json.loads(result[0].text)
+        artist = json.loads(result.content[0].text)
         artist_name = artist["Name"]
         print(f"Artist: {artist_name} (ID: {artist['ArtistId']})")
         
-        # Step 2: Get all albums by AC/DC
-        result = await client.call_tool("get_all_records", {"table_name": "Album", "limit": 100})
-        all_albums = json.loads(result[0].text)
-        artist_albums = [album for album in all_albums if album['ArtistId'] == artist['ArtistId']]
-        album_ids = [album['AlbumId'] for album in artist_albums]
-        print(f"Found {len(artist_albums)} albums by {artist_name}")
-        
-        # Step 3: Get all tracks from those albums
-        result = await client.call_tool("get_all_records", {"table_name": "Track", "limit": 1000})
-        all_tracks = json.loads(result[0].text)
-        artist_tracks = [track for track in all_tracks if track['AlbumId'] in album_ids]
-        track_ids = [track['TrackId'] for track in artist_tracks]
-        print(f"Found {len(artist_tracks)} tracks by {artist_name}")
-        
-        # Step 4: Get all invoice lines containing those tracks
-        result = await client.call_tool("get_all_records", {"table_name": "InvoiceLine", "limit": 2000})
-        all_invoice_lines = json.loads(result[0].text)
-        artist_invoice_lines = [line for line in all_invoice_lines if line['TrackId'] in track_ids]
-        invoice_ids = [line['InvoiceId'] for line in artist_invoice_lines]
-        print(f"Found {len(artist_invoice_lines)} invoice lines for {artist_name} tracks")
-        
-        # Step 5: Get all invoices for those invoice lines
-        result = await client.call_tool("get_all_records", {"table_name": "Invoice", "limit": 1000})
-        all_invoices = json.loads(result[0].text)
-        artist_invoices = [invoice for invoice in all_invoices if invoice['InvoiceId'] in invoice_ids]
+        # Step 2: Follow Artist -> Album -> Track -> InvoiceLine -> Invoice in one join
+        result = await client.call_tool("get_related_records", {
+            "table_name": "Artist",
+            "path": "Albums.Tracks.InvoiceLines.Invoice",
+            "filters": {"ArtistId": artist['ArtistId']},
+            "fields": ["InvoiceId", "CustomerId"],
+            "limit": 1000
+        })
+        artist_invoices = json.loads(result.content[0].text)
         customer_ids = [invoice['CustomerId'] for invoice in artist_invoices]
         print(f"Found {len(artist_invoices)} invoices containing {artist_name} tracks")
         
-        # Step 6: Get customer information
-        result = await client.call_tool("get_all_records", {"table_name": "Customer", "limit": 100})
-        all_customers = json.loads(result[0].text)
-        artist_customers = [customer for customer in all_customers if customer['CustomerId'] in customer_ids]
+        # Step 3: Get the customers at the end of the same path
+        result = await client.call_tool("get_related_records", {
+            "table_name": "Artist",
+            "path": "Albums.Tracks.InvoiceLines.Invoice.Customer",
+            "filters": {"ArtistId": artist['ArtistId']},
+            "fields": ["CustomerId", "FirstName", "LastName", "Country"],
+            "limit": 1000
+        })
+        artist_customers = json.loads(result.content[0].text)
         
         # Count purchases per customer
         customer_purchase_counts = Counter(customer_ids)
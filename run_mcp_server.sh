@@ -13,10 +13,10 @@ if ! command -v uv &> /dev/null; then
 fi
 
 # Install dependencies if needed
-uv pip install -q fastmcp requests
+uv pip install -q fastmcp httpx
 
-# Check if API server is running
-if ! curl -s http://localhost:50514/ > /dev/null; then
+# Check if API server is running (the local backend does not need it)
+if [ "${CHINOOK_MCP_BACKEND:-http}" = "http" ] && ! curl -s http://localhost:50514/ > /dev/null; then
     echo "Error: API server is not running or not accessible at http://localhost:50514/"
     echo "Please start the API server first using: ./run_api_server.sh"
     exit 1
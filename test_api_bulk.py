@@ -0,0 +1,130 @@
+import os
+import shutil
+import sys
+import tempfile
+
+# The API opens its database at import time; give it a throwaway copy of chinook.db
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chinook-crud-api")
+DB_DIR = tempfile.mkdtemp()
+shutil.copy(os.path.join(API_DIR, "chinook.db"), os.path.join(DB_DIR, "chinook.db"))
+os.environ["CHINOOK_DB_PATH"] = os.path.join(DB_DIR, "chinook.db")
+sys.path.insert(0, API_DIR)
+
+from fastapi.testclient import TestClient
+
+import server
+from repository import ConflictError
+
+client = TestClient(server.app)
+
+
+class InsertCounter:
+    """Counts INSERT statements the API runs, one per execute or executemany call."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, sql, params, seconds, rows):
+        if sql.lstrip().upper().startswith("INSERT"):
+            self.count += 1
+
+    def __enter__(self):
+        server.pool.statement_listeners.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        server.pool.statement_listeners.remove(self)
+
+
+def names(results):
+    return [client.get(f"/Artist/{result['id']}").json()["Name"] for result in results]
+
+
+def test_bulk_create_inserts_each_run_with_one_statement():
+    print("Testing that a bulk create inserts rows with the same columns in one executemany...")
+    records = [{"Name": f"Bulk Artist {i}"} for i in range(50)]
+    with InsertCounter() as inserts:
+        response = client.post("/bulk/Artist", json={"records": records})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["succeeded"] == 50 and body["failed"] == 0
+    assert inserts.count == 1, inserts.count
+    assert [result["index"] for result in body["results"]] == list(range(50))
+    assert names(body["results"]) == [record["Name"] for record in records]
+    print(f"50 rows in {inserts.count} statement, ids match the rows")
+    return True
+
+
+def test_bulk_create_with_mixed_columns_keeps_ids_and_order():
+    print("Testing ids when runs alternate between generated and explicit keys...")
+    records = [{"Name": "Run A1"}, {"Name": "Run A2"}, {"ArtistId": 900001, "Name": "Run B"}, {"Name": "Run C"}]
+    with InsertCounter() as inserts:
+        response = client.post("/bulk/Artist", json={"records": records})
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert inserts.count == 3, inserts.count
+    assert results[2]["id"] == 900001
+    assert names(results) == [record["Name"] for record in records]
+    print("ids match the rows across runs")
+    return True
+
+
+def test_bulk_create_reports_the_failing_row():
+    print("Testing that a failing row is reported at its own index...")
+    taken = {"ArtistId": 1, "Name": "Duplicate key"}
+    records = [{"Name": "Partial 1"}, {"Name": "Partial 2"}, taken, {"Name": "Partial 3"}]
+
+    response = client.post("/bulk/Artist", json={"records": records, "mode": "partial"})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["succeeded"] == 3 and body["failed"] == 1
+    assert [result["status"] for result in body["results"]] == ["created", "created", "error", "created"]
+    created = [result for result in body["results"] if result["status"] == "created"]
+    assert names(created) == ["Partial 1", "Partial 2", "Partial 3"]
+
+    # A run that fails in executemany is replayed row by row to find the row
+    response = client.post(
+        "/bulk/Artist", json={"records": [{"ArtistId": 500000, "Name": "New"}, taken], "mode": "partial"}
+    )
+    assert [result["status"] for result in response.json()["results"]] == ["created", "error"]
+
+    before = client.get("/Artist", params={"Name": "Atomic 1"}).json()
+    response = client.post("/bulk/Artist", json={"records": [{"Name": "Atomic 1"}, taken]})
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"]["index"] == 1
+    assert client.get("/Artist", params={"Name": "Atomic 1"}).json() == before
+    print("partial mode keeps the other rows, atomic mode rolls back and names the row")
+    return True
+
+
+def test_single_writes_report_constraint_violations():
+    print("Testing that constraint violations on single-record writes return 409...")
+    for response in (
+        client.post("/Artist", json={"ArtistId": 1, "Name": "Duplicate key"}),
+        client.post("/Album", json={"ArtistId": 1}),
+        client.put("/Album/1", json={"Title": None}),
+    ):
+        assert response.status_code == 409, (response.status_code, response.text)
+        print(f"{response.status_code}: {response.json()['detail']}")
+
+    # The MCP server's local backend sees the same status instead of a raw sqlite3.IntegrityError
+    try:
+        server.repository.create("Artist", {"ArtistId": 1, "Name": "Duplicate key"})
+    except ConflictError as e:
+        assert e.status_code == 409
+    else:
+        raise AssertionError("duplicate key was accepted")
+    return True
+
+
+if __name__ == "__main__":
+    success = all(
+        test()
+        for test in (
+            test_bulk_create_inserts_each_run_with_one_statement,
+            test_bulk_create_with_mixed_columns_keeps_ids_and_order,
+            test_bulk_create_reports_the_failing_row,
+            test_single_writes_report_constraint_violations,
+        )
+    )
+    sys.exit(0 if success else 1)
@@ -0,0 +1,78 @@
+import os
+import shutil
+import sys
+import tempfile
+
+# The API opens its database at import time; give it a throwaway copy of chinook.db
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chinook-crud-api")
+DB_DIR = tempfile.mkdtemp()
+shutil.copy(os.path.join(API_DIR, "chinook.db"), os.path.join(DB_DIR, "chinook.db"))
+os.environ["CHINOOK_DB_PATH"] = os.path.join(DB_DIR, "chinook.db")
+sys.path.insert(0, API_DIR)
+
+from fastapi.testclient import TestClient
+
+import server
+from repository import BadRequestError
+
+client = TestClient(server.app)
+
+
+def test_cursor_pages_reject_invalid_limits():
+    print("Testing limit validation on cursor pages...")
+    for limit in (0, -1, server.MAX_PAGE_SIZE + 1):
+        response = client.get("/Track", params={"limit": limit, "cursor": ""})
+        assert response.status_code == 422, (limit, response.status_code, response.text)
+        print(f"limit={limit}: {response.status_code}")
+
+    response = client.get("/Track", params={"limit": 5, "cursor": ""})
+    assert response.status_code == 200, response.text
+    page = response.json()
+    assert len(page["records"]) == 5 and page["next_cursor"]
+    print(f"limit=5: {response.status_code}, next_cursor={page['next_cursor']}")
+    return True
+
+
+INVALID_PAGES = ({"limit": 0}, {"limit": -1}, {"limit": server.MAX_PAGE_SIZE + 1}, {"offset": -3})
+
+
+def test_offset_pages_reject_invalid_limit_and_offset():
+    print("Testing limit and offset validation on offset pages...")
+    for path, extra in (("/Track", {}), ("/related/Artist", {"ArtistId": 1, "path": "Albums.Tracks"})):
+        for params in INVALID_PAGES:
+            response = client.get(path, params={**extra, **params})
+            assert response.status_code == 422, (path, params, response.status_code, response.text)
+            print(f"{path} {params}: {response.status_code}")
+    return True
+
+
+def test_repository_rejects_invalid_pages():
+    print("Testing that in-process callers such as the MCP local backend get a 400...")
+    calls = (
+        lambda page: server.repository.list_records("Track", **page),
+        lambda page: server.repository.list_records("Track", cursor="", **page),
+        lambda page: server.repository.related("Artist", "Albums.Tracks", [("ArtistId", 1)], **page),
+    )
+    for call in calls:
+        for page in INVALID_PAGES:
+            try:
+                call(page)
+            except BadRequestError as e:
+                assert e.status_code == 400
+                print(f"{page}: {e.detail}")
+            else:
+                raise AssertionError(f"{page} was accepted")
+    assert len(server.repository.list_records("Track", limit=server.MAX_PAGE_SIZE)) == 3503
+    return True
+
+
+if __name__ == "__main__":
+    success = all(
+        test()
+        for test in (
+            test_cursor_pages_reject_invalid_limits,
+            test_offset_pages_reject_invalid_limit_and_offset,
+            test_repository_rejects_invalid_pages,
+        )
+    )
+    sys.exit(0 if success else 1)
@@ -14,8 +14,8 @@ async def main():
         
         print("\nTesting list_tables tool:")
         result = await client.call_tool("list_tables", {})
-        if result and len(result) > 0:
-            print(f"Result: {result[0].text}")
+        if result.content:
+            print(f"Result: {result.content[0].text}")
         else:
             print("No result returned")
 
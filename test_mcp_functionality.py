@@ -19,8 +19,8 @@ async def test_mcp_functionality():
         # Test list_tables tool
         print("\nTesting list_tables tool:")
         result = await client.call_tool("list_tables", {})
-        if result and len(result) > 0:
-            print(f"Result: {result[0].text}")
+        if result.content:
+            print(f"Result: {result.content[0].text}")
             tables_result = True
         else:
             print("No result returned")
@@ -29,8 +29,8 @@ async def test_mcp_functionality():
         # Test get_all_records tool
         print("\nTesting get_all_records tool:")
         result = await client.call_tool("get_all_records", {"table_name": "Artist", "limit": 5})
-        if result and len(result) > 0:
-            print(f"Result: {result[0].text}")
+        if result.content:
+            print(f"Result: {result.content[0].text}")
             records_result = True
         else:
             print("No result returned")
@@ -0,0 +1,63 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "chinook-crud-api-mcp"))
+
+from intent_parser import MAX_LIMIT, IntentParser
+
+parser = IntentParser()
+
+
+def parse(text):
+    calls = parser.parse(text)
+    return None if calls is None else [(call.tool, call.args) for call in calls]
+
+
+def test_compound_requests_fall_through_to_the_planner():
+    print("Testing that compound requests are left to the planner...")
+    for text in (
+        "add a new artist called Foo and delete artist 3",
+        "create an artist named Foo then list the albums",
+        "add a new genre called Bar, and show genre 2",
+        "create a new playlist named Mix; delete playlist 1",
+        "rename artist 5 to Foo delete artist 6",
+        "update artist 5 to be named Foo and remove album 2",
+    ):
+        assert parse(text) is None, (text, parse(text))
+        print(f"planner: {text}")
+    return True
+
+
+def test_simple_requests_stay_on_the_fast_path():
+    print("Testing that single requests still use the fast path...")
+    assert parse("add a new artist called Foo") == [("create_record", {"table_name": "Artist", "data": {"Name": "Foo"}})]
+    # Quoted names may contain anything
+    assert parse("add a new artist called 'Foo and Bar'") == [
+        ("create_record", {"table_name": "Artist", "data": {"Name": "Foo and Bar"}})
+    ]
+    assert parse("rename album 3 to Best Of") == [
+        ("update_record", {"table_name": "Album", "record_id": 3, "data": {"Title": "Best Of"}})
+    ]
+    print("single requests matched")
+    return True
+
+
+def test_limits_are_capped_at_the_page_size():
+    print("Testing that list limits are capped...")
+    assert parse("show the first 99999999 tracks") == [("get_all_records", {"table_name": "Track", "limit": MAX_LIMIT})]
+    assert parse("show me the first 5 artists") == [("get_all_records", {"table_name": "Artist", "limit": 5})]
+    assert parse("show the first 0 tracks") is None
+    print(f"limit capped at {MAX_LIMIT}")
+    return True
+
+
+if __name__ == "__main__":
+    success = all(
+        test()
+        for test in (
+            test_compound_requests_fall_through_to_the_planner,
+            test_simple_requests_stay_on_the_fast_path,
+            test_limits_are_capped_at_the_page_size,
+        )
+    )
+    sys.exit(0 if success else 1)
@@ -0,0 +1,57 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+# The agent reads its configuration at import time; keep its cache out of the repository and LiteLLM offline
+CACHE_DIR = tempfile.mkdtemp()
+os.environ["CHINOOK_AGENT_LLM_CACHE_PATH"] = os.path.join(CACHE_DIR, "llm_cache.db")
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "chinook-crud-api-mcp"))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+
+import mcp_agent
+
+DELETE_PLAN = '{"calls": [{"id": "delete", "tool": "bulk_delete_records", "args": {"table_name": "InvoiceLine", "ids": "$lines.*.InvoiceLineId"}}]}'
+READ_PLAN = '{"calls": [{"id": "lines", "tool": "get_all_records", "args": {"table_name": "InvoiceLine", "filters": {"InvoiceId": 5}}}]}'
+
+DELETE_REQUEST = "delete every invoice line of invoice 5 with its track, quantity and unit price"
+READ_REQUEST = "show every invoice line of invoice 5 with its track, quantity and unit price"
+
+
+async def plan(question):
+    state = {"messages": [HumanMessage(content=question)], "tool_calls": None, "tool_results": None, "mcp_tools": []}
+    return (await mcp_agent.select_tool(state))["tool_calls"]
+
+
+def test_select_tool_never_reuses_a_plan_for_a_similar_request():
+    print("Testing that a cached delete plan is not served for a similar read request...")
+    mcp_agent.FAST_PATH = False
+    mcp_agent.llm_cache.clear()
+    mcp_agent.llm = FakeListChatModel(responses=[DELETE_PLAN, READ_PLAN])
+
+    calls = asyncio.run(plan(DELETE_REQUEST))
+    assert [call["tool"] for call in calls] == ["bulk_delete_records"]
+
+    # The two requests are close enough for the similarity tier, which is what made this dangerous
+    mcp_agent.llm_cache.put("probe", [], DELETE_REQUEST, DELETE_PLAN)
+    assert mcp_agent.llm_cache.get("probe", [], READ_REQUEST) == DELETE_PLAN
+
+    calls = asyncio.run(plan(READ_REQUEST))
+    assert [call["tool"] for call in calls] == ["get_all_records"], calls
+    print("Similar request was planned by the LLM, not served the cached delete plan")
+
+    # The same request still comes from the cache
+    mcp_agent.llm = FakeListChatModel(responses=["not called"])
+    calls = asyncio.run(plan(DELETE_REQUEST))
+    assert [call["tool"] for call in calls] == ["bulk_delete_records"]
+    print("Identical request was served from the cache")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_select_tool_never_reuses_a_plan_for_a_similar_request()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+
+# The MCP server runs the API in this process so both metric pages can be checked; give it a throwaway database
+ROOT = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(ROOT, "chinook-crud-api")
+DB_DIR = tempfile.mkdtemp()
+shutil.copy(os.path.join(API_DIR, "chinook.db"), os.path.join(DB_DIR, "chinook.db"))
+os.environ["CHINOOK_DB_PATH"] = os.path.join(DB_DIR, "chinook.db")
+os.environ["CHINOOK_MCP_BACKEND"] = "local"
+os.environ["CHINOOK_API_DIR"] = API_DIR
+os.environ["CHINOOK_METRICS"] = "1"
+sys.path.insert(0, os.path.join(ROOT, "chinook-crud-api-mcp"))
+
+from fastapi.testclient import TestClient
+
+import mcp_server
+import server
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def test_api_metrics_exposition():
+    print("Testing the API's /metrics page...")
+    client = TestClient(server.app)
+    assert client.get("/Artist/1").status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE
+    body = response.text
+    assert "# TYPE chinook_http_request_duration_seconds histogram" in body
+    assert 'chinook_http_request_duration_seconds_bucket{method="GET",route="/{table_name}/{record_id}",status="200",le="+Inf"}' in body
+    assert 'chinook_http_request_duration_seconds_count{method="GET",route="/{table_name}/{record_id}",status="200"}' in body
+    assert "# TYPE chinook_sql_statement_duration_seconds histogram" in body
+    print("request and SQL histograms exposed")
+    return True
+
+
+def test_mcp_metrics_with_local_backend():
+    print("Testing the MCP server's /metrics page with the local backend...")
+    # Both servers use the API package's one metrics module
+    assert os.path.dirname(sys.modules["metrics"].__file__) == API_DIR
+    assert server.registry is mcp_server.backend.server.registry
+    assert mcp_server.Registry is server.Registry
+
+    asyncio.run(mcp_server.describe_table(table_name="Artist"))
+    response = asyncio.run(mcp_server.get_metrics(None))
+    assert response.media_type == CONTENT_TYPE
+    body = response.body.decode()
+    assert 'chinook_mcp_tool_duration_seconds_count{tool="describe_table",table="Artist",status="ok"} 1' in body, body
+    assert "# TYPE chinook_http_request_duration_seconds histogram" in body
+    print("tool metrics followed by the API's own")
+    return True
+
+
+if __name__ == "__main__":
+    success = all(test() for test in (test_api_metrics_exposition, test_mcp_metrics_with_local_backend))
+    sys.exit(0 if success else 1)